@@ -0,0 +1,273 @@
+"""
+Nearest Neighbour Search backends
+	- ExactSearch: cosine against every candidate, the reference
+	- LSHSearch: random-projection locality sensitive hashing over the
+	  normalised description vectors; candidates sharing a bucket with
+	  the query in any table are re-scored exactly
+	- IVFSearch: inverted file over spherical k-means clusters; the
+	  courses of the clusters closest to the query are re-scored exactly
+
+Random hyperplanes separate neighbours well only when their cosine is
+high, so on sparse keyword vectors IVF reaches far better recall for the
+same number of re-scored candidates.
+
+All answer search(row, k, rows) with the k most similar courses to
+the course at row, optionally restricted to the rows of a skill filter.
+"""
+
+import numpy as np
+import scipy.sparse as sp
+
+from sklearn.preprocessing import normalize
+from similarity_index import dense, recommendations
+
+class ExactSearch:
+	"""
+	Brute-force cosine similarity
+	"""
+
+	index = None
+
+	def __init__(self, index):
+		"""
+		index:
+			SimilarityIndex of the catalog
+		"""
+
+		self.index = index
+
+	def search(self, row, k, rows=None):
+		"""
+		Row positions and scores of the k most similar courses
+		-----
+		row:
+			Row position of the query course
+		k:
+			Number of neighbours
+		rows:
+			Row positions allowed as neighbours, all courses if None
+		"""
+
+		scores = self.index.similarity_row(row, rows)
+		if rows is None:
+			rows = np.arange(scores.shape[0])
+		similar, _ = recommendations(scores, k, np.flatnonzero(rows == row))
+		return rows[similar], scores[similar]
+
+class LSHSearch:
+	"""
+	Random hyperplane LSH; each table hashes a course to the signs of
+	its projections on n_bits random hyperplanes
+	"""
+
+	index = None
+	n_tables = None
+	n_bits = None
+	multiprobe = None
+	codes = None # bucket of every course in every table, (courses, tables)
+	order = None # courses sorted by bucket, per table
+	sorted_codes = None
+
+	def __init__(self, index, n_tables=16, n_bits=12, multiprobe=True, seed=0):
+		"""
+		index:
+			SimilarityIndex of the catalog
+		n_tables:
+			Number of hash tables, more tables raise recall and cost
+		n_bits:
+			Hyperplanes per table, more bits make buckets smaller
+		multiprobe:
+			Also look in the buckets one bit away from the query's
+		seed:
+			Seed of the random hyperplanes
+		"""
+
+		self.index = index
+		self.n_tables = n_tables
+		self.n_bits = n_bits
+		self.multiprobe = multiprobe
+
+		matrix = index.matrix
+		rng = np.random.default_rng(seed)
+		planes = rng.standard_normal((matrix.shape[1], n_tables * n_bits))
+		projected = np.asarray(matrix.dot(planes))
+		bits = (projected > 0).reshape(-1, n_tables, n_bits)
+		self.codes = bits.astype(np.int64).dot(1 << np.arange(n_bits))
+
+		# buckets are contiguous runs of the sorted codes
+		self.order = np.argsort(self.codes, axis=0, kind='stable')
+		self.sorted_codes = np.take_along_axis(self.codes, self.order, axis=0)
+
+	def candidates(self, row):
+		"""
+		Row positions sharing a probed bucket with the course at row
+		-----
+		row:
+			Row position of the query course
+		"""
+
+		probes = self.codes[row][None, :]
+		if self.multiprobe:
+			flips = (1 << np.arange(self.n_bits))[:, None]
+			probes = np.vstack([probes, probes ^ flips])
+
+		found = []
+		for t in range(self.n_tables):
+			column = self.sorted_codes[:, t]
+			starts = np.searchsorted(column, probes[:, t], side='left')
+			stops = np.searchsorted(column, probes[:, t], side='right')
+			for start, stop in zip(starts, stops):
+				if(stop > start):
+					found.append(self.order[start:stop, t])
+		if not found:
+			return np.zeros(0, dtype=np.int64)
+		return np.unique(np.concatenate(found))
+
+	def search(self, row, k, rows=None):
+		"""
+		Row positions and scores of the approximately k most similar
+		courses, fewer if the probed buckets hold fewer candidates
+		-----
+		row:
+			Row position of the query course
+		k:
+			Number of neighbours
+		rows:
+			Row positions allowed as neighbours, all courses if None
+		"""
+
+		found = self.candidates(row)
+		if rows is not None:
+			found = found[np.isin(found, rows, assume_unique=False)]
+		found = found[found != row]
+
+		scores = self.index.matrix[found].dot(self.index.query(row))
+		similar, _ = recommendations(scores, k)
+		return found[similar], scores[similar]
+
+class IVFSearch:
+	"""
+	Courses grouped by their nearest of n_lists centroids, found with
+	spherical k-means on the normalised vectors
+	"""
+
+	index = None
+	n_probe = None
+	centroids = None # (n_lists, dimensions), unit length rows
+	order = None # courses sorted by list
+	offsets = None # list i holds order[offsets[i]:offsets[i + 1]]
+
+	def __init__(self, index, n_lists=None, n_probe=16, n_iter=5,
+				block_size=4096, seed=0):
+		"""
+		index:
+			SimilarityIndex of the catalog
+		n_lists:
+			Number of clusters, four times the square root of the courses
+			if None
+		n_probe:
+			Clusters searched per query, more raise recall and cost
+		n_iter:
+			k-means iterations
+		block_size:
+			Courses assigned per block while clustering
+		seed:
+			Seed of the initial centroids
+		"""
+
+		self.index = index
+		self.n_probe = n_probe
+		matrix = index.matrix
+		n = matrix.shape[0]
+		if n_lists is None:
+			n_lists = max(int(4 * np.sqrt(n)), 1)
+		n_lists = min(n_lists, n)
+
+		# centroids of sparse vectors stay sparse, a cluster only uses
+		# the terms of its courses
+		rng = np.random.default_rng(seed)
+		centroids = matrix[rng.choice(n, n_lists, replace=False)]
+		for _ in range(n_iter):
+			assign = self.assign(matrix, centroids, block_size)
+			members = sp.csr_matrix((np.ones(n), (assign, np.arange(n))),
+				shape=(n_lists, n))
+			# empty clusters keep their previous centroid
+			empty = np.bincount(assign, minlength=n_lists) == 0
+			kept = sp.diags(empty.astype(np.float64)).dot(centroids)
+			centroids = normalize(members.dot(matrix) + kept)
+
+		self.centroids = centroids.astype(np.float32)
+		assign = self.assign(matrix, self.centroids, block_size)
+		self.order = np.argsort(assign, kind='stable')
+		self.offsets = np.searchsorted(assign[self.order], np.arange(n_lists + 1))
+
+	@staticmethod
+	def assign(matrix, centroids, block_size):
+		"""
+		Nearest centroid of every course, a block of courses at a time
+		"""
+
+		assign = np.empty(matrix.shape[0], dtype=np.int64)
+		for start in range(0, matrix.shape[0], block_size):
+			sims = dense(matrix[start:start + block_size].dot(centroids.T))
+			assign[start:start + block_size] = sims.argmax(axis=1)
+		return assign
+
+	def candidates(self, row):
+		"""
+		Row positions in the n_probe clusters closest to the course at row
+		-----
+		row:
+			Row position of the query course
+		"""
+
+		sims = self.centroids.dot(self.index.query(row))
+		n_probe = min(self.n_probe, sims.shape[0])
+		probed = np.argpartition(-sims, n_probe - 1)[:n_probe]
+		return np.concatenate([self.order[self.offsets[i]:self.offsets[i + 1]]
+			for i in probed])
+
+	def search(self, row, k, rows=None):
+		"""
+		Row positions and scores of the approximately k most similar
+		courses, fewer if the probed clusters hold fewer candidates
+		-----
+		row:
+			Row position of the query course
+		k:
+			Number of neighbours
+		rows:
+			Row positions allowed as neighbours, all courses if None
+		"""
+
+		found = np.sort(self.candidates(row))
+		if rows is not None:
+			found = found[np.isin(found, rows)]
+		found = found[found != row]
+
+		scores = self.index.matrix[found].dot(self.index.query(row))
+		similar, _ = recommendations(scores, k)
+		return found[similar], scores[similar]
+
+BACKENDS = {
+	"exact":ExactSearch,
+	"lsh":LSHSearch,
+	"ivf":IVFSearch
+}
+
+def make_backend(name, index, **params):
+	"""
+	Builds a search backend by name
+	-----
+	name:
+		'exact', 'lsh' or 'ivf'
+	index:
+		SimilarityIndex of the catalog
+	params:
+		Options of the backend, e.g. n_tables for 'lsh'
+	"""
+
+	if name not in BACKENDS:
+		raise ValueError("backend must be one of " + ", ".join(BACKENDS)
+			+ ", got " + repr(name))
+	return BACKENDS[name](index, **params)
@@ -0,0 +1,301 @@
+"""
+Batch Recommendations
+	- Finds the top k similar courses of every course in the catalog
+	- Multiplies the similarity index one block of rows at a time, so
+	  memory is bounded by block_size x number of courses
+	- Neighbours are ranked by similarity blended with the course
+	  signals of ranking, added to every block as one precomputed row
+	- Stores neighbours and scores as a compressed .npz file
+	- Recommends unseen courses to learner profiles the same way, one
+	  block of profiles per matrix product, e.g. for the weekly emails
+
+Run from the repository root with
+	python batch_recommender.py [--profiles learners.jsonl]
+where every line of the profiles file is a learner, e.g.
+	{"learner":"42", "courses":{"https://...":2, "https://...":1}}
+or with a list of course URLs weighted alike.
+"""
+
+import argparse
+import json
+import numpy as np
+import os
+
+from concurrent.futures import ProcessPoolExecutor
+from dataset import load_dataset
+from features import get_vectors
+from similarity_index import dense, profile_vectors, profile_weights, row_lookup
+from ranking import DEFAULT_WEIGHTS, Ranker
+
+DESTINATION_PATH = os.path.join("data/similar-courses.npz")
+PROFILES_DESTINATION_PATH = os.path.join("data/profile-recommendations.npz")
+
+# similarity matrix and ranker shared with the worker processes
+_MATRIX = None
+_RANKER = None
+
+def _init_worker(matrix, ranker=None):
+	global _MATRIX, _RANKER
+	_MATRIX = matrix
+	_RANKER = ranker
+
+def block_top_k(matrix, start, stop, k, ranker=None):
+	"""
+	Top k neighbours of the rows start to stop
+	-----
+	matrix:
+		Row-normalised matrix of the similarity index, sparse or dense
+	start, stop:
+		Row range of the block
+	k:
+		Number of neighbours per course
+	ranker:
+		Ranker blending the similarities, plain similarity if None
+	"""
+
+	# dense only for the block, never the full N x N matrix
+	block = dense(matrix[start:stop].dot(matrix.T))
+	if ranker is not None:
+		# the prior row broadcasts over every course of the block
+		block = ranker.blend(block)
+	rows = np.arange(stop - start)
+	# a course is not its own neighbour
+	block[rows, rows + start] = -np.inf
+	return top_k_rows(block, k)
+
+def profile_top_k(matrix, profiles, k, ranker=None):
+	"""
+	Top k unseen courses of a block of profiles
+	-----
+	matrix:
+		Row-normalised matrix of the similarity index, sparse or dense
+	profiles:
+		Weights of the courses of every profile, see profile_weights
+	k:
+		Number of courses per profile
+	ranker:
+		Ranker blending the similarities, plain similarity if None
+	"""
+
+	vectors = profile_vectors(matrix, profiles)
+	block = dense(vectors.dot(matrix.T))
+	if ranker is not None:
+		block = ranker.blend(block)
+	# the courses of a profile are never recommended to it
+	taken = np.repeat(np.arange(profiles.shape[0]), np.diff(profiles.indptr))
+	block[taken, profiles.indices] = -np.inf
+	return top_k_rows(block, k)
+
+def top_k_rows(block, k):
+	"""
+	Positions and scores of the k highest scores of every row, highest
+	first
+	-----
+	block:
+		Dense scores, one row per query
+	k:
+		Number of positions per row
+	"""
+
+	part = np.argpartition(-block, k - 1, axis=1)[:, :k]
+	part_scores = np.take_along_axis(block, part, axis=1)
+	order = np.lexsort((part, -part_scores), axis=1)
+
+	neighbours = np.take_along_axis(part, order, axis=1)
+	scores = np.take_along_axis(part_scores, order, axis=1)
+	return neighbours.astype(np.int32), scores.astype(np.float32)
+
+def _worker_block(bounds):
+	start, stop, k = bounds
+	return block_top_k(_MATRIX, start, stop, k, _RANKER)
+
+def _worker_profiles(bounds):
+	profiles, k = bounds
+	return profile_top_k(_MATRIX, profiles, k, _RANKER)
+
+def similar_courses(df, k=10, block_size=256, processes=1, representation='svd',
+					ranking=None):
+	"""
+	Top k similar courses of every course
+	-----
+	df:
+		Prepared dataframe
+	k:
+		Number of neighbours per course
+	block_size:
+		Number of courses scored per sparse matrix product
+	processes:
+		Number of worker processes, blocks are scored in parallel if > 1
+	representation:
+		'svd' feature vectors or 'keywords' counts, see features
+	ranking:
+		Weights of similarity and of the course signals, see ranking;
+		None for similarity only
+	"""
+
+	matrix = get_vectors(df, representation).matrix
+	ranker = Ranker(df, ranking) if ranking else None
+	n = matrix.shape[0]
+	k = min(k, n - 1)
+	if(k < 1):
+		return np.zeros((n, 0), np.int32), np.zeros((n, 0), np.float32)
+	bounds = [(start, min(start + block_size, n), k)
+		for start in range(0, n, block_size)]
+
+	if(processes > 1):
+		with ProcessPoolExecutor(processes, initializer=_init_worker,
+								initargs=(matrix, ranker)) as pool:
+			blocks = list(pool.map(_worker_block, bounds))
+	else:
+		blocks = [block_top_k(matrix, start, stop, k, ranker)
+			for start, stop, k in bounds]
+
+	neighbours = np.vstack([b[0] for b in blocks])
+	scores = np.vstack([b[1] for b in blocks])
+	return neighbours, scores
+
+def profile_recommendations(df, profiles, weights=None, k=10, block_size=256,
+							processes=1, representation='svd', ranking=None):
+	"""
+	Top k unseen courses of every learner profile
+	-----
+	df:
+		Prepared dataframe
+	profiles:
+		Row positions of the courses every learner took
+	weights:
+		Weights of the courses of every profile, 1 for all if None
+	k:
+		Number of courses per profile
+	block_size:
+		Number of profiles scored per matrix product
+	processes:
+		Number of worker processes, blocks are scored in parallel if > 1
+	representation:
+		'svd' feature vectors or 'keywords' counts, see features
+	ranking:
+		Weights of similarity and of the course signals, see ranking;
+		None for similarity only
+
+	A profile without courses is ranked by the course signals alone.
+	"""
+
+	matrix = get_vectors(df, representation).matrix
+	ranker = Ranker(df, ranking) if ranking else None
+	n = matrix.shape[0]
+	weights = profile_weights(profiles, n, weights)
+	# every profile must have k courses left
+	k = min(k, n - max([len(rows) for rows in profiles] or [0]))
+	if(k < 1):
+		m = len(profiles)
+		return np.zeros((m, 0), np.int32), np.zeros((m, 0), np.float32)
+	bounds = [(weights[start:start + block_size], k)
+		for start in range(0, weights.shape[0], block_size)]
+
+	if(processes > 1):
+		with ProcessPoolExecutor(processes, initializer=_init_worker,
+								initargs=(matrix, ranker)) as pool:
+			blocks = list(pool.map(_worker_profiles, bounds))
+	else:
+		blocks = [profile_top_k(matrix, block, k, ranker)
+			for block, k in bounds]
+
+	if not blocks:
+		return np.zeros((0, k), np.int32), np.zeros((0, k), np.float32)
+	neighbours = np.vstack([b[0] for b in blocks])
+	scores = np.vstack([b[1] for b in blocks])
+	return neighbours, scores
+
+def read_profiles(df, path):
+	"""
+	Learners of a JSON lines file with the row positions and weights of
+	their courses, courses missing from the catalog are left out
+	-----
+	df:
+		Prepared dataframe
+	path:
+		One {"learner":..., "courses":[url, ...] or {url: weight}} per line
+	"""
+
+	rows_of = row_lookup(df['course_url'])
+	learners, profiles, weights = [], [], []
+	with open(path) as f:
+		for line in f:
+			if not line.strip():
+				continue
+			learner = json.loads(line)
+			courses = learner['courses']
+			if not isinstance(courses, dict):
+				courses = dict.fromkeys(courses, 1)
+			known = [url for url in courses if url in rows_of]
+			learners.append(str(learner['learner']))
+			profiles.append([rows_of[url] for url in known])
+			weights.append([float(courses[url]) for url in known])
+	return learners, profiles, weights
+
+def save_profile_recommendations(df, learners, neighbours, scores,
+								destination_path=PROFILES_DESTINATION_PATH):
+	"""
+	Stores the recommendations of every learner as columnar arrays
+	-----
+	df:
+		Prepared dataframe the recommendations were computed for
+	learners:
+		Id of every learner, in the order of the rows of neighbours
+	neighbours:
+		Row positions of the recommended courses, one row per learner
+	scores:
+		Score of each recommended course
+	destination_path:
+		Destination .npz file
+	"""
+
+	np.savez_compressed(destination_path,
+		learner=np.asarray(learners, dtype=str),
+		course_url=np.asarray(df['course_url'], dtype=str),
+		neighbours=neighbours,
+		scores=scores)
+
+def save_similar_courses(df, neighbours, scores, destination_path=DESTINATION_PATH):
+	"""
+	Stores the neighbour table as columnar arrays
+	-----
+	df:
+		Prepared dataframe the neighbours were computed for
+	neighbours:
+		Row positions of the neighbours, one row per course
+	scores:
+		Cosine similarity of each neighbour, blended if ranked
+	destination_path:
+		Destination .npz file
+	"""
+
+	np.savez_compressed(destination_path,
+		course_url=np.asarray(df['course_url'], dtype=str),
+		neighbours=neighbours,
+		scores=scores)
+
+def main():
+
+	parser = argparse.ArgumentParser(description="CouReco batch recommendations")
+	parser.add_argument("--profiles", default=None,
+		help="JSON lines of learners to recommend to, instead of similar courses")
+	parser.add_argument("--k", type=int, default=10)
+	args = parser.parse_args()
+
+	# prepared by data_preparation.py
+	df = load_dataset()
+
+	if args.profiles:
+		learners, profiles, weights = read_profiles(df, args.profiles)
+		neighbours, scores = profile_recommendations(df, profiles, weights,
+			k=args.k, processes=os.cpu_count(), ranking=DEFAULT_WEIGHTS)
+		save_profile_recommendations(df, learners, neighbours, scores)
+		return
+
+	neighbours, scores = similar_courses(df, k=args.k, processes=os.cpu_count(),
+		ranking=DEFAULT_WEIGHTS)
+	save_similar_courses(df, neighbours, scores)
+
+if __name__=="__main__":
+	main()
@@ -0,0 +1,82 @@
+"""
+Compares the approximate search backends with exact search
+	- recall@k of LSH and IVF against the exact neighbours
+	- mean and p99 query latency of every backend
+	- with and without restricting candidates to a skill filter
+
+Run from the repository root with
+	python -m benchmarks.bench_ann [rows] [queries]
+"""
+
+import sys
+import time
+import numpy as np
+
+from ann_index import ExactSearch, IVFSearch, LSHSearch
+from benchmarks.catalog import raw_catalog
+from similarity_index import SimilarityIndex, vectorize
+from skill_index import SkillIndex
+
+K = 10
+
+def timed_search(backend, queries, rows=None):
+	"""
+	Neighbour sets and latencies in seconds of a set of queries
+	"""
+
+	results = []
+	latencies = []
+	for row in queries:
+		start = time.perf_counter()
+		found, _ = backend.search(row, K, rows)
+		latencies.append(time.perf_counter() - start)
+		results.append(set(found.tolist()))
+	return results, np.array(latencies)
+
+def report(name, exact, approx=None):
+	exact_sets, _ = exact
+	sets, times = approx or exact
+	recall = np.mean([len(e & a) / max(len(e), 1)
+		for e, a in zip(exact_sets, sets)])
+	print("  " + name + ": recall@" + str(K) + " " + format(recall, ".3f")
+		+ ", " + format(times.mean() * 1000, ".2f") + " ms (p99 "
+		+ format(np.percentile(times, 99) * 1000, ".2f") + ")")
+
+def build(name, backend, *args, **params):
+	start = time.perf_counter()
+	search = backend(*args, **params)
+	print(name + " built in " + format(time.perf_counter() - start, ".1f") + "s")
+	return search
+
+def main():
+
+	n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+	n_queries = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+	raw = raw_catalog(n)
+	matrix, vocabulary = vectorize(raw['Description'])
+	index = SimilarityIndex(matrix, vocabulary, list(raw['Course URL']))
+
+	exact = ExactSearch(index)
+	lsh = build("lsh", LSHSearch, index)
+	ivf = build("ivf", IVFSearch, index)
+
+	# a filter on less common skills, popular ones cover most of the catalog
+	skills = SkillIndex(raw['Skills'].fillna('Missing').str.split(','))
+	chosen = [skill for skill, _ in skills.vocabulary()[20:40]]
+	rows = skills.rows(chosen)
+
+	queries = np.random.default_rng(1).integers(0, n, n_queries)
+	for name, allowed in [("whole catalog", None),
+			("skill filter (" + str(len(rows)) + " rows)", rows)]:
+		print(name + ", " + str(n) + " rows")
+		truth = timed_search(exact, queries, allowed)
+		report("exact", truth)
+		report("lsh", truth, timed_search(lsh, queries, allowed))
+		for n_probe in [1, 4, 16, 32]:
+			ivf.n_probe = n_probe
+			report("ivf n_probe=" + str(n_probe), truth,
+				timed_search(ivf, queries, allowed))
+
+if __name__=="__main__":
+	main()
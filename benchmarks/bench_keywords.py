@@ -0,0 +1,50 @@
+"""
+Benchmarks keyword extraction on synthetic descriptions
+	- before: the serial RAKE loop
+	- after: chunks across a process pool
+	- refresh: a second run answered by the keyword store, with a share
+	  of the descriptions changed
+
+Run from the repository root with
+	python -m benchmarks.bench_keywords [rows] [processes]
+"""
+
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+
+from benchmarks.catalog import topic_descriptions
+from keywords import KeywordStore, iter_keywords
+
+def timed(name, texts, **params):
+	start = time.perf_counter()
+	count = sum(1 for _ in iter_keywords(texts, **params))
+	elapsed = time.perf_counter() - start
+	print(name + ": " + format(elapsed, ".2f") + "s, "
+		+ format(count / elapsed, ".0f") + " descriptions/s")
+
+def main():
+
+	n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+	processes = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count()
+
+	rng = np.random.default_rng(0)
+	texts = topic_descriptions(n, rng)
+	timed("serial", texts)
+	timed(str(processes) + " processes", texts, processes=processes)
+
+	with tempfile.TemporaryDirectory() as directory:
+		path = os.path.join(directory, "keywords.jsonl")
+		timed("first build with store", texts, processes=processes,
+			store=KeywordStore(path))
+		# 5% of the courses changed their description since
+		changed = list(texts)
+		for i in rng.choice(n, n // 20, replace=False):
+			changed[i] = changed[i] + " updated"
+		timed("refresh, 5% changed", changed, processes=processes,
+			store=KeywordStore(path))
+
+if __name__=="__main__":
+	main()
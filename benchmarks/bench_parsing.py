@@ -0,0 +1,101 @@
+"""
+Benchmarks the page parsing of both scrapers on saved HTML fixtures
+	- before: BeautifulSoup with html.parser, one search per field
+	- after: page_parser single pass over the lxml tree
+
+Run from the repository root with
+	python -m benchmarks.bench_parsing
+"""
+
+import os
+import time
+
+from bs4 import BeautifulSoup
+from scraper import DataMaker
+from course_scraper import DataHunter
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+def read_fixture(name):
+	with open(os.path.join(FIXTURES, name), 'rb') as f:
+		return f.read()
+
+def legacy_listing(content):
+	"""
+	Parsing part of the original DataMaker.scrape_features
+	"""
+
+	course_list_soup = BeautifulSoup(content, 'html.parser')
+	cnames = course_list_soup.select(".headline-1-text")
+	pnames = course_list_soup.select(".horizontal-box > .partner-name")
+	links = course_list_soup.select(
+		".ais-InfiniteHits > .ais-InfiniteHits-list > .ais-InfiniteHits-item"
+	)
+	products = []
+	for i in range(10):
+		learn_pdcts = course_list_soup.find_all('div', '_jen3vs _1d8rgfy3')
+		products.append(learn_pdcts[i].text)
+	cratings = course_list_soup.select(".ratings-text")
+	cnumratings = course_list_soup.select(".ratings-count")
+	enrollers = course_list_soup.select(".enrollment-number")
+	difficulty = course_list_soup.select(".difficulty")
+	return [(cnames[i].text, pnames[i].text, links[i].a["href"], products[i],
+		cratings[i].text, cnumratings[i].text, enrollers[i].text,
+		difficulty[i].text) for i in range(10)]
+
+def legacy_course(content):
+	"""
+	Parsing part of the original DataHunter.scrape_features
+	"""
+
+	course_soup = BeautifulSoup(content, 'html.parser')
+	cskills = course_soup.find_all("span", "_x4x75x")
+	cdescr = course_soup.select(".description")
+	learn_stats = course_soup.select(
+		"._1qfi0x77 > .LearnerOutcomes__text-wrapper > .LearnerOutcomes__percent"
+	)
+	props = course_soup.select("._16ni8zai")
+	instructors = course_soup.select(".instructor-name")
+	return ([s.text for s in cskills], cdescr[0].text,
+		[s.text for s in learn_stats], [p.text for p in props],
+		[i.text for i in instructors])
+
+def pages_per_second(fn, content, seconds=2.0):
+	"""
+	Throughput of a parsing function on one page
+	-----
+	fn:
+		Function of the page content
+	content:
+		HTML of the page
+	seconds:
+		Minimum time to keep parsing for
+	"""
+
+	fn(content)
+	pages = 0
+	start = time.perf_counter()
+	while(time.perf_counter() - start < seconds):
+		fn(content)
+		pages += 1
+	return pages / (time.perf_counter() - start)
+
+def main():
+
+	listing = read_fixture("listing-page.html")
+	course = read_fixture("course-page.html")
+	dm = DataMaker("", 1, 1)
+	dh = DataHunter(None)
+
+	cases = [
+		("listing page", legacy_listing, dm.parse_features, listing),
+		("course page", legacy_course, lambda c: dh.parse_features("", c), course)
+	]
+	for name, before, after, content in cases:
+		old = pages_per_second(before, content)
+		new = pages_per_second(after, content)
+		print(name + ": " + format(old, ".1f") + " -> " + format(new, ".1f")
+			+ " pages/s (" + format(new / old, ".1f") + "x)")
+
+if __name__=="__main__":
+	main()
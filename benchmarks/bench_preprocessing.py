@@ -0,0 +1,83 @@
+"""
+Benchmarks prepare_data on a synthetic catalog
+	- before: row-wise .apply callbacks of the original prepare_data
+	- after: vectorized preprocessing.prepare_data
+
+Run from the repository root with
+	python -m benchmarks.bench_preprocessing [rows]
+"""
+
+import sys
+import time
+import numpy as np
+
+import preprocessing
+from benchmarks.catalog import raw_catalog
+
+def legacy_prepare_data(df):
+	"""
+	The original prepare_data, without the CSV export
+	"""
+
+	df.columns = preprocessing.clean_col_names(df.columns)
+	df['skills'] = df['skills'].fillna('Missing')
+	df['instructors'] = df['instructors'].fillna('Missing')
+
+	def make_numeric(x):
+		if(x=='Missing'):
+			return np.nan
+		return float(x)
+
+	df['course_rating'] = df['course_rating'].apply(make_numeric)
+	df['course_rated_by'] = df['course_rated_by'].apply(make_numeric)
+	df['percentage_of_new_career_starts'] = df['percentage_of_new_career_starts'].apply(make_numeric)
+	df['percentage_of_pay_increase_or_promotion'] = df['percentage_of_pay_increase_or_promotion'].apply(make_numeric)
+
+	def make_count_numeric(x):
+		if('k' in x):
+			return (float(x.replace('k','')) * 1000)
+		elif('m' in x):
+			return (float(x.replace('m','')) * 1000000)
+		elif('Missing' in x):
+			return (np.nan)
+
+	df['enrolled_student_count'] = df['enrolled_student_count'].apply(make_count_numeric)
+
+	def find_time(x):
+		l = x.split(' ')
+		idx = 0
+		for i in range(len(l)):
+			if(l[i].isdigit()):
+				idx = i
+		try:
+			return (l[idx] + ' ' + l[idx+1])
+		except:
+			return l[idx]
+
+	df['estimated_time_to_complete'] = df['estimated_time_to_complete'].apply(find_time)
+
+	def split_it(x):
+		return (x.split(','))
+
+	df['skills'] = df['skills'].apply(split_it)
+	df['instructors'] = df['instructors'].apply(split_it)
+	return df
+
+def main():
+
+	rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+	raw = raw_catalog(rows)
+
+	start = time.perf_counter()
+	legacy_prepare_data(raw.copy())
+	old = time.perf_counter() - start
+
+	start = time.perf_counter()
+	preprocessing.prepare_data(raw)
+	new = time.perf_counter() - start
+
+	print("prepare_data on " + str(rows) + " rows: " + format(old, ".2f")
+		+ "s -> " + format(new, ".2f") + "s (" + format(old / new, ".1f") + "x)")
+
+if __name__=="__main__":
+	main()
@@ -0,0 +1,99 @@
+"""
+Load test of the recommendation service
+	- starts service.py with the given number of workers
+	- fires /filter and /similar requests from concurrent client processes
+	- reports throughput and latency percentiles per endpoint
+
+Run from the repository root with
+	python -m benchmarks.bench_service [workers] [clients] [requests]
+"""
+
+import multiprocessing
+import random
+import subprocess
+import sys
+import time
+import numpy as np
+import requests
+
+from dataset import load_dataset
+
+PORT = 8765
+
+def wait_until_up(url, timeout=120):
+	start = time.time()
+	while(time.time() - start < timeout):
+		try:
+			requests.get(url + "/skills", timeout=1)
+			return
+		except requests.ConnectionError:
+			time.sleep(0.2)
+	raise RuntimeError("service did not start")
+
+def run_client(args):
+	"""
+	Sends requests one after another over a keep-alive session
+	"""
+
+	url, chunk = args
+	session = requests.Session()
+	latencies = []
+	for path in chunk:
+		start = time.perf_counter()
+		session.get(url + path).raise_for_status()
+		latencies.append(time.perf_counter() - start)
+	return latencies
+
+def load_test(url, paths, clients):
+	"""
+	Latencies of all requests in seconds, and the wall time taken
+	-----
+	url:
+		Base URL of the service
+	paths:
+		Request paths with their query strings
+	clients:
+		Number of concurrent client processes
+	"""
+
+	chunks = [(url, paths[i::clients]) for i in range(clients)]
+	with multiprocessing.Pool(clients) as pool:
+		start = time.perf_counter()
+		results = pool.map(run_client, chunks)
+		wall = time.perf_counter() - start
+	return np.concatenate([np.array(r) for r in results]), wall
+
+def main():
+
+	workers = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+	clients = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+	n_requests = int(sys.argv[3]) if len(sys.argv) > 3 else 2000
+
+	df = load_dataset()
+	rng = random.Random(0)
+	names = list(df['course_name'])
+	skills = [s for skill_list in df['skills'] for s in skill_list]
+	queries = {
+		"/filter":["/filter?" + "&".join("skills=" + requests.utils.quote(s)
+			for s in rng.sample(skills, 3)) for _ in range(n_requests)],
+		"/similar":["/similar?k=5&course=" + requests.utils.quote(rng.choice(names))
+			for _ in range(n_requests)]
+	}
+
+	url = "http://127.0.0.1:" + str(PORT)
+	server = subprocess.Popen([sys.executable, "service.py", "--port", str(PORT),
+		"--workers", str(workers)])
+	try:
+		wait_until_up(url)
+		for endpoint, paths in queries.items():
+			latencies, wall = load_test(url, paths, clients)
+			p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+			print(endpoint + ": " + format(len(latencies) / wall, ".0f") + " req/s, p50 "
+				+ format(p50, ".2f") + " ms, p99 " + format(p99, ".2f") + " ms ("
+				+ str(workers) + " workers, " + str(clients) + " clients)")
+	finally:
+		server.terminate()
+		server.wait()
+
+if __name__=="__main__":
+	main()
@@ -0,0 +1,110 @@
+"""
+Synthetic Coursera catalogs for the benchmarks
+
+The frames have the columns and value formats of the two scraped files
+side by side, so they go through the same preprocessing as real data.
+"""
+
+import pandas as pd
+import numpy as np
+
+PARTNERS = ['IBM', 'Google', 'Stanford University', 'University of Michigan',
+	'DeepLearning.AI', 'Johns Hopkins University', 'Duke University',
+	'Yale University', 'University of Illinois at Urbana-Champaign',
+	'Imperial College London']
+PRODUCTS = ['COURSE', 'SPECIALIZATION', 'PROFESSIONAL CERTIFICATE']
+DIFFICULTIES = ['Beginner', 'Intermediate', 'Advanced', 'Mixed']
+WORDS = ['data', 'science', 'python', 'learning', 'machine', 'analysis',
+	'statistics', 'business', 'marketing', 'design', 'cloud', 'computing',
+	'security', 'finance', 'health', 'writing', 'project', 'management',
+	'leadership', 'programming', 'web', 'development', 'deep', 'neural',
+	'network', 'visualization', 'sql', 'database', 'excel', 'modeling']
+
+def topic_descriptions(n, rng, n_topics=None, length=40):
+	"""
+	Descriptions drawn from topics, so similar courses share their terms
+	-----
+	n:
+		Number of descriptions
+	rng:
+		numpy random generator
+	n_topics:
+		Number of topics, each with its own 100 terms; by default one
+		per 100 courses, like small clusters of related courses
+	length:
+		Words per description
+	"""
+
+	if n_topics is None:
+		n_topics = max(n // 100, 10)
+	n_terms = n_topics * 100
+	terms = np.array(["term" + str(i) for i in range(n_terms)] + WORDS)
+	topic_terms = rng.permutation(n_terms).reshape(n_topics, 100)
+	topics = rng.integers(0, n_topics, n)
+
+	# 70% topical terms, the rest from the general vocabulary
+	words = topic_terms[topics[:, None], rng.integers(0, 100, (n, length))]
+	general = rng.random((n, length)) < 0.3
+	words[general] = n_terms + rng.integers(0, len(WORDS), general.sum())
+	return [" ".join(terms[w]) + "." for w in words]
+
+def raw_catalog(n, seed=0, n_skills=2000):
+	"""
+	Raw catalog of n courses
+	-----
+	n:
+		Number of courses
+	seed:
+		Seed of the random generator
+	n_skills:
+		Size of the skill vocabulary
+	"""
+
+	rng = np.random.default_rng(seed)
+	ids = np.arange(n).astype(str)
+	skill_names = np.array(["Skill " + str(i) for i in range(n_skills)])
+
+	def pick(values, p_missing=0.0):
+		column = np.asarray(values, dtype=object)[rng.integers(0, len(values), n)]
+		if p_missing:
+			column[rng.random(n) < p_missing] = 'Missing'
+		return column
+
+	ratings = np.round(rng.uniform(3.5, 5.0, n), 1).astype(str).astype(object)
+	ratings[rng.random(n) < 0.05] = 'Missing'
+	rated_by = rng.integers(10, 100000, n).astype(str).astype(object)
+	rated_by[rng.random(n) < 0.05] = 'Missing'
+	enrolled = np.char.add(rng.integers(1, 999, n).astype(str),
+		np.where(rng.random(n) < 0.95, 'k', 'm')).astype(object)
+	enrolled[rng.random(n) < 0.01] = 'Missing'
+	careers = rng.integers(1, 60, n).astype(str).astype(object)
+	careers[rng.random(n) < 0.6] = 'Missing'
+	pay = rng.integers(1, 40, n).astype(str).astype(object)
+	pay[rng.random(n) < 0.6] = 'Missing'
+	times = np.char.add(np.char.add("Approx. ", rng.integers(1, 60, n).astype(str)),
+		np.where(rng.random(n) < 0.6, " hours to complete", " months to complete"))
+
+	# skewed skill popularity, like the real catalog
+	counts = rng.integers(0, 8, n)
+	flat = skill_names[np.minimum(rng.zipf(1.3, counts.sum()) - 1, n_skills - 1)]
+	offsets = np.concatenate([[0], np.cumsum(counts)])
+	skills = [",".join(flat[offsets[i]:offsets[i + 1]]) or np.nan for i in range(n)]
+
+	descriptions = topic_descriptions(n, rng)
+
+	return pd.DataFrame({
+		"Course URL":np.char.add("https://www.coursera.org/learn/course-", ids),
+		"Course Name":np.char.add("Course ", ids),
+		"Learning Product Type":pick(PRODUCTS),
+		"Course Provided By":pick(PARTNERS),
+		"Course Rating":ratings,
+		"Course Rated By":rated_by,
+		"Enrolled Student Count":enrolled,
+		"Course Difficulty":pick(DIFFICULTIES),
+		"Skills":skills,
+		"Description":descriptions,
+		"Percentage of new career starts":careers,
+		"Percentage of pay increase or promotion":pay,
+		"Estimated Time to Complete":times.astype(object),
+		"Instructors":pick(["Instructor " + str(i) for i in range(500)])
+	})
@@ -0,0 +1,386 @@
+"""
+Benchmark Harness
+	- Times every stage, from page parsing to recommendations, on
+	  synthetic catalogs of 1k, 10k, 100k and 1M courses
+	- Queries go through service.Recommender as the app and the service
+	  do: facet queries, similar courses on SVD features with the
+	  ranking blend and the subset cache, and learner profiles
+	- Reports the best time of at least three runs, how far the median
+	  run is above it, and the peak traced memory
+	- Saves the results as the baseline, or compares them with the stored
+	  baseline and exits with an error when a stage got slower or bigger
+	  beyond the tolerance and the spread of the runs, twice in a row
+
+Run from the repository root with
+	python -m benchmarks.harness [--sizes 1000 10000] [--cases prepare_data]
+	python -m benchmarks.harness --save-baseline
+
+Timings only compare on the machine the baseline was saved on.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+
+from sklearn.decomposition import TruncatedSVD
+from sklearn.preprocessing import normalize
+
+import preprocessing
+from benchmarks.catalog import raw_catalog
+from course_scraper import DataHunter
+from facets import CATEGORY_FACETS
+from features import DEFAULT_CONFIG, FeatureIndex
+from http_client import HttpCache, cached_response
+from keywords import iter_keywords
+from scraper import DataMaker
+from search_index import build_search
+from service import Recommender
+from similarity_index import recommendations, vectorize
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+SIZES = [1000, 10000, 100000, 1000000]
+DEFAULT_SIZES = [1000, 10000, 100000]
+QUERIES = 100
+
+# name -> (setup, largest size it runs at)
+CASES = {}
+_CATALOGS = {}
+
+def case(name, max_size=None):
+	"""
+	Registers a benchmark; the decorated function takes the catalog size
+	and returns the function to time
+	"""
+
+	def register(setup):
+		CASES[name] = (setup, max_size)
+		return setup
+
+	return register
+
+def catalog(n):
+	"""
+	Raw synthetic catalog of n courses, generated once per run
+	"""
+
+	if n not in _CATALOGS:
+		_CATALOGS[n] = raw_catalog(n)
+	return _CATALOGS[n]
+
+def prepared(n):
+
+	key = ("prepared", n)
+	if key not in _CATALOGS:
+		_CATALOGS[key] = preprocessing.prepare_data(catalog(n))
+	return _CATALOGS[key]
+
+def recommender(n):
+	"""
+	Recommender of the prepared catalog of n courses with the default
+	ranking, built once per run and never stored
+	"""
+
+	key = ("recommender", n)
+	if key not in _CATALOGS:
+		df = prepared(n)
+		# SVD of the description words, which stand in for RAKE keywords
+		# that would make the setup of the large catalogs take hours
+		matrix, _ = vectorize(df['description'])
+		dimensions = max(min(DEFAULT_CONFIG['dimensions'], min(matrix.shape) - 1), 1)
+		svd = TruncatedSVD(n_components=dimensions, random_state=0)
+		vectors = normalize(svd.fit_transform(matrix)).astype(np.float32)
+		features = FeatureIndex(vectors, DEFAULT_CONFIG, list(df['course_url']))
+		_CATALOGS[key] = Recommender(df, similarity=features,
+			text_index=build_search(df))
+	return _CATALOGS[key]
+
+def clear_caches(rec):
+	"""
+	Empties the query caches, so every run computes the same queries
+	"""
+
+	for cache in [rec.filter_cache, rec.facet_cache, rec.search_cache,
+			rec.subset_cache, rec.similar_cache, rec.profile_cache]:
+		cache.clear()
+
+def skill_choices(rec, count, rng):
+	"""
+	count lists of three skills of the catalog
+	"""
+
+	vocabulary = [skill for skill, _ in rec.skill_vocabulary()]
+	return [list(rng.choice(vocabulary, 3)) for _ in range(count)]
+
+def offline_client(name, url):
+	"""
+	Temporary directory with an HttpCache holding a fixture page for url
+	"""
+
+	directory = tempfile.TemporaryDirectory()
+	cache = HttpCache(directory.name)
+	with open(os.path.join(FIXTURES, name), 'rb') as f:
+		cache.store(url, cached_response(url, {}, f.read()))
+	return directory, cache
+
+@case("scrape_listing", max_size=10000)
+def scrape_listing(n):
+	url = "https://www.coursera.org/courses?page=1"
+	directory, cache = offline_client("listing-page.html", url)
+	dm = DataMaker("", 1, 1, rate_limit=None, cache=cache, offline=True)
+	pages = max(n // 10, 1)
+
+	def run():
+		for _ in range(pages):
+			dm.scrape_features(url)
+
+	# the cache directory lives as long as the benchmark
+	run.directory = directory
+	return run
+
+@case("scrape_course", max_size=10000)
+def scrape_course(n):
+	url = "https://www.coursera.org/learn/sample-course"
+	directory, cache = offline_client("course-page.html", url)
+	dh = DataHunter(None, rate_limit=None, cache=cache, offline=True)
+
+	def run():
+		for _ in range(n):
+			dh.scrape_features(url)
+
+	run.directory = directory
+	return run
+
+@case("prepare_data")
+def prepare_data(n):
+	raw = catalog(n)
+	return lambda: preprocessing.prepare_data(raw)
+
+@case("query")
+def facet_query(n):
+	# skills with one category and a minimum rating, counts included
+	rec = recommender(n)
+	rng = np.random.default_rng(0)
+	choices = skill_choices(rec, QUERIES, rng)
+	df = rec.df
+	categories = [{facet:[rng.choice(df[facet].cat.categories)]}
+		for facet in rng.choice(CATEGORY_FACETS, QUERIES)]
+	ratings = rng.choice([None, 3.5, 4, 4.5], QUERIES)
+
+	def run():
+		clear_caches(rec)
+		for chosen, chosen_categories, rating in zip(choices, categories, ratings):
+			rec.query(chosen, 'any', chosen_categories,
+				{"course_rating":(rating, None)})
+
+	return run
+
+@case("extract_keywords", max_size=100000)
+def extract_keywords(n):
+	texts = list(catalog(n)['Description'])
+	return lambda: sum(1 for _ in iter_keywords(texts))
+
+@case("similar")
+def similar(n):
+	# half over the whole catalog, half browsing several courses under
+	# each of a few skill filters, whose matrix slice is cached
+	rec = recommender(n)
+	rng = np.random.default_rng(0)
+	courses = rec.course_names[rng.integers(0, n, QUERIES)]
+	filters = skill_choices(rec, 10, rng)
+	chosen = [None] * (QUERIES // 2) + [filters[i % len(filters)]
+		for i in range(QUERIES - QUERIES // 2)]
+
+	def run():
+		clear_caches(rec)
+		for course, options in zip(courses, chosen):
+			rec.similar(course, 5, options)
+
+	return run
+
+@case("profile")
+def profile(n):
+	# learners of three to five courses, every other one filtered by skills
+	rec = recommender(n)
+	rng = np.random.default_rng(0)
+	taken = [list(rec.course_names[rng.integers(0, n, rng.integers(3, 6))])
+		for _ in range(QUERIES)]
+	filters = skill_choices(rec, QUERIES, rng)
+
+	def run():
+		clear_caches(rec)
+		for i, courses in enumerate(taken):
+			rec.profile(courses, 10, None, filters[i] if i % 2 else None)
+
+	return run
+
+@case("recommendations")
+def top_k(n):
+	scores = np.random.default_rng(0).random(n)
+
+	def run():
+		for _ in range(QUERIES):
+			recommendations(scores, 5)
+
+	return run
+
+def measure(fn, min_repeats=3, max_repeats=10, budget=2.0):
+	"""
+	Best time in seconds, spread of the times and peak traced memory in
+	bytes of fn; the spread is how far the median time is above the
+	best one, relative to it
+	-----
+	fn:
+		Function without arguments
+	min_repeats:
+		Timed runs made whatever they take
+	max_repeats, budget:
+		More runs are made, up to max_repeats, while the runs so far took
+		less than budget seconds
+	"""
+
+	times = []
+	while(len(times) < min_repeats
+			or (len(times) < max_repeats and sum(times) < budget)):
+		start = time.perf_counter()
+		fn()
+		times.append(time.perf_counter() - start)
+
+	# traced apart, tracing slows the run down
+	tracemalloc.start()
+	try:
+		fn()
+		peak = tracemalloc.get_traced_memory()[1]
+	finally:
+		tracemalloc.stop()
+	best = min(times)
+	return best, float(np.median(times)) / best - 1, peak
+
+def run_case(name, n):
+	"""
+	Result of one case at one size, {time, spread, peak_memory}
+	"""
+
+	elapsed, spread, peak = measure(CASES[name][0](n))
+	print(name + " " + str(n) + ": " + format(elapsed, ".4f") + "s (median +"
+		+ format(100 * spread, ".0f") + "%), peak "
+		+ format(peak / 2**20, ".1f") + " MB", flush=True)
+	return {"time":elapsed, "spread":spread, "peak_memory":peak}
+
+def run_cases(names, sizes):
+	"""
+	Results of the chosen cases, {case: {size: {time, spread, peak_memory}}}
+	"""
+
+	results = {}
+	for name in names:
+		max_size = CASES[name][1]
+		for n in sizes:
+			if(max_size is not None and n > max_size):
+				continue
+			results.setdefault(name, {})[str(n)] = run_case(name, n)
+	return results
+
+def compare(results, baseline, tolerance, min_time=0.002, min_memory=2**20):
+	"""
+	Regressions against the baseline, (case, size, metric, old, new)
+	-----
+	tolerance:
+		Allowed relative growth of the time and the peak memory; the
+		time may also grow by the larger spread of the two measurements
+	min_time, min_memory:
+		Absolute growth below which a change is noise
+	"""
+
+	regressions = []
+	for name, by_size in results.items():
+		for n, current in by_size.items():
+			before = baseline.get(name, {}).get(n)
+			if before is None:
+				continue
+			for metric, floor in [("time", min_time), ("peak_memory", min_memory)]:
+				old, new = before[metric], current[metric]
+				allowed = tolerance
+				if(metric == "time"):
+					allowed += max(before.get("spread", 0), current.get("spread", 0))
+				if(new > old * (1 + allowed) and new - old > floor):
+					regressions.append((name, n, metric, old, new))
+	return regressions
+
+def describe(regression):
+
+	name, n, metric, old, new = regression
+	return (name + " " + n + " " + metric + ": " + format(old, ".4g") + " -> "
+		+ format(new, ".4g") + " (+" + format(100 * (new / old - 1), ".0f") + "%)")
+
+def machine():
+
+	return {
+		"processor":platform.processor() or platform.machine(),
+		"python":platform.python_version(),
+		"cpus":os.cpu_count()
+	}
+
+def main():
+
+	parser = argparse.ArgumentParser(description="CouReco benchmarks")
+	parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+		help="catalog sizes, any of " + " ".join(str(n) for n in SIZES))
+	parser.add_argument("--cases", nargs="+", default=list(CASES),
+		choices=list(CASES))
+	parser.add_argument("--save-baseline", action="store_true")
+	parser.add_argument("--baseline", default=BASELINE_PATH)
+	parser.add_argument("--tolerance", type=float, default=0.25)
+	args = parser.parse_args()
+
+	results = run_cases(args.cases, args.sizes)
+
+	if args.save_baseline:
+		stored = {"machine":machine(), "results":{}}
+		if os.path.exists(args.baseline):
+			with open(args.baseline) as f:
+				stored["results"] = json.load(f)["results"]
+		# only the cases and sizes that ran are replaced
+		for name, by_size in results.items():
+			stored["results"].setdefault(name, {}).update(by_size)
+		with open(args.baseline, 'w') as f:
+			json.dump(stored, f, indent=1, sort_keys=True)
+		print("baseline saved to " + args.baseline)
+		return
+
+	if not os.path.exists(args.baseline):
+		print("no baseline at " + args.baseline + ", run with --save-baseline")
+		return
+	with open(args.baseline) as f:
+		stored = json.load(f)
+	if(stored["machine"] != machine()):
+		print("baseline was saved on " + json.dumps(stored["machine"])
+			+ ", timings may not compare")
+
+	regressions = compare(results, stored["results"], args.tolerance)
+	if regressions:
+		# one slow run is noise, the cases must regress again to count
+		print("measuring the " + str(len(regressions)) + " regressions again")
+		for name, n in sorted({(r[0], r[1]) for r in regressions}):
+			again = run_case(name, int(n))
+			first = results[name][n]
+			results[name][n] = {
+				"time":min(first["time"], again["time"]),
+				"spread":max(first["spread"], again["spread"]),
+				"peak_memory":min(first["peak_memory"], again["peak_memory"])
+			}
+		regressions = compare(results, stored["results"], args.tolerance)
+	for regression in regressions:
+		print("REGRESSION " + describe(regression))
+	if regressions:
+		sys.exit(1)
+	print("no regressions against " + args.baseline)
+
+if __name__=="__main__":
+	main()
@@ -0,0 +1,117 @@
+"""
+Caching
+	- resource: builds an expensive object once per process
+	- LRUCache: bounded cache of query results keyed on small immutable
+	  keys, with hit, miss and eviction counts
+
+Unlike st.cache nothing here hashes its arguments, the callers decide
+the keys. Entries live in this module, so they survive Streamlit
+re-running the app script.
+"""
+
+import threading
+
+from collections import OrderedDict
+from functools import wraps
+
+_RESOURCES = {}
+_RESOURCES_LOCK = threading.Lock()
+
+def resource(fn):
+	"""
+	Decorates a function without arguments whose result is built once
+	per process and shared, e.g. the dataset or an index
+	"""
+
+	key = (fn.__module__, fn.__qualname__)
+
+	@wraps(fn)
+	def wrapper():
+		if key not in _RESOURCES:
+			# the lock keeps concurrent first calls from building twice
+			with _RESOURCES_LOCK:
+				if key not in _RESOURCES:
+					_RESOURCES[key] = fn()
+		return _RESOURCES[key]
+
+	return wrapper
+
+def clear_resources():
+	"""
+	Drops every resource, they are rebuilt on their next use
+	"""
+
+	with _RESOURCES_LOCK:
+		_RESOURCES.clear()
+
+class LRUCache:
+	"""
+	Least recently used cache with a fixed number of entries
+	"""
+
+	maxsize = None
+	hits = None
+	misses = None
+	evictions = None
+
+	def __init__(self, maxsize=1024):
+		"""
+		maxsize:
+			Number of entries kept
+		"""
+
+		self.maxsize = maxsize
+		self.entries = OrderedDict()
+		self.lock = threading.Lock()
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+
+	def get(self, key, compute):
+		"""
+		Cached value of key, computed and stored on a miss
+		-----
+		key:
+			Hashable, e.g. a tuple of sorted skills
+		compute:
+			Function without arguments producing the value
+		"""
+
+		with self.lock:
+			if key in self.entries:
+				self.entries.move_to_end(key)
+				self.hits += 1
+				return self.entries[key]
+			self.misses += 1
+
+		# computed outside the lock so other keys are not held up
+		value = compute()
+		with self.lock:
+			self.entries[key] = value
+			self.entries.move_to_end(key)
+			while(len(self.entries) > self.maxsize):
+				self.entries.popitem(last=False)
+				self.evictions += 1
+		return value
+
+	def clear(self):
+		"""
+		Drops every entry, the counters are kept
+		"""
+
+		with self.lock:
+			self.entries.clear()
+
+	def stats(self):
+		"""
+		Entries and counters of the cache
+		"""
+
+		with self.lock:
+			return {
+				"size":len(self.entries),
+				"maxsize":self.maxsize,
+				"hits":self.hits,
+				"misses":self.misses,
+				"evictions":self.evictions
+			}
@@ -0,0 +1,403 @@
+"""
+Coded Lists
+	- Column of string lists, e.g. the skills of every course, held as
+	  two int32 arrays: the offsets of every row and the ids of its items
+	  in a vocabulary shared by all rows
+	- A pandas extension array, so the column slices, joins and prints
+	  like any other column of the prepared dataframe
+	- Converted to and from Arrow list columns without a Python object
+	  per item
+
+Decoding a row gives back its list, or NaN for a missing row, and
+decode_lists gives a copy of a dataframe with plain list columns for
+display. Rows hash as tuples for unique, value_counts and groupby, and
+explode yields one item per row. Series.str is only offered on string
+columns, lengths() gives what .str.len() would.
+"""
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from pandas.api.extensions import (ExtensionArray, ExtensionDtype,
+	register_extension_dtype, take)
+
+@register_extension_dtype
+class CodedListDtype(ExtensionDtype):
+	"""
+	Dtype of CodedLists columns
+	"""
+
+	name = "coded_list"
+	type = list
+	kind = "O"
+	na_value = np.nan
+
+	@classmethod
+	def construct_array_type(cls):
+		return CodedLists
+
+	def __from_arrow__(self, array):
+		return CodedLists.from_arrow(array)
+
+def is_missing(value):
+	"""
+	Whether a scalar stands for a missing list, e.g. None or NaN
+	"""
+
+	return not pd.api.types.is_list_like(value) and pd.isna(value)
+
+def is_list_value(value):
+	"""
+	Whether value is a single list of items rather than a sequence of lists
+	"""
+
+	return isinstance(value, (list, tuple)) \
+		and all(isinstance(item, str) for item in value)
+
+def offsets_of(lengths):
+	"""
+	int32 offsets of rows of the given lengths
+	"""
+
+	offsets = np.zeros(len(lengths) + 1, dtype=np.int32)
+	np.cumsum(lengths, out=offsets[1:])
+	return offsets
+
+class CodedLists(ExtensionArray):
+	"""
+	CSR-style lists of strings over a shared vocabulary
+	"""
+
+	offsets = None # int32, row i holds ids[offsets[i]:offsets[i + 1]]
+	ids = None # int32 positions in vocabulary
+	vocabulary = None # object array of distinct items
+	missing = None # True for missing rows, which hold no items
+
+	def __init__(self, offsets, ids, vocabulary, missing=None):
+		"""
+		offsets:
+			Start of every row in ids, followed by the end of the last
+		ids:
+			Vocabulary positions of the items of all rows
+		vocabulary:
+			Distinct items
+		missing:
+			Missing rows, none if None
+		"""
+
+		self.offsets = np.asarray(offsets, dtype=np.int32)
+		self.ids = np.asarray(ids, dtype=np.int32)
+		self.vocabulary = np.asarray(vocabulary, dtype=object)
+		self.missing = np.zeros(len(self.offsets) - 1, dtype=bool) \
+			if missing is None else np.asarray(missing, dtype=bool)
+
+	@classmethod
+	def from_strings(cls, values, sep=','):
+		"""
+		Codes of separated strings, e.g. 'Python,SQL'
+		-----
+		values:
+			Series of strings, missing values stay missing
+		sep:
+			Separator of the items
+		"""
+
+		values = pd.Series(values, dtype=object)
+		present = values.notna().to_numpy()
+		texts = values[present].tolist()
+		lengths = np.zeros(len(values), dtype=np.int32)
+		lengths[present] = [text.count(sep) + 1 for text in texts]
+		# one split of the joined column, no list per row
+		flat = sep.join(texts).split(sep) if texts else []
+		ids, vocabulary = pd.factorize(np.asarray(flat, dtype=object), sort=True)
+		return cls(offsets_of(lengths), ids, vocabulary, ~present)
+
+	@classmethod
+	def from_lists(cls, values):
+		"""
+		Codes of an iterable of lists, None and NaN are missing
+		"""
+
+		values = list(values)
+		missing = np.array([is_missing(value) for value in values], dtype=bool)
+		lengths = np.array([0 if m else len(value)
+			for value, m in zip(values, missing)], dtype=np.int32)
+		flat = np.empty(lengths.sum(), dtype=object)
+		flat[:] = [item for value, m in zip(values, missing) if not m
+			for item in value]
+		# sorted, so equal catalogs always get the same codes
+		ids, vocabulary = pd.factorize(flat, sort=True)
+		return cls(offsets_of(lengths), ids, vocabulary, missing)
+
+	@classmethod
+	def from_arrow(cls, array):
+		"""
+		Codes of an Arrow list of strings column, chunked or not
+		"""
+
+		if isinstance(array, pa.ChunkedArray):
+			array = pa.concat_arrays(array.chunks) if array.num_chunks \
+				else pa.array([], type=array.type)
+		# offsets and flatten only, no compute kernels, so older pyarrow
+		# releases read the column too
+		lengths = np.diff(np.asarray(array.offsets, dtype=np.int64))
+		missing = np.zeros(len(array), dtype=bool)
+		if array.null_count:
+			# flatten leaves out the items of null lists
+			validity = np.frombuffer(array.buffers()[0], dtype=np.uint8)
+			missing = ~np.unpackbits(validity, bitorder='little')[
+				array.offset:array.offset + len(array)].astype(bool)
+			lengths[missing] = 0
+		flat = array.flatten().dictionary_encode()
+		ids = flat.indices.to_numpy(zero_copy_only=False)
+		vocabulary = np.asarray(flat.dictionary.to_pylist(), dtype=object)
+		# codes follow the sorted vocabulary, as in from_lists
+		order = np.argsort(vocabulary)
+		rank = np.empty(len(order), dtype=np.int32)
+		rank[order] = np.arange(len(order), dtype=np.int32)
+		return cls(offsets_of(lengths), rank[ids] if len(ids) else ids,
+			vocabulary[order], missing)
+
+	# --- pandas extension array interface
+
+	@classmethod
+	def _from_sequence(cls, scalars, dtype=None, copy=False):
+		if isinstance(scalars, cls):
+			return scalars.copy() if copy else scalars
+		return cls.from_lists(scalars)
+
+	@classmethod
+	def _from_factorized(cls, values, original):
+		return cls.from_lists(values)
+
+	@classmethod
+	def _concat_same_type(cls, to_concat):
+		to_concat = list(to_concat)
+		vocabulary = np.unique(np.concatenate([np.zeros(0, dtype=object)]
+			+ [a.vocabulary for a in to_concat]))
+		ids = []
+		for a in to_concat:
+			# recode every array against the merged vocabulary
+			recode = np.searchsorted(vocabulary, a.vocabulary).astype(np.int32)
+			ids.append(recode[a.ids])
+		lengths = np.concatenate([np.zeros(0, dtype=np.int32)]
+			+ [a.lengths() for a in to_concat])
+		missing = np.concatenate([np.zeros(0, dtype=bool)]
+			+ [a.missing for a in to_concat])
+		return cls(offsets_of(lengths),
+			np.concatenate([np.zeros(0, dtype=np.int32)] + ids), vocabulary, missing)
+
+	@property
+	def dtype(self):
+		return CodedListDtype()
+
+	@property
+	def nbytes(self):
+		return self.offsets.nbytes + self.ids.nbytes + self.missing.nbytes \
+			+ sum(len(item) for item in self.vocabulary)
+
+	def __len__(self):
+		return self.offsets.shape[0] - 1
+
+	def __getitem__(self, item):
+		if pd.api.types.is_integer(item):
+			n = len(self)
+			if not -n <= item < n:
+				raise IndexError("index " + str(item) + " is out of bounds for "
+					+ "axis 0 with size " + str(n))
+			if(item < 0):
+				item += n
+			if self.missing[item]:
+				return self.dtype.na_value
+			start, end = self.offsets[item], self.offsets[item + 1]
+			return list(self.vocabulary[self.ids[start:end]])
+		if isinstance(item, tuple) and len(item) == 1:
+			item = item[0]
+		if not isinstance(item, slice):
+			item = pd.api.indexers.check_array_indexer(self, item)
+		result = self.select(np.arange(len(self))[item])
+		result._readonly = self._readonly
+		return result
+
+	def __setitem__(self, key, value):
+		if self._readonly:
+			raise ValueError("Cannot modify read-only array")
+		if not isinstance(key, slice):
+			key = pd.api.indexers.check_array_indexer(self, key)
+		positions = np.atleast_1d(np.arange(len(self))[key])
+		values = self.to_numpy()
+		if(is_list_value(value) or is_missing(value)):
+			for position in positions:
+				values[position] = value
+		else:
+			value = list(value)
+			if(len(value) != len(positions)):
+				raise ValueError("setting " + str(len(positions)) + " rows from "
+					+ str(len(value)) + " values")
+			for position, row in zip(positions, value):
+				values[position] = row
+		coded = CodedLists.from_lists(values)
+		self.offsets, self.ids = coded.offsets, coded.ids
+		self.vocabulary, self.missing = coded.vocabulary, coded.missing
+
+	def __iter__(self):
+		for i in range(len(self)):
+			yield self[i]
+
+	def __array__(self, dtype=None, copy=None):
+		if(copy is False):
+			raise ValueError("decoding the lists always copies them")
+		return self.to_numpy()
+
+	def __arrow_array__(self, type=None):
+		items = pa.array(self.vocabulary[self.ids], type=pa.string())
+		# a null offset makes its list null
+		offsets = pa.array(self.offsets, type=pa.int32(),
+			mask=np.append(self.missing, False))
+		array = pa.ListArray.from_arrays(offsets, items)
+		return array if type is None else array.cast(type)
+
+	def __eq__(self, other):
+		if isinstance(other, (pd.Series, pd.Index, pd.DataFrame)):
+			return NotImplemented
+		if(is_list_value(other) or is_missing(other)):
+			other = [other] * len(self)
+		# missing rows equal nothing
+		return np.array([not is_missing(a) and not is_missing(b) and a == list(b)
+			for a, b in zip(self, other)], dtype=bool)
+
+	def isna(self):
+		return self.missing.copy()
+
+	def take(self, indices, allow_fill=False, fill_value=None):
+		# validates the indices, -1 marks a missing row when filling
+		positions = take(np.arange(len(self)), np.asarray(indices, dtype=np.int64),
+			allow_fill=allow_fill, fill_value=-1)
+		source = self
+		if(allow_fill and fill_value is not None and not is_missing(fill_value)):
+			# rows to fill come from the fill list appended as a last row
+			source = self._concat_same_type([self, CodedLists.from_lists([fill_value])])
+			positions = np.where(positions == -1, len(self), positions)
+		return source.select(positions)
+
+	def select(self, positions):
+		"""
+		Rows at positions, -1 for a missing row
+		"""
+
+		positions = np.asarray(positions, dtype=np.int64)
+		# -1 picks an appended empty missing row
+		lengths = np.append(self.lengths(), 0)[positions]
+		missing = np.append(self.missing, True)[positions]
+		offsets = offsets_of(lengths)
+		# position of every taken item in the old ids
+		starts = self.offsets[:-1][positions].astype(np.int64) if len(self) \
+			else np.zeros(len(positions), dtype=np.int64)
+		ids = np.repeat(starts - offsets[:-1], lengths) + np.arange(offsets[-1])
+		return CodedLists(offsets, self.ids[ids], self.vocabulary, missing)
+
+	def copy(self):
+		return CodedLists(self.offsets.copy(), self.ids.copy(), self.vocabulary,
+			self.missing.copy())
+
+	def astype(self, dtype, copy=True):
+		dtype = pd.api.types.pandas_dtype(dtype)
+		if isinstance(dtype, CodedListDtype):
+			return self.copy() if copy else self
+		return pd.array(self.to_numpy(), dtype=object).astype(dtype)
+
+	def to_numpy(self, dtype=None, copy=False, na_value=pd.api.extensions.no_default):
+		"""
+		Object array of the decoded lists, missing rows are na_value
+		"""
+
+		if na_value is pd.api.extensions.no_default:
+			na_value = self.dtype.na_value
+		values = np.empty(len(self), dtype=object)
+		for i in range(len(self)):
+			values[i] = na_value if self.missing[i] else self[i]
+		return values
+
+	def _formatter(self, boxed=False):
+		return lambda value: ",".join(value) if isinstance(value, list) \
+			else str(value)
+
+	def tuples(self):
+		"""
+		Object array of the rows as hashable tuples, NaN for missing rows
+		"""
+
+		values = np.empty(len(self), dtype=object)
+		for i, row in enumerate(self):
+			values[i] = np.nan if self.missing[i] else tuple(row)
+		return values
+
+	def _values_for_factorize(self):
+		return self.tuples(), np.nan
+
+	def _values_for_argsort(self):
+		values = self.tuples()
+		for i in np.flatnonzero(self.missing):
+			values[i] = ()
+		return values
+
+	def searchsorted(self, value, side='left', sorter=None):
+		keys = self._values_for_argsort()
+		scalar = is_list_value(value)
+		values = [value] if scalar else list(value)
+		targets = np.empty(len(values), dtype=object)
+		targets[:] = [tuple(v) for v in values]
+		found = np.searchsorted(keys, targets, side=side, sorter=sorter)
+		return found[0] if scalar else found
+
+	def unique(self):
+		_, uniques = self.factorize(use_na_sentinel=False)
+		return uniques
+
+	def value_counts(self, dropna=True):
+		codes, uniques = self.factorize(use_na_sentinel=dropna)
+		counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+		return pd.Series(counts, index=pd.Index(uniques), name="count")
+
+	def _explode(self):
+		# one row per item, empty and missing lists give one missing row
+		lengths = self.lengths()
+		counts = np.maximum(lengths, 1)
+		starts = offsets_of(counts)[:-1].astype(np.int64)
+		values = np.full(counts.sum(), np.nan, dtype=object)
+		positions = np.repeat(starts - self.offsets[:-1], lengths) \
+			+ np.arange(self.offsets[-1])
+		values[positions] = self.vocabulary[self.ids]
+		return values, counts
+
+	# --- helpers
+
+	def lengths(self):
+		"""
+		Number of items of every row
+		"""
+
+		return np.diff(self.offsets)
+
+	def rows(self):
+		"""
+		Row of every item of ids
+		"""
+
+		return np.repeat(np.arange(len(self), dtype=np.int32), self.lengths())
+
+def decode_lists(df):
+	"""
+	Copy of df whose coded list columns are plain lists, for display
+	-----
+	df:
+		dataframe
+	"""
+
+	df = df.copy()
+	for column in df.columns:
+		if isinstance(df[column].dtype, CodedListDtype):
+			df[column] = pd.Series(df[column].array.to_numpy(), index=df.index,
+				dtype=object)
+	return df
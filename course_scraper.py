@@ -2,10 +2,106 @@
 Purpose: To scrape data from each individual course's webpage
 """
 
+import argparse
 import pandas as pd 
 import requests
-from bs4 import BeautifulSoup
+import json
 import os
+import threading
+
+from itertools import islice
+
+from http_client import HttpCache, HttpClient
+from page_parser import Field, PageSpec
+
+CHECKPOINT_PATH = os.path.join("data/coursera-individual-courses.jsonl")
+
+# checkpoint keys of a course record and their columns in
+# coursera-individual-courses.csv
+COLUMNS = {
+	"course_url":"Course URL",
+	"skills":"Skills",
+	"about":"Description",
+	"new_career_starts":"Percentage of new career starts",
+	"pay_increase_prom":"Percentage of pay increase or promotion",
+	"estimate_toc":"Estimated Time to Complete",
+	"instructors":"Instructors"
+}
+
+# fields of a course page
+COURSE_PAGE = PageSpec({
+	"skills":Field("span._x4x75x"),
+	"about":Field(".description"),
+	"learner_stats":Field("._1qfi0x77 > .LearnerOutcomes__text-wrapper > .LearnerOutcomes__percent"),
+	"properties":Field("._16ni8zai"),
+	"instructors":Field(".instructor-name")
+})
+
+class CheckpointStore:
+	"""
+	Append-only JSON lines file of scraped courses keyed by course URL
+	"""
+
+	path = None
+
+	def __init__(self, path=CHECKPOINT_PATH):
+
+		self.path = path
+		self.lock = threading.Lock()
+
+	def index(self):
+		"""
+		Byte offset of the last record of every URL, so records can be
+		read one at a time instead of all held in memory
+		"""
+
+		offsets = {}
+		if not os.path.exists(self.path):
+			return offsets
+		with open(self.path, 'rb') as f:
+			offset = 0
+			for line in f:
+				try:
+					offsets[json.loads(line)["course_url"]] = offset
+				except ValueError:
+					pass
+				offset += len(line)
+		return offsets
+
+	def read(self, offset):
+		"""
+		Record stored at a byte offset returned by index or append
+		"""
+
+		with open(self.path, 'rb') as f:
+			f.seek(offset)
+			return json.loads(f.readline())
+
+	def append(self, record):
+		"""
+		Stores one record as soon as it is scraped, returns its offset
+		-----
+		record:
+			Dictionary of features with a course_url key
+		"""
+
+		line = (json.dumps(record) + "\n").encode('utf-8')
+		with self.lock:
+			with open(self.path, 'ab') as f:
+				f.seek(0, os.SEEK_END)
+				offset = f.tell()
+				f.write(line)
+				f.flush()
+		return offset
+
+	def clear(self):
+		"""
+		Drops every stored record
+		"""
+
+		with self.lock:
+			if os.path.exists(self.path):
+				os.remove(self.path)
 
 
 class DataHunter:
@@ -14,16 +110,39 @@ class DataHunter:
 	"""
 
 	df = None # dataframe from scraper.py
-	skills = []
-	about = []
-	new_career_starts = []
-	pay_increase_prom = []
-	estimate_toc = []
-	instructors = []
+	client = None
+	store = None
+	resume = None
 
-	def __init__(self, df):
+	def __init__(self, df, max_concurrency=4, rate_limit=5,
+				checkpoint_path=CHECKPOINT_PATH, resume=False, cache=None,
+				offline=False):
+		"""
+		df:
+			Overview dataframe from scraper.py
+		max_concurrency:
+			Number of course pages fetched at once
+		rate_limit:
+			Maximum requests per second to the site, None for no limit
+		checkpoint_path:
+			JSON lines file every scraped course is appended to
+		resume:
+			Only fetch URLs missing from the checkpoint, to resume a
+			crashed run; False starts a new checkpoint and refetches
+			every course, so changed courses are seen
+		cache:
+			HttpCache shared with scraper.py, None to disable; unchanged
+			pages are then answered by the server with 304 Not Modified
+			and parsed from the cache
+		offline:
+			Parse pages from the cache only
+		"""
 
 		self.df = df
+		self.client = HttpClient(max_concurrency, rate_limit,
+			cache=cache, offline=offline)
+		self.store = CheckpointStore(checkpoint_path)
+		self.resume = resume
 
 	def scrape_features(self, page_url):
 		"""
@@ -33,104 +152,132 @@ class DataHunter:
 			URL of the page
 		"""
 
-		# create the soup with a certain page URL
-		course_page = requests.get(page_url)
-		course_soup = BeautifulSoup(course_page.content,
-										'html.parser')
+		course_page = self.client.get(page_url)
+		return self.parse_features(page_url, course_page.content)
+
+	def parse_features(self, page_url, content):
+		"""
+		Picks the features of a course page
+		-----
+		page_url:
+			URL of the page, the key of the record
+		content:
+			HTML of the page
+		"""
+
+		# every field is collected in one pass over the page
+		found = COURSE_PAGE.parse(content)
+		record = {"course_url":page_url}
+
 		# pick course skills
-		try:
-			cskills = course_soup.find_all("span", "_x4x75x")
-			temp = ""
-			for idx in range(len(cskills)):
-				temp = temp + cskills[idx].text
-				if(idx != len(cskills)-1):
-					temp = temp + ","
-			self.skills.append(temp)
-		except:
-			self.skills.append("Missing")
+		record["skills"] = ",".join(found["skills"])
 
 		# pick about course
 		try:
-			cdescr = course_soup.select(".description")
-			self.about.append(cdescr[0].text)
-		except:
-			self.about.append("Missing")
+			record["about"] = found["about"][0]
+		except IndexError:
+			record["about"] = "Missing"
 
 		# pick learner stats
+		learn_stats = found["learner_stats"]
 		try:
-			learn_stats = course_soup.select(
-				"._1qfi0x77 > .LearnerOutcomes__text-wrapper > .LearnerOutcomes__percent" 
-			)
-		except:
-			pass
-		try:
-			self.new_career_starts.append((float(learn_stats[0].text.replace('%',''))))
-		except:
-			self.new_career_starts.append("Missing")
+			record["new_career_starts"] = float(learn_stats[0].replace('%',''))
+		except (IndexError, ValueError):
+			record["new_career_starts"] = "Missing"
 		try:
-			self.pay_increase_prom.append((float(learn_stats[1].text.replace('%',''))))
-		except:
-			self.pay_increase_prom.append("Missing")
+			record["pay_increase_prom"] = float(learn_stats[1].replace('%',''))
+		except (IndexError, ValueError):
+			record["pay_increase_prom"] = "Missing"
 
-		# pick estimated time to complete
-		try:
-			props = course_soup.select("._16ni8zai")
-			done = 0 # this counter prevents duplicate values
-			etoc = "Missing"
-			for idx in range(len(props)):
-				if('to complete' in props[idx].text and done==0):
-					etoc = props[idx].text
-					done+=1
-			self.estimate_toc.append(etoc)
-		except:
-			self.estimate_toc.append("Missing")
+		# pick estimated time to complete, the first one only
+		etoc = "Missing"
+		for prop in found["properties"]:
+			if('to complete' in prop):
+				etoc = prop
+				break
+		record["estimate_toc"] = etoc
 
 		# pick instructors
-		try:
-			instructors = course_soup.select(".instructor-name")
-			temp=""
-			for idx in range(len(instructors)):
-				temp = temp + instructors[idx].text
-				if(idx != len(instructors)-1):
-					temp = temp + ","
-			self.instructors.append(temp)
-		except:
-			self.instructors.append("Missing")
+		record["instructors"] = ",".join(found["instructors"])
+
+		return record
 
-	def extract_url(self):
+	def iter_records(self, courses, chunk_size=256):
 		"""
-		Extracts URLs from the dataframe loaded
+		Yields every overview record joined by course URL with the record
+		of its course page, fetching the courses a chunk at a time and
+		storing each one as it arrives; when resuming, courses already
+		checkpointed are read back instead
+		-----
+		courses:
+			Iterable of overview records, e.g. DataMaker.iter_courses()
+		chunk_size:
+			Number of courses looked up at once
 		"""
 
-		for url in self.df['Course URL']:
-			self.scrape_features(url)
+		if not self.resume:
+			self.store.clear()
+		# offsets only, records are read back when their course comes up
+		offsets = self.store.index()
+		print("\n" + str(len(offsets)) + " courses checkpointed")
+
+		def fetch(url):
+			try:
+				record = self.scrape_features(url)
+			except requests.RequestException as e:
+				print("\nFailed " + url + ": " + str(e))
+				return None
+			offsets[url] = self.store.append(record)
+			return record
+
+		missing = 0
+		courses = iter(courses)
+		while True:
+			chunk = list(islice(courses, chunk_size))
+			if not chunk:
+				break
+			urls = [course["Course URL"] for course in chunk]
+			new_urls = [url for url in dict.fromkeys(urls) if url not in offsets]
+			fetched = {}
+			for record in self.client.map(fetch, new_urls):
+				if record is not None:
+					fetched[record["course_url"]] = record
+
+			for course, url in zip(chunk, urls):
+				record = fetched.get(url)
+				if(record is None and url in offsets):
+					record = self.store.read(offsets[url])
+				if record is None:
+					missing += 1
+					continue
+				joined = dict(course)
+				joined.update((COLUMNS[key], value) for key, value in record.items())
+				yield joined
+
+		if missing:
+			raise RuntimeError(str(missing) + " course pages could not be"
+				" fetched, run again with resume=True to resume from the"
+			" checkpoint")
 
 	def make_dataset(self):
 		"""
-		Make the dataset
+		Make the dataset, keyed by course URL
 		"""
 
-		# initiate crawler
-		self.extract_url()
-
-		data_dict = {
-				"Skills":self.skills,
-				"Description":self.about,
-				"Percentage of new career starts":self.new_career_starts,
-				"Percentage of pay increase or promotion":self.pay_increase_prom,
-				"Estimated Time to Complete":self.estimate_toc,
-				"Instructors":self.instructors
-			}
-
-		data = pd.DataFrame(data_dict)
+		courses = self.df.to_dict('records')
+		data = pd.DataFrame(list(self.iter_records(courses)))
 
-		return data
+		return data.reindex(columns=list(COLUMNS.values()))
 
 def main():
 
 	source_path = os.path.join("data/coursera-courses-overview.csv")
+	parser = argparse.ArgumentParser(description="Scrapes every course page")
+	parser.add_argument("--resume", action="store_true",
+		help="only fetch the courses missing from the checkpoint")
+	args = parser.parse_args()
 	df = pd.read_csv(source_path)
-	dh = DataHunter(df)
+	dh = DataHunter(df, cache=HttpCache(), resume=args.resume)
 	df = dh.make_dataset()
 	destination_path = os.path.join("data/coursera-individual-courses.csv")
 	df.to_csv(destination_path, index=False)
@@ -2,96 +2,58 @@
 Prepares Data for Analysis
 	- Aggregates the two files
 	- Performs preliminary pre-processing
+	- Stores the typed dataset the app loads
+	- Builds the compact feature vectors of the courses
+	- Builds the full-text search index of the courses
+	- After a new scrape, only recomputes the courses that changed,
+	  unless --full is given
 """
 
-import pandas as pd 
-import numpy as np
+import argparse
 import os
 
-def clean_col_names(df, columns):
-	"""
-	Cleans column names
-	-----
-	columns:
-		List of column names
-	"""
+from dataset import build_dataset, update_dataset
+from features import build_features, update_features
+from search_index import build_search
+from similarity_index import load_index, update_index
 
-	new = []
-	for c in columns:
-		new.append(c.lower().replace(' ','_'))
-	return new
-
-def prepare_data(df):
-	"""
-	Prepares the final dataset
-	-----
-	df:
-		dataframe
-	"""
-
-	# clean column names
-	df.columns = clean_col_names(df, df.columns)
-
-	# impute missing values that creeped in
-	df['skills'] = df['skills'].fillna('Missing')
-	df['instructors'] = df['instructors'].fillna('Missing')
-
-	# making certain features numeric
-	def make_numeric(x):
-		if(x=='Missing'):
-			return np.nan
-		return float(x)
-
-	df['course_rating'] = df['course_rating'].apply(make_numeric)
-	df['course_rated_by'] = df['course_rated_by'].apply(make_numeric)
-	df['percentage_of_new_career_starts'] = df['percentage_of_new_career_starts'].apply(make_numeric)
-	df['percentage_of_pay_increase_or_promotion'] = df['percentage_of_pay_increase_or_promotion'].apply(make_numeric)
-
-	def make_count_numeric(x):
-	    if('k' in x):
-	        return (float(x.replace('k','')) * 1000)
-	    elif('m' in x):
-	        return (float(x.replace('m','')) * 1000000)
-	    elif('Missing' in x):
-	        return (np.nan)
-
-	df['enrolled_student_count'] = df['enrolled_student_count'].apply(make_count_numeric)
-
-    # extract time to complete
-	def find_time(x):
-	    l = x.split(' ')
-	    idx = 0
-	    for i in range(len(l)):
-	        if(l[i].isdigit()):
-	            idx = i 
-	    try:
-	        return (l[idx] + ' ' + l[idx+1])
-	    except:
-	        return l[idx]
-
-	df['estimated_time_to_complete'] = df['estimated_time_to_complete'].apply(find_time)
-
-	def split_it(x):
-		return (x.split(','))
+def main():
 
-	df['skills'] = df['skills'].apply(split_it)
-	df['instructors'] = df['instructors'].apply(split_it)
+	parser = argparse.ArgumentParser(description="Prepares the CouReco dataset")
+	parser.add_argument("--full", action="store_true",
+		help="rebuild everything instead of updating the changed courses")
+	args = parser.parse_args()
+	processes = os.cpu_count()
+
+	if args.full:
+		# aggregate, preprocess and store the typed dataset, tagged
+		# with the hash of the scraped files
+		df = build_dataset()
+		diff = None
+	else:
+		df, diff = update_dataset()
+		if diff is not None:
+			print("catalog: " + diff.summary())
 
-	# store data
 	# store it back to /data as preprocessed data
 	destination_path = os.path.join("data/coursera-courses.csv")
 	df.to_csv(destination_path, index=False)
 
-def main():
+	# BM25 weights depend on the whole catalog, so the search index is
+	# always rebuilt, it takes seconds
+	build_search(df).save()
 
-	source_path1 = os.path.join("data/coursera-courses-overview.csv")
-	source_path2 = os.path.join("data/coursera-individual-courses.csv")
-	df_overview = pd.read_csv(source_path1)
-	df_individual = pd.read_csv(source_path2)
-	df = pd.concat([df_overview, df_individual], axis=1)
+	if diff is None:
+		# build the feature vectors once for the whole catalog
+		features = build_features(df, processes=processes)
+		features.save()
+		return
 
-	# preprocess it now
-	prepare_data(df)
+	update_features(diff, df, processes=processes)
+	# the keyword index is optional, only kept up to date if it was built
+	index = load_index()
+	if(index is not None and list(index.course_urls) == diff.old_urls):
+		update_index(index, diff, df, processes).save()
 
 if __name__=="__main__":
-	main()
\ No newline at end of file
+	main()
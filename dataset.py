@@ -0,0 +1,318 @@
+"""
+Prepared Dataset
+	- Combines the two scraped files, joined by course URL, and
+	  preprocesses them; or reads the typed records scrape_pipeline.py
+	  streamed out, which are preprocessed already, when they are newer
+	- Stores the result as a typed Arrow file, skills and instructors as
+	  list columns and the categoricals dictionary encoded, tagged with a
+	  hash of the scraped files
+	- Loads the Arrow file, skipping preprocessing while the scraped
+	  files are unchanged; the hash is read from the schema, so a stale
+	  file is never decoded. The records are converted to pandas, the
+	  map only serves the read
+	- Diffs a new scrape against the stored dataset by course_url, so the
+	  indexes only recompute added and updated courses
+"""
+
+import hashlib
+import os
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+import preprocessing
+from coded_lists import CodedListDtype, CodedLists
+
+SOURCE_PATHS = [
+	os.path.join("data/coursera-courses-overview.csv"),
+	os.path.join("data/coursera-individual-courses.csv")
+]
+SCRAPE_PATH = os.path.join("data/coursera-courses-scraped.arrows")
+DATASET_PATH = os.path.join("data/coursera-courses.arrow")
+HASH_KEY = b"coureco.source_hash"
+LIST_COLUMNS = ['skills', 'instructors']
+
+# types of the prepared columns, every streamed chunk is cast to them
+DATASET_SCHEMA = pa.schema([
+	("course_url", pa.string()),
+	("course_name", pa.string()),
+	("learning_product_type", pa.dictionary(pa.int32(), pa.string())),
+	("course_provided_by", pa.dictionary(pa.int32(), pa.string())),
+	("course_rating", pa.float64()),
+	("course_rated_by", pa.float64()),
+	("enrolled_student_count", pa.float64()),
+	("course_difficulty", pa.dictionary(pa.int32(), pa.string())),
+	("skills", pa.list_(pa.string())),
+	("description", pa.string()),
+	("percentage_of_new_career_starts", pa.float64()),
+	("percentage_of_pay_increase_or_promotion", pa.float64()),
+	("estimated_time_to_complete", pa.float64()),
+	("instructors", pa.list_(pa.string()))
+])
+
+def default_sources():
+	"""
+	The newer of the records streamed by scrape_pipeline.py and the two
+	scraped CSV files, so an old stream never shadows a fresh scrape
+	"""
+
+	if not os.path.exists(SCRAPE_PATH):
+		return SOURCE_PATHS
+	csv_times = [os.path.getmtime(path) for path in SOURCE_PATHS
+		if os.path.exists(path)]
+	if(len(csv_times) == len(SOURCE_PATHS)
+			and min(csv_times) > os.path.getmtime(SCRAPE_PATH)):
+		return SOURCE_PATHS
+	return [SCRAPE_PATH]
+
+def source_hash(paths):
+	"""
+	SHA-256 of the scraped files
+	-----
+	paths:
+		Files the dataset is built from
+	"""
+
+	h = hashlib.sha256()
+	for path in paths:
+		with open(path, 'rb') as f:
+			for chunk in iter(lambda: f.read(1 << 20), b''):
+				h.update(chunk)
+	return h.hexdigest()
+
+def read_sources(paths=SOURCE_PATHS):
+	"""
+	The scraped files joined by course URL, in the order of the overview
+	-----
+	paths:
+		Overview and individual course files
+	"""
+
+	overview, courses = [pd.read_csv(path) for path in paths]
+	if "Course URL" not in courses:
+		# files scraped before course pages were keyed by URL line up
+		# with the overview row by row
+		return pd.concat([overview, courses], axis=1)
+	courses = courses.drop_duplicates("Course URL", keep='last')
+	return overview.merge(courses, on="Course URL", how='inner')
+
+def read_scrape(path=SCRAPE_PATH):
+	"""
+	Prepared records streamed by scrape_pipeline.py, the first record of
+	a course wins
+	-----
+	path:
+		Location of the Arrow stream
+	"""
+
+	with pa.memory_map(path, 'r') as source:
+		table = pa.ipc.open_stream(source).read_all()
+	df = to_frame(table)
+	return df.drop_duplicates('course_url').reset_index(drop=True)
+
+def prepare_sources(paths):
+	"""
+	Prepared dataframe of the scraped files or the streamed records
+	-----
+	paths:
+		See default_sources
+	"""
+
+	if(list(paths) == [SCRAPE_PATH]):
+		return read_scrape(SCRAPE_PATH)
+	return preprocessing.prepare_data(read_sources(paths))
+
+def to_frame(table):
+	"""
+	Dataframe of a prepared Arrow table
+	"""
+
+	df = table.to_pandas()
+	# coded straight from the Arrow lists, also for files written before
+	# the lists were coded
+	for feature in LIST_COLUMNS:
+		if not isinstance(df[feature].dtype, CodedListDtype):
+			df[feature] = CodedLists.from_arrow(table.column(feature))
+	for feature in preprocessing.CATEGORICAL_COLUMNS:
+		df[feature] = df[feature].astype('category')
+	return df
+
+def write_dataset(df, digest, path=DATASET_PATH):
+	"""
+	Stores the prepared dataset as an uncompressed Arrow file
+	-----
+	df:
+		Prepared dataframe
+	digest:
+		Hash of the scraped files it was built from
+	path:
+		Destination of the Arrow file
+	"""
+
+	table = pa.Table.from_pandas(df, preserve_index=False)
+	metadata = dict(table.schema.metadata or {})
+	metadata[HASH_KEY] = digest.encode('utf-8')
+	table = table.replace_schema_metadata(metadata)
+
+	# written aside and renamed so a running app never maps half a file
+	tmp_path = path + ".tmp"
+	with pa.OSFile(tmp_path, 'wb') as sink:
+		with pa.ipc.new_file(sink, table.schema) as writer:
+			writer.write_table(table)
+	os.replace(tmp_path, path)
+
+def read_digest(path=DATASET_PATH):
+	"""
+	Hash of the scraped files a stored dataset was built from, read from
+	the schema without decoding the records
+	-----
+	path:
+		Location of the Arrow file
+	"""
+
+	with pa.memory_map(path, 'r') as source:
+		metadata = pa.ipc.open_file(source).schema.metadata or {}
+	return metadata.get(HASH_KEY, b'').decode('utf-8')
+
+def read_dataset(path=DATASET_PATH):
+	"""
+	Reads a stored dataset, returns the dataframe and its hash
+	-----
+	path:
+		Location of the Arrow file
+	"""
+
+	with pa.memory_map(path, 'r') as source:
+		table = pa.ipc.open_file(source).read_all()
+		df = to_frame(table)
+	metadata = table.schema.metadata or {}
+	return df, metadata.get(HASH_KEY, b'').decode('utf-8')
+
+def build_dataset(paths=None, path=DATASET_PATH):
+	"""
+	Preprocesses the scraped files and stores the result
+	-----
+	paths:
+		Scraped files, see default_sources if None
+	path:
+		Destination of the Arrow file
+	"""
+
+	paths = paths or default_sources()
+	digest = source_hash(paths)
+	df = prepare_sources(paths)
+	write_dataset(df, digest, path)
+	return df
+
+def load_dataset(paths=None, path=DATASET_PATH):
+	"""
+	The prepared dataset, rebuilt only when the scraped files changed
+	-----
+	paths:
+		Scraped files, see default_sources if None
+	path:
+		Location of the Arrow file
+	"""
+
+	paths = paths or default_sources()
+	if(os.path.exists(path) and read_digest(path) == source_hash(paths)):
+		return read_dataset(path)[0]
+	return build_dataset(paths, path)
+
+class CatalogDiff:
+	"""
+	Courses of a new catalog matched by course_url to the previous one
+	"""
+
+	old_urls = None # course URLs of the previous catalog, in row order
+	kept_old = None # rows of the unchanged courses in the previous catalog
+	kept_new = None # rows of the same courses in the new catalog
+	changed = None # rows of added and updated courses in the new catalog
+	added = None
+	updated = None
+	removed = None # course URLs no longer in the catalog
+
+	def __init__(self, old_df, new_df):
+		"""
+		old_df:
+			Previous prepared dataframe
+		new_df:
+			New prepared dataframe
+		"""
+
+		old_rows = {}
+		for row, url in enumerate(old_df['course_url']):
+			old_rows.setdefault(url, row)
+		old_hashes = row_hashes(old_df)
+		new_hashes = row_hashes(new_df)
+
+		kept_old, kept_new, changed = [], [], []
+		self.added, self.updated = [], []
+		for new_row, url in enumerate(new_df['course_url']):
+			old_row = old_rows.pop(url, None)
+			if old_row is None:
+				self.added.append(url)
+				changed.append(new_row)
+			elif(old_hashes[old_row] == new_hashes[new_row]):
+				kept_old.append(old_row)
+				kept_new.append(new_row)
+			else:
+				self.updated.append(url)
+				changed.append(new_row)
+
+		self.old_urls = list(old_df['course_url'])
+		self.kept_old = np.asarray(kept_old, dtype=np.int64)
+		self.kept_new = np.asarray(kept_new, dtype=np.int64)
+		self.changed = np.asarray(changed, dtype=np.int64)
+		self.removed = list(old_rows)
+
+	def order(self):
+		"""
+		Positions that put the kept rows followed by the changed rows
+		back in the row order of the new catalog
+		"""
+
+		stacked = np.concatenate([self.kept_new, self.changed])
+		order = np.empty(stacked.shape[0], dtype=np.int64)
+		order[stacked] = np.arange(stacked.shape[0])
+		return order
+
+	def summary(self):
+
+		return (str(len(self.added)) + " added, " + str(len(self.updated))
+			+ " updated, " + str(len(self.removed)) + " removed, "
+			+ str(len(self.kept_new)) + " unchanged")
+
+def row_hashes(df):
+	"""
+	Hash of every row of a prepared dataframe, lists included
+	-----
+	df:
+		Prepared dataframe
+	"""
+
+	return pd.util.hash_pandas_object(df.astype(str), index=False).to_numpy()
+
+def update_dataset(paths=None, path=DATASET_PATH):
+	"""
+	The prepared dataset with how it differs from the stored one, the
+	diff is None when there was no stored dataset to compare with
+	-----
+	paths:
+		Scraped files, see default_sources if None
+	path:
+		Location of the Arrow file
+	"""
+
+	paths = paths or default_sources()
+	if not os.path.exists(path):
+		return build_dataset(paths, path), None
+
+	old_df, old_digest = read_dataset(path)
+	digest = source_hash(paths)
+	if(digest == old_digest):
+		return old_df, CatalogDiff(old_df, old_df)
+
+	df = prepare_sources(paths)
+	write_dataset(df, digest, path)
+	return df, CatalogDiff(old_df, df)
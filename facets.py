@@ -0,0 +1,221 @@
+"""
+Facet Index
+	- One packed bitmap per value of the categorical columns, e.g. every
+	  provider and difficulty
+	- Row ids sorted by every numeric column, so a range is two binary
+	  searches, e.g. a minimum rating or a maximum number of hours
+	- Combines them with a skill filter into the matching rows, and
+	  counts in the same pass how many courses every other option of
+	  each facet would leave
+
+Counts of a facet ignore its own selection and apply all the others,
+so they show what choosing another option of that facet would give.
+"""
+
+import numpy as np
+
+from skill_index import SkillIndex
+
+CATEGORY_FACETS = ['course_provided_by', 'course_difficulty',
+	'learning_product_type']
+
+# numeric facets with the edges of the ranges they are counted in
+RANGE_FACETS = {
+	"course_rating":[0, 3, 3.5, 4, 4.5, 5],
+	"enrolled_student_count":[0, 1e3, 1e4, 1e5, 1e6, np.inf],
+	"estimated_time_to_complete":[0, 5, 10, 20, 50, 100, np.inf]
+}
+
+# set bits of every byte
+POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+class FacetIndex:
+	"""
+	Bitmaps and sorted arrays answering combined facet queries
+	"""
+
+	n_rows = None
+	categories = None # facet -> (values, bitmaps, one packed row per value)
+	ranges = None # facet -> (row ids sorted by value, sorted values, edges)
+	values = None # facet -> numeric column
+	skills = None
+	skill_names = None
+	skill_rows = None # (skill, row) pairs of the skill postings
+	skill_ids = None
+
+	def __init__(self, df, skills=None, category_facets=CATEGORY_FACETS,
+				range_facets=RANGE_FACETS):
+		"""
+		df:
+			Prepared dataframe
+		skills:
+			SkillIndex of df, built here if None
+		category_facets:
+			Columns filtered by a set of values
+		range_facets:
+			Columns filtered by a range, with the edges they are counted in
+		"""
+
+		self.n_rows = len(df)
+		self.skills = skills or SkillIndex(df['skills'])
+		postings = self.skills.postings
+		self.skill_names = np.asarray(list(postings), dtype=object)
+		self.skill_rows = np.concatenate([np.zeros(0, dtype=np.int32)]
+			+ list(postings.values()))
+		self.skill_ids = np.repeat(np.arange(len(postings), dtype=np.int32),
+			[len(rows) for rows in postings.values()])
+
+		self.categories = {}
+		for facet in category_facets:
+			column = df[facet].astype('category')
+			codes = column.cat.codes.to_numpy()
+			values = np.asarray(column.cat.categories, dtype=object)
+			# one boolean row per value, packed eight rows to a byte
+			hits = np.zeros((len(values), self.n_rows), dtype=bool)
+			present = codes >= 0
+			hits[codes[present], np.flatnonzero(present)] = True
+			self.categories[facet] = (values, np.packbits(hits, axis=1))
+
+		self.ranges = {}
+		self.values = {}
+		for facet, edges in range_facets.items():
+			values = df[facet].to_numpy(dtype=np.float64)
+			self.values[facet] = values
+			# missing values sort last and never fall in a range
+			order = np.argsort(values, kind='stable').astype(np.int32)
+			sorted_values = values[order]
+			n_present = np.count_nonzero(~np.isnan(values))
+			self.ranges[facet] = (order[:n_present], sorted_values[:n_present],
+				np.asarray(edges, dtype=np.float64))
+
+	def all_rows(self):
+		"""
+		Bitmap of every row
+		"""
+
+		return np.packbits(np.ones(self.n_rows, dtype=bool))
+
+	def to_bitmap(self, rows):
+		"""
+		Packed bitmap of row ids
+		"""
+
+		hits = np.zeros(self.n_rows, dtype=bool)
+		hits[rows] = True
+		return np.packbits(hits)
+
+	def to_rows(self, bitmap):
+		"""
+		Sorted row ids of a packed bitmap
+		"""
+
+		return np.flatnonzero(np.unpackbits(bitmap,
+			count=self.n_rows)).astype(np.int32)
+
+	def category_bitmap(self, facet, chosen):
+		"""
+		Rows whose value of a categorical facet is one of the chosen
+		-----
+		facet:
+			Column name
+		chosen:
+			List of values
+		"""
+
+		values, bitmaps = self.categories[facet]
+		picked = np.flatnonzero(np.isin(values, list(chosen)))
+		return np.bitwise_or.reduce(bitmaps[picked], axis=0) if len(picked) \
+			else np.zeros(bitmaps.shape[1], dtype=np.uint8)
+
+	def range_bitmap(self, facet, low=None, high=None):
+		"""
+		Rows whose value of a numeric facet is within [low, high]
+		-----
+		facet:
+			Column name
+		low, high:
+			Bounds, None for no bound
+		"""
+
+		order, sorted_values, _ = self.ranges[facet]
+		start = 0 if low is None else np.searchsorted(sorted_values, low, 'left')
+		end = len(order) if high is None \
+			else np.searchsorted(sorted_values, high, 'right')
+		return self.to_bitmap(order[start:end])
+
+	def query(self, skills=None, how='any', categories=None, ranges=None,
+			top_skills=20):
+		"""
+		Rows matching every predicate, with the counts of every facet
+		-----
+		skills:
+			List of skills, no skill predicate if None
+		how:
+			'any' or 'all' of the chosen skills
+		categories:
+			{facet: list of values}, e.g. {"course_difficulty":["Beginner"]}
+		ranges:
+			{facet: (low, high)}, either bound None
+		top_skills:
+			Number of skills counted, most frequent among the matches first
+
+		Returns the sorted row ids and {facet: [(option, count), ...]}.
+		Categorical options come in a fixed order, zero counts included,
+		the options of a range facet are (low, high) pairs and the skills
+		are the most frequent ones.
+		"""
+
+		categories = {f:v for f, v in (categories or {}).items() if v}
+		ranges = {f:r for f, r in (ranges or {}).items()
+			if r is not None and any(bound is not None for bound in r)}
+
+		predicates = {}
+		if skills is not None:
+			predicates['skills'] = self.to_bitmap(self.skills.rows(skills, how))
+		for facet, chosen in categories.items():
+			predicates[facet] = self.category_bitmap(facet, chosen)
+		for facet, (low, high) in ranges.items():
+			predicates[facet] = self.range_bitmap(facet, low, high)
+
+		everything = self.all_rows()
+		matches = everything
+		for bitmap in predicates.values():
+			matches = matches & bitmap
+
+		def others(facet):
+			# every predicate but the facet's own
+			if facet not in predicates:
+				return matches
+			bitmap = everything
+			for name, other in predicates.items():
+				if(name != facet):
+					bitmap = bitmap & other
+			return bitmap
+
+		counts = {}
+		for facet, (values, bitmaps) in self.categories.items():
+			found = POPCOUNT[bitmaps & others(facet)].sum(axis=1, dtype=np.int64)
+			counts[facet] = [(value, int(count))
+				for value, count in zip(values, found)]
+
+		for facet, (_, _, edges) in self.ranges.items():
+			values = self.values[facet][self.to_rows(others(facet))]
+			# NaN falls in no range
+			found = np.histogram(values[~np.isnan(values)], edges)[0]
+			counts[facet] = [((float(edges[i]), float(edges[i + 1])), int(found[i]))
+				for i in range(len(found))]
+
+		counts['skills'] = self.skill_counts(others('skills'), top_skills)
+
+		return self.to_rows(matches), counts
+
+	def skill_counts(self, bitmap, top_skills):
+		"""
+		Most frequent skills among the rows of a bitmap
+		"""
+
+		hits = np.unpackbits(bitmap, count=self.n_rows).astype(bool)
+		found = np.bincount(self.skill_ids[hits[self.skill_rows]],
+			minlength=len(self.skill_names))
+		top = np.argsort(-found, kind='stable')[:top_skills]
+		return [(self.skill_names[i], int(found[i])) for i in top if found[i]]
@@ -0,0 +1,295 @@
+"""
+Course Features
+	- TF-IDF of the description keywords, optionally joined by the
+	  skills, provider and difficulty of every course
+	- Reduced to a fixed number of dimensions with truncated SVD and
+	  normalised, so cosine similarity stays a dot product
+	- Stored as a float32 .npy file that every worker memory-maps
+	- Updated by folding changed courses into the stored TF-IDF and SVD
+	  models, refitted once too many courses were folded in
+
+The vectors are (courses x dimensions) whatever the vocabulary size,
+so the memory of a worker and the cost of a query are known upfront.
+"""
+
+import os
+import json
+import pickle
+import numpy as np
+import scipy.sparse as sp
+
+from numpy.lib.format import open_memmap
+from sklearn.decomposition import TruncatedSVD
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.preprocessing import normalize
+
+from instrumentation import instrumented
+from keywords import extract_keywords
+from similarity_index import SimilarityIndex, get_index
+
+FEATURES_PATH = os.path.join("data/course-features.npy")
+FEATURES_META_PATH = os.path.join("data/course-features.json")
+FEATURES_MODEL_PATH = os.path.join("data/course-features-model.pkl")
+
+# fields of the prepared dataframe with their weight; course_provided_by
+# and course_difficulty can be added too, but their few values carry so
+# much variance that SVD spends its dimensions on them
+DEFAULT_CONFIG = {
+	"fields":{
+		"description":1.0,
+		"skills":0.5
+	},
+	"dimensions":128,
+	"min_df":1,
+	"seed":0
+}
+
+def as_tokens(values):
+	"""
+	Analyzer of fields that are already tokens, e.g. a list of skills
+	"""
+
+	return list(values)
+
+def field_documents(df, field, processes=1):
+	"""
+	Documents of one field the TF-IDF of that field is computed on
+	-----
+	df:
+		Prepared dataframe
+	field:
+		Column name
+	processes:
+		Number of keyword extraction processes
+	"""
+
+	if(field == 'description'):
+		return extract_keywords(df, field, processes)
+
+	values = df[field]
+	if(len(values) and isinstance(values.iloc[0], list)):
+		return values
+	# a categorical value is a single token
+	return [[value] for value in values.astype(str)]
+
+def field_vectorizer(field, min_df):
+
+	if(field == 'description'):
+		return TfidfVectorizer(min_df=min_df, sublinear_tf=True)
+	return TfidfVectorizer(analyzer=as_tokens, min_df=1)
+
+@instrumented("vectorize")
+def transform(model, df, processes=1):
+	"""
+	Feature vectors of the rows of df under a fitted model
+	-----
+	model:
+		Fitted vectorizers, field weights and SVD
+	df:
+		Prepared dataframe
+	processes:
+		Number of keyword extraction processes
+	"""
+
+	blocks = [weight * model['vectorizers'][field].transform(
+			field_documents(df, field, processes))
+		for field, weight in model['weights'].items()]
+	weighted = sp.hstack(blocks).tocsr()
+	return normalize(model['svd'].transform(weighted)).astype(np.float32)
+
+class FeatureIndex(SimilarityIndex):
+	"""
+	Dense, row-normalised feature vectors of the catalog
+	"""
+
+	config = None
+	folded = None # courses folded in since the models were fitted
+	model = None # fitted vectorizers and SVD, only kept when just built
+
+	def __init__(self, matrix, config, course_urls, folded=0, model=None):
+
+		super().__init__(matrix, None, course_urls)
+		self.config = config
+		self.folded = folded
+		self.model = model
+
+	def query(self, row):
+		"""
+		Feature vector of a course
+		-----
+		row:
+			Row position of the course
+		"""
+
+		return np.asarray(self.matrix[row])
+
+	def save(self, features_path=FEATURES_PATH, meta_path=FEATURES_META_PATH,
+			model_path=FEATURES_MODEL_PATH):
+		"""
+		Stores the vectors as a .npy file, the configuration and the
+		fitted models aside
+		-----
+		features_path:
+			Destination of the float32 vectors
+		meta_path:
+			Destination of the configuration and course URLs
+		model_path:
+			Destination of the fitted models, left as is if there are none
+		"""
+
+		if self.model is not None:
+			with open(model_path, 'wb') as f:
+				pickle.dump(self.model, f)
+
+		# written aside and renamed so a running worker never maps half a file
+		tmp_path = features_path + ".tmp"
+		out = open_memmap(tmp_path, mode='w+', dtype=np.float32,
+			shape=self.matrix.shape)
+		out[:] = self.matrix
+		out.flush()
+		del out
+		os.replace(tmp_path, features_path)
+
+		meta = {
+			"config":self.config,
+			"folded":self.folded,
+			"course_urls":list(self.course_urls)
+		}
+		with open(meta_path, 'w') as f:
+			json.dump(meta, f)
+
+@instrumented("vectorize")
+def build_features(df, config=DEFAULT_CONFIG, processes=1):
+	"""
+	Builds the feature vectors of the whole catalog
+	-----
+	df:
+		Prepared dataframe
+	config:
+		Fields with their weights, dimensions, min_df and seed, see
+		DEFAULT_CONFIG
+	processes:
+		Number of keyword extraction processes
+	"""
+
+	vectorizers = {}
+	blocks = []
+	for field, weight in config['fields'].items():
+		vectorizers[field] = field_vectorizer(field, config['min_df'])
+		blocks.append(weight * vectorizers[field].fit_transform(
+			field_documents(df, field, processes)))
+	weighted = sp.hstack(blocks).tocsr()
+
+	# SVD needs fewer components than either side of the matrix
+	dimensions = max(min(config['dimensions'], min(weighted.shape) - 1), 1)
+	svd = TruncatedSVD(n_components=dimensions, random_state=config['seed'])
+	vectors = normalize(svd.fit_transform(weighted)).astype(np.float32)
+
+	model = {
+		"vectorizers":vectorizers,
+		"weights":dict(config['fields']),
+		"svd":svd
+	}
+	return FeatureIndex(vectors, config, list(df['course_url']), model=model)
+
+def load_features(features_path=FEATURES_PATH, meta_path=FEATURES_META_PATH):
+	"""
+	Memory-maps stored features, None if they have not been built yet
+	-----
+	features_path:
+		Location of the float32 vectors
+	meta_path:
+		Location of the configuration and course URLs
+	"""
+
+	if not (os.path.exists(features_path) and os.path.exists(meta_path)):
+		return None
+	vectors = np.load(features_path, mmap_mode='r')
+	with open(meta_path) as f:
+		meta = json.load(f)
+
+	return FeatureIndex(vectors, meta['config'], meta['course_urls'],
+		meta.get('folded', 0))
+
+def update_features(diff, df, config=DEFAULT_CONFIG, processes=1,
+				refit_fraction=0.2, model_path=FEATURES_MODEL_PATH):
+	"""
+	Stores the features of df, folding only the added and updated
+	courses into the fitted models; refits from scratch when the stored
+	features do not belong to the previous catalog or when more than
+	refit_fraction of the courses were folded in, since new terms are
+	only learnt by a refit
+	-----
+	diff:
+		dataset.CatalogDiff between the previous catalog and df
+	df:
+		New prepared dataframe
+	config:
+		Configuration of the pipeline
+	processes:
+		Number of keyword extraction processes
+	refit_fraction:
+		Share of folded in courses that triggers a refit
+	model_path:
+		Location of the fitted models
+	"""
+
+	index = load_features()
+	folded = diff.changed.shape[0] + (index.folded if index else 0)
+	if(index is None or index.config != config
+			or list(index.course_urls) != diff.old_urls
+			or not os.path.exists(model_path)
+			or folded > refit_fraction * len(df)):
+		build_features(df, config, processes).save()
+		return load_features()
+
+	with open(model_path, 'rb') as f:
+		model = pickle.load(f)
+	vectors = np.empty((len(df), index.matrix.shape[1]), dtype=np.float32)
+	vectors[diff.kept_new] = index.matrix[diff.kept_old]
+	if diff.changed.shape[0]:
+		vectors[diff.changed] = transform(model, df.iloc[diff.changed], processes)
+
+	FeatureIndex(vectors, config, list(df['course_url']), folded).save()
+	return load_features()
+
+def get_features(df, config=DEFAULT_CONFIG):
+	"""
+	Loads the stored features of df, building and storing them when they
+	are missing, were built for a different catalog or configuration
+	-----
+	df:
+		Prepared dataframe
+	config:
+		Configuration of the pipeline
+	"""
+
+	index = load_features()
+	if(index is None or index.config != config or not index.matches(df)):
+		build_features(df, config).save()
+		# served from the memory map like any later load
+		index = load_features()
+
+	return index
+
+# representations the recommendations can be computed on
+REPRESENTATIONS = {
+	"svd":get_features,
+	"keywords":get_index
+}
+
+def get_vectors(df, representation='svd'):
+	"""
+	Index of df in the chosen representation
+	-----
+	df:
+		Prepared dataframe
+	representation:
+		'svd' for the compact feature vectors, 'keywords' for the sparse
+		keyword counts
+	"""
+
+	if representation not in REPRESENTATIONS:
+		raise ValueError("representation must be one of "
+			+ ", ".join(REPRESENTATIONS) + ", got " + repr(representation))
+	return REPRESENTATIONS[representation](df)
@@ -0,0 +1,284 @@
+"""
+HTTP Client shared by the scrapers
+	- One pooled session for all requests
+	- Retries with exponential backoff on failures and 429/5xx responses
+	- Per-host rate limit
+	- Ordered concurrent fetching on a thread pool
+	- On-disk response cache with conditional requests and offline replay
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import requests
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlparse
+from urllib3.util.retry import Retry
+
+CACHE_DIR = os.path.join("data/http-cache")
+
+class CacheMiss(requests.RequestException):
+	"""
+	Raised in offline mode for URLs that were never cached
+	"""
+
+class HttpCache:
+	"""
+	Gzipped response bodies with their validators, evicting the least
+	recently used entries once the cache grows past max_size bytes
+	"""
+
+	directory = None
+	max_size = None
+	size = None
+
+	def __init__(self, directory=CACHE_DIR, max_size=512 * 1024 * 1024):
+		"""
+		directory:
+			Folder the entries are stored in
+		max_size:
+			Size limit of the stored bodies and metadata in bytes
+		"""
+
+		self.directory = directory
+		self.max_size = max_size
+		self.lock = threading.Lock()
+		os.makedirs(directory, exist_ok=True)
+		self.size = sum(os.path.getsize(os.path.join(directory, name))
+			for name in os.listdir(directory))
+
+	def _paths(self, url):
+		key = hashlib.sha1(url.encode('utf-8')).hexdigest()
+		base = os.path.join(self.directory, key)
+		return base + ".gz", base + ".json"
+
+	def lookup(self, url):
+		"""
+		Cached metadata and body of a URL, None if not cached
+		-----
+		url:
+			URL of the page
+		"""
+
+		body_path, meta_path = self._paths(url)
+		try:
+			with open(meta_path) as f:
+				meta = json.load(f)
+			with gzip.open(body_path, 'rb') as f:
+				body = f.read()
+		except (OSError, ValueError):
+			return None
+		# the access time drives the eviction order
+		os.utime(meta_path)
+		return meta, body
+
+	def store(self, url, response):
+		"""
+		Stores a successful response
+		-----
+		url:
+			URL of the page
+		response:
+			Response with status 200
+		"""
+
+		body_path, meta_path = self._paths(url)
+		meta = {
+			"url":url,
+			"etag":response.headers.get("ETag"),
+			"last_modified":response.headers.get("Last-Modified"),
+			"content_type":response.headers.get("Content-Type")
+		}
+		old_size = sum(os.path.getsize(p) for p in (body_path, meta_path)
+			if os.path.exists(p))
+
+		# write aside and rename so readers never see half an entry
+		tmp = "." + str(threading.get_ident())
+		with gzip.open(body_path + tmp, 'wb') as f:
+			f.write(response.content)
+		with open(meta_path + tmp, 'w') as f:
+			json.dump(meta, f)
+		os.replace(body_path + tmp, body_path)
+		os.replace(meta_path + tmp, meta_path)
+
+		new_size = os.path.getsize(body_path) + os.path.getsize(meta_path)
+		with self.lock:
+			self.size += new_size - old_size
+			if(self.size > self.max_size):
+				self.evict()
+
+	def evict(self):
+		"""
+		Removes least recently used entries until the cache fits
+		"""
+
+		entries = []
+		for name in os.listdir(self.directory):
+			if name.endswith(".json"):
+				meta_path = os.path.join(self.directory, name)
+				entries.append((os.path.getmtime(meta_path), meta_path))
+		entries.sort()
+
+		for _, meta_path in entries:
+			if(self.size <= self.max_size):
+				break
+			body_path = meta_path[:-len(".json")] + ".gz"
+			for path in (body_path, meta_path):
+				if os.path.exists(path):
+					self.size -= os.path.getsize(path)
+					os.remove(path)
+
+def cached_response(url, meta, body):
+	"""
+	Builds a response object from a cache entry
+	"""
+
+	response = requests.Response()
+	response.url = url
+	response.status_code = 200
+	response._content = body
+	if meta.get("content_type"):
+		response.headers["Content-Type"] = meta["content_type"]
+	return response
+
+class RateLimiter:
+	"""
+	Spaces out requests to the same host
+	"""
+
+	interval = None
+	next_slot = None
+
+	def __init__(self, rate_limit):
+		"""
+		rate_limit:
+			Maximum requests per second per host, None for no limit
+		"""
+
+		self.interval = 0.0 if not rate_limit else 1.0 / rate_limit
+		self.next_slot = {}
+		self.lock = threading.Lock()
+
+	def wait(self, host):
+		"""
+		Blocks until a request to host is allowed
+		-----
+		host:
+			Host name of the URL about to be fetched
+		"""
+
+		if(self.interval == 0.0):
+			return
+		with self.lock:
+			now = time.monotonic()
+			slot = max(now, self.next_slot.get(host, now))
+			self.next_slot[host] = slot + self.interval
+		if(slot > now):
+			time.sleep(slot - now)
+
+class HttpClient:
+	"""
+	Pooled, rate limited and retrying HTTP client
+	"""
+
+	session = None
+	limiter = None
+	max_concurrency = None
+	timeout = None
+	cache = None
+	offline = None
+
+	def __init__(self, max_concurrency=4, rate_limit=5, retries=3,
+				backoff=0.5, timeout=30, cache=None, offline=False):
+		"""
+		max_concurrency:
+			Number of requests in flight at once
+		rate_limit:
+			Maximum requests per second per host, None for no limit
+		retries:
+			Attempts after the first one fails
+		backoff:
+			Backoff factor, waits are backoff * 2 ** (attempt - 1) seconds
+		timeout:
+			Seconds to wait for a response
+		cache:
+			HttpCache to revalidate and store responses in, None to disable
+		offline:
+			Only replay responses from the cache, never touch the network
+		"""
+
+		retry = Retry(total=retries, backoff_factor=backoff,
+			status_forcelist=(429, 500, 502, 503, 504),
+			raise_on_status=False)
+		adapter = HTTPAdapter(pool_connections=max_concurrency,
+			pool_maxsize=max_concurrency, max_retries=retry)
+		self.session = requests.Session()
+		self.session.mount("http://", adapter)
+		self.session.mount("https://", adapter)
+
+		self.limiter = RateLimiter(rate_limit)
+		self.max_concurrency = max_concurrency
+		self.timeout = timeout
+		self.cache = cache
+		self.offline = offline
+
+	def get(self, url):
+		"""
+		Fetches a URL through the shared session, raising
+		requests.HTTPError once the retries of an error status are spent
+		-----
+		url:
+			URL of the page
+		"""
+
+		if self.cache is None:
+			self.limiter.wait(urlparse(url).netloc)
+			response = self.session.get(url, timeout=self.timeout)
+			# an error page must never be parsed as a course
+			response.raise_for_status()
+			return response
+
+		cached = self.cache.lookup(url)
+		if self.offline:
+			if cached is None:
+				raise CacheMiss("Not cached: " + url)
+			return cached_response(url, *cached)
+
+		# ask the server whether the cached copy is still current
+		headers = {}
+		if cached is not None:
+			meta = cached[0]
+			if meta.get("etag"):
+				headers["If-None-Match"] = meta["etag"]
+			if meta.get("last_modified"):
+				headers["If-Modified-Since"] = meta["last_modified"]
+
+		self.limiter.wait(urlparse(url).netloc)
+		response = self.session.get(url, headers=headers, timeout=self.timeout)
+		if(response.status_code == 304 and cached is not None):
+			return cached_response(url, *cached)
+		# an error page must never be parsed or cached as a course
+		response.raise_for_status()
+		if(response.status_code == 200):
+			self.cache.store(url, response)
+		return response
+
+	def map(self, fn, items):
+		"""
+		Applies fn to every item concurrently, results keep the item order
+		-----
+		fn:
+			Function of one item, typically fetching and parsing a page
+		items:
+			Iterable of items, e.g. URLs
+		"""
+
+		if(self.max_concurrency <= 1):
+			return [fn(item) for item in items]
+		with ThreadPoolExecutor(self.max_concurrency) as pool:
+			return list(pool.map(fn, items))
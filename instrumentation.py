@@ -0,0 +1,300 @@
+"""
+Instrumentation
+	- stage: records the wall time, CPU time and allocated memory of a
+	  named stage, e.g. loading the data, the skill filter, keyword
+	  extraction, vectorizing, similarity scoring or chart rendering
+	- Totals per stage are exported in the Prometheus text format, every
+	  stage is also logged as a JSON line on the "coureco.stages" logger
+	- The stages of the current request are kept per thread for the
+	  debug panel of the app
+	- Processes sharing one endpoint, e.g. the forked service workers,
+	  publish their totals to a shared directory, one file per process,
+	  and the Prometheus export sums them, so every worker answers a
+	  scrape with the same monotonic totals
+
+Disabled unless COURECO_INSTRUMENT is set: "1" records times,
+"memory" traces allocations too, which slows Python code down. Disabled
+stages cost a flag check.
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+import tracemalloc
+
+from contextlib import contextmanager
+from functools import wraps
+
+LOGGER = logging.getLogger("coureco.stages")
+
+class NullStage:
+	"""
+	Context manager of a disabled stage
+	"""
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc):
+		return False
+
+NULL_STAGE = NullStage()
+
+class Metrics:
+	"""
+	Stage totals of the process and the stages of every thread's
+	current request
+	"""
+
+	enabled = False
+	trace_memory = False
+	totals = None # stage -> [calls, wall, cpu, allocated]
+	lock = None
+	local = None
+	share_dir = None # directory of the totals of every process, if shared
+
+	def __init__(self, enabled=False, trace_memory=False):
+		"""
+		enabled:
+			Whether stages are recorded at all
+		trace_memory:
+			Whether the allocated memory of every stage is traced
+		"""
+
+		self.totals = {}
+		self.lock = threading.Lock()
+		self.local = threading.local()
+		self.configure(enabled, trace_memory)
+
+	def configure(self, enabled, trace_memory=False):
+		"""
+		Turns recording and memory tracing on or off
+		"""
+
+		self.enabled = enabled
+		self.trace_memory = enabled and trace_memory
+		if(self.trace_memory and not tracemalloc.is_tracing()):
+			tracemalloc.start()
+
+	def stage(self, name):
+		"""
+		Context manager recording a stage, a no-op when disabled
+		-----
+		name:
+			Stage name, e.g. 'filter'
+		"""
+
+		if not self.enabled:
+			return NULL_STAGE
+		return self.record(name)
+
+	@contextmanager
+	def record(self, name):
+		# frames of the enclosing stages, [start, peak] of traced memory
+		frames = self.frames()
+		if self.trace_memory:
+			current, peak = tracemalloc.get_traced_memory()
+			if frames:
+				frames[-1][1] = max(frames[-1][1], peak)
+			if hasattr(tracemalloc, 'reset_peak'):
+				tracemalloc.reset_peak()
+			frames.append([current, current])
+		start_wall = time.perf_counter()
+		start_cpu = time.thread_time()
+		try:
+			yield
+		finally:
+			wall = time.perf_counter() - start_wall
+			cpu = time.thread_time() - start_cpu
+			allocated = 0
+			if self.trace_memory and frames:
+				start, seen = frames.pop()
+				current, peak = tracemalloc.get_traced_memory()
+				if not hasattr(tracemalloc, 'reset_peak'):
+					# net allocations only, the peak cannot be rewound
+					peak = current
+				peak = max(peak, seen)
+				allocated = max(peak - start, 0)
+				if frames:
+					frames[-1][1] = max(frames[-1][1], peak)
+			self.add(name, wall, cpu, allocated)
+
+	def frames(self):
+
+		if not hasattr(self.local, 'frames'):
+			self.local.frames = []
+		return self.local.frames
+
+	def add(self, name, wall, cpu, allocated):
+		"""
+		Adds a stage measurement to the totals and the current request
+		"""
+
+		with self.lock:
+			total = self.totals.setdefault(name, [0, 0.0, 0.0, 0])
+			total[0] += 1
+			total[1] += wall
+			total[2] += cpu
+			total[3] += allocated
+			if self.share_dir is not None:
+				self.publish()
+		record = {
+			"stage":name,
+			"wall_seconds":wall,
+			"cpu_seconds":cpu,
+			"allocated_bytes":allocated
+		}
+		self.request_stages().append(record)
+		if LOGGER.isEnabledFor(logging.INFO):
+			LOGGER.info(json.dumps(record))
+
+	def begin_request(self):
+		"""
+		Starts collecting the stages of a new request in this thread
+		"""
+
+		self.local.stages = []
+
+	def request_stages(self):
+		"""
+		Stages recorded in this thread since begin_request
+		"""
+
+		if not hasattr(self.local, 'stages'):
+			self.local.stages = []
+		return self.local.stages
+
+	def snapshot(self):
+		"""
+		Totals of every stage, {stage: {calls, wall_seconds, ...}}
+		"""
+
+		with self.lock:
+			return {name:{
+					"calls":calls,
+					"wall_seconds":wall,
+					"cpu_seconds":cpu,
+					"allocated_bytes":allocated
+				} for name, (calls, wall, cpu, allocated) in self.totals.items()}
+
+	def share(self, directory):
+		"""
+		Publishes the totals of this process to a directory shared with
+		the other processes, whose totals the Prometheus export adds up
+		-----
+		directory:
+			Directory of one file per process, None to stop sharing
+		"""
+
+		with self.lock:
+			self.share_dir = directory
+			if directory is not None:
+				os.makedirs(directory, exist_ok=True)
+				self.publish()
+
+	def publish(self):
+		# called with the lock held, so files only ever grow
+		path = os.path.join(self.share_dir, str(os.getpid()) + ".json")
+		with open(path + ".tmp", 'w') as f:
+			json.dump(self.totals, f)
+		os.replace(path + ".tmp", path)
+
+	def combined(self):
+		"""
+		Totals of every stage summed over the sharing processes, those of
+		this process alone when not shared
+		"""
+
+		totals = self.snapshot()
+		if self.share_dir is None:
+			return totals
+		fields = ["calls", "wall_seconds", "cpu_seconds", "allocated_bytes"]
+		own = str(os.getpid()) + ".json"
+		for file_name in sorted(os.listdir(self.share_dir)):
+			if(file_name == own or not file_name.endswith(".json")):
+				continue
+			try:
+				with open(os.path.join(self.share_dir, file_name)) as f:
+					other = json.load(f)
+			except (OSError, ValueError):
+				continue
+			for name, values in other.items():
+				total = totals.setdefault(name, dict.fromkeys(fields, 0))
+				for field, value in zip(fields, values):
+					total[field] += value
+		return totals
+
+	def prometheus(self, prefix="coureco_stage"):
+		"""
+		Totals in the Prometheus text exposition format, summed over the
+		sharing processes
+		"""
+
+		series = [
+			("calls_total", "calls", "Calls of the stage"),
+			("wall_seconds_total", "wall_seconds", "Wall time spent in the stage"),
+			("cpu_seconds_total", "cpu_seconds", "CPU time spent in the stage"),
+			("allocated_bytes_total", "allocated_bytes",
+				"Peak memory allocated by the stage, 0 unless traced")
+		]
+		snapshot = self.combined()
+		lines = []
+		for suffix, field, description in series:
+			metric = prefix + "_" + suffix
+			lines.append("# HELP " + metric + " " + description)
+			lines.append("# TYPE " + metric + " counter")
+			for name in sorted(snapshot):
+				lines.append(metric + '{stage="' + name + '"} '
+					+ repr(snapshot[name][field]))
+		return "\n".join(lines) + "\n"
+
+	def reset(self):
+
+		with self.lock:
+			self.totals.clear()
+			if self.share_dir is not None:
+				self.publish()
+
+def from_environment():
+	"""
+	Metrics configured by COURECO_INSTRUMENT, see the module docstring
+	"""
+
+	setting = os.environ.get("COURECO_INSTRUMENT", "").lower()
+	return Metrics(setting not in ("", "0", "off"), setting == "memory")
+
+# process-wide metrics every module records into
+METRICS = from_environment()
+
+def stage(name):
+	"""
+	Context manager recording a stage in the process-wide metrics
+	-----
+	name:
+		Stage name
+	"""
+
+	return METRICS.stage(name)
+
+def instrumented(name):
+	"""
+	Decorates a function whose calls are recorded as a stage
+	-----
+	name:
+		Stage name
+	"""
+
+	def decorate(fn):
+
+		@wraps(fn)
+		def wrapper(*args, **kwargs):
+			if not METRICS.enabled:
+				return fn(*args, **kwargs)
+			with METRICS.record(name):
+				return fn(*args, **kwargs)
+
+		return wrapper
+
+	return decorate
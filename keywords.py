@@ -0,0 +1,170 @@
+"""
+Keyword Extraction
+	- RAKE keywords of every description, in chunks across a process pool
+	- Memoized by a hash of the description in an append-only JSON lines
+	  file, so a rebuild only processes new or changed courses
+	- Streamed in input order, never held as one list
+"""
+
+import os
+import json
+import hashlib
+import multiprocessing
+
+from collections import deque
+from rake_nltk import Rake
+
+from instrumentation import stage
+
+KEYWORDS_PATH = os.path.join("data/description-keywords.jsonl")
+
+class KeywordStore:
+	"""
+	Append-only JSON lines file of keywords keyed by description hash
+	"""
+
+	path = None
+	keywords = None # hash -> keywords string
+
+	def __init__(self, path=KEYWORDS_PATH):
+
+		self.path = path
+		self.keywords = {}
+		if os.path.exists(path):
+			with open(path) as f:
+				for line in f:
+					try:
+						record = json.loads(line)
+					except ValueError:
+						# a crash can leave the last line half written
+						continue
+					self.keywords[record["hash"]] = record["keywords"]
+		self.file = None
+
+	def get(self, digest):
+		"""
+		Stored keywords of a description hash, None if unknown
+		"""
+
+		return self.keywords.get(digest)
+
+	def add(self, digest, keywords):
+		"""
+		Stores the keywords of a description hash
+		"""
+
+		if self.file is None:
+			self.file = open(self.path, 'a')
+		self.keywords[digest] = keywords
+		self.file.write(json.dumps({"hash":digest, "keywords":keywords}) + "\n")
+
+	def close(self):
+
+		if self.file is not None:
+			self.file.close()
+			self.file = None
+
+def content_hash(text):
+	"""
+	SHA-256 of a description
+	"""
+
+	return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+def extract_chunk(texts):
+	"""
+	Keywords of a chunk of descriptions, the words RAKE scored joined
+	by spaces
+	-----
+	texts:
+		List of descriptions
+	"""
+
+	r = Rake()
+	keyword_strings = []
+	for descr in texts:
+		r.extract_keywords_from_text(descr)
+		keyword_strings.append(" ".join(r.get_word_degrees()))
+	return keyword_strings
+
+def chunked(values, chunk_size):
+
+	chunk = []
+	for value in values:
+		chunk.append(value)
+		if(len(chunk) == chunk_size):
+			yield chunk
+			chunk = []
+	if chunk:
+		yield chunk
+
+def iter_keywords(texts, processes=1, chunk_size=500, store=None):
+	"""
+	Yields the keywords of every description, in order
+	-----
+	texts:
+		Iterable of descriptions
+	processes:
+		Number of worker processes, chunks are extracted in parallel if > 1
+	chunk_size:
+		Number of descriptions sent to a worker at once
+	store:
+		KeywordStore to reuse and record keywords in, None to always extract
+	"""
+
+	pool = multiprocessing.Pool(processes) if processes > 1 else None
+	# chunks submitted ahead of the one being yielded, bounds memory
+	pending = deque()
+
+	def finish(hashes, found, result):
+		if pool:
+			# time spent waiting on the workers
+			with stage("keywords"):
+				result = result.get()
+		computed = iter(result)
+		for digest, keywords in zip(hashes, found):
+			if keywords is None:
+				keywords = next(computed)
+				if store is not None:
+					store.add(digest, keywords)
+			yield keywords
+
+	try:
+		for chunk in chunked(texts, chunk_size):
+			hashes = [content_hash(descr) for descr in chunk]
+			found = [store.get(digest) if store is not None else None
+				for digest in hashes]
+			missing = [descr for descr, keywords in zip(chunk, found)
+				if keywords is None]
+			if pool:
+				result = pool.apply_async(extract_chunk, (missing,))
+			else:
+				with stage("keywords"):
+					result = extract_chunk(missing)
+			pending.append((hashes, found, result))
+			if(len(pending) > 2 * processes):
+				yield from finish(*pending.popleft())
+		while pending:
+			yield from finish(*pending.popleft())
+	finally:
+		if pool:
+			pool.terminate()
+		if store is not None:
+			store.close()
+
+def extract_keywords(df, feature, processes=1, store_path=KEYWORDS_PATH):
+	"""
+	Yields the RAKE keywords of every row of a text feature
+	-----
+	df:
+		dataframe
+	feature:
+		Name of the text column
+	processes:
+		Number of worker processes
+	store_path:
+		JSON lines file memoizing the keywords, None to always extract
+	"""
+
+	store = KeywordStore(store_path) if store_path else None
+	return iter_keywords(df[feature], processes, store=store)
@@ -0,0 +1,140 @@
+"""
+Page Parser shared by the scrapers
+	- Fields are declared as CSS selectors with an extractor
+	- All fields of a page are collected in a single traversal of the
+	  lxml tree instead of one full-document search per field
+
+Supported selectors are compound selectors of an optional tag and any
+number of classes, e.g. "div._jen3vs._1d8rgfy3", joined by the child
+combinator ">" -- everything the Coursera pages need.
+"""
+
+import lxml.etree
+import lxml.html
+
+def text(element):
+	"""
+	Text of an element and its descendants
+	"""
+
+	return element.text_content()
+
+def link_href(element):
+	"""
+	href of the first link inside an element
+	"""
+
+	if(element.tag == 'a'):
+		return element.get('href')
+	links = element.iterdescendants('a')
+	link = next(links, None)
+	return None if link is None else link.get('href')
+
+class Field:
+	"""
+	Declares what to pick from a page
+	"""
+
+	selector = None
+	extract = None
+	steps = None
+
+	def __init__(self, selector, extract=text):
+		"""
+		selector:
+			CSS selector of the elements
+		extract:
+			Function turning a matched element into a value
+		"""
+
+		self.selector = selector
+		self.extract = extract
+		self.steps = [parse_step(step) for step in selector.split('>')]
+
+def parse_step(step):
+	"""
+	Splits a compound selector into its tag and set of classes
+	-----
+	step:
+		e.g. "div.partner-name" or ".ratings-text"
+	"""
+
+	parts = step.strip().split('.')
+	tag = parts[0] or None
+	return tag, frozenset(parts[1:])
+
+def step_matches(element, step, classes=None):
+	tag, needed = step
+	if(tag is not None and element.tag != tag):
+		return False
+	if classes is None:
+		classes = set((element.get('class') or '').split())
+	return needed <= classes
+
+class PageSpec:
+	"""
+	A set of fields compiled for single-pass extraction
+	"""
+
+	fields = None
+	by_class = None
+	by_tag = None
+
+	def __init__(self, fields):
+		"""
+		fields:
+			Dictionary of field name -> Field
+		"""
+
+		self.fields = fields
+		# candidates are looked up by one class (or the tag) of the
+		# last step, so most elements are rejected with a dict miss
+		self.by_class = {}
+		self.by_tag = {}
+		for name, field in fields.items():
+			tag, needed = field.steps[-1]
+			if needed:
+				key = sorted(needed)[0]
+				self.by_class.setdefault(key, []).append(name)
+			else:
+				self.by_tag.setdefault(tag, []).append(name)
+
+	def parse(self, content):
+		"""
+		Extracts every field in document order
+		-----
+		content:
+			HTML of the page, bytes or str
+		"""
+
+		values = {name:[] for name in self.fields}
+		try:
+			root = lxml.html.fromstring(content)
+		except lxml.etree.ParserError:
+			# empty document
+			return values
+		for element in root.iter():
+			if not isinstance(element.tag, str):
+				# comments and processing instructions
+				continue
+			class_attr = element.get('class')
+			classes = set(class_attr.split()) if class_attr else set()
+
+			candidates = self.by_tag.get(element.tag, [])
+			for c in classes:
+				candidates = candidates + self.by_class.get(c, [])
+			for name in candidates:
+				field = self.fields[name]
+				if self.matches(element, field.steps, classes):
+					values[name].append(field.extract(element))
+		return values
+
+	def matches(self, element, steps, classes):
+		if not step_matches(element, steps[-1], classes):
+			return False
+		# walk up for the child combinators
+		for step in reversed(steps[:-1]):
+			element = element.getparent()
+			if element is None or not step_matches(element, step):
+				return False
+		return True
@@ -0,0 +1,122 @@
+"""
+Preprocessing shared by the app and data_preparation.py
+	- Cleans column names
+	- Converts ratings, counts and percentages to numbers
+	- Parses the estimated time to complete into hours
+	- Splits skills and instructors into lists, coded as int32 offsets
+	  and ids against one vocabulary per column, see coded_lists
+	- Stores the few distinct providers, product types and difficulties
+	  as categoricals
+
+Every step works on whole columns with pandas string methods. The text
+columns that turn into numbers repeat a small set of values, so those
+are parsed once per distinct value and broadcast back by their codes.
+"""
+
+import pandas as pd
+import numpy as np
+
+from coded_lists import CodedLists
+
+# Coursera estimates long programmes in days, weeks and months at its
+# suggested pace of roughly 10 hours a week, so a day of it is 10 / 7
+# hours of study, not 24
+HOURS_PER_WEEK = 10
+HOURS_PER_UNIT = {
+	"minute":1 / 60,
+	"hour":1,
+	"day":HOURS_PER_WEEK / 7,
+	"week":HOURS_PER_WEEK,
+	"month":HOURS_PER_WEEK * 52 / 12
+}
+
+CATEGORICAL_COLUMNS = ['learning_product_type', 'course_provided_by',
+	'course_difficulty']
+
+def clean_col_names(columns):
+	"""
+	Cleans column names
+	-----
+	columns:
+		List of column names
+	"""
+
+	return [c.lower().replace(' ','_') for c in columns]
+
+def parse_distinct(s, parser):
+	"""
+	Applies a column parser to the distinct values of s only
+	-----
+	s:
+		Column of text values
+	parser:
+		Function of a Series of text returning a Series of floats
+	"""
+
+	codes, uniques = pd.factorize(s)
+	parsed = parser(pd.Series(uniques, dtype=object)).to_numpy(dtype=np.float64)
+	# missing values get code -1, which picks the NaN appended last
+	values = np.append(parsed, np.nan)[codes]
+	return pd.Series(values, index=s.index, name=s.name)
+
+def make_numeric(s):
+	"""
+	Floats of a column, 'Missing' becomes NaN
+	"""
+
+	return pd.to_numeric(s, errors='coerce')
+
+def make_count_numeric(s):
+	"""
+	Counts like '23k' or '1.5m' as floats, 'Missing' becomes NaN
+	"""
+
+	parts = s.astype(str).str.extract(r'^\s*([\d.]+)\s*([km]?)\s*$')
+	multiplier = parts[1].map({'':1, 'k':1000, 'm':1000000})
+	return pd.to_numeric(parts[0], errors='coerce') * multiplier
+
+def find_hours(s):
+	"""
+	Hours in texts like 'Approx. 4 months to complete', NaN if absent
+	"""
+
+	parts = s.astype(str).str.extract(
+		r'(\d+(?:\.\d+)?)\s*(minute|hour|day|week|month)s?', expand=True)
+	return pd.to_numeric(parts[0], errors='coerce') * parts[1].map(HOURS_PER_UNIT)
+
+def prepare_data(df):
+	"""
+	Prepares the final dataset, returning a new dataframe
+	-----
+	df:
+		dataframe of the two scraped files side by side
+	"""
+
+	# clean column names
+	df = df.rename(columns=dict(zip(df.columns, clean_col_names(df.columns))))
+
+	# impute missing values that creeped in, empty lists of streamed
+	# records included as the CSV files read them back as missing
+	for feature in ['skills', 'instructors']:
+		df[feature] = df[feature].replace('', np.nan).fillna('Missing')
+
+	# making certain features numeric
+	for feature in ['course_rating', 'course_rated_by',
+		'percentage_of_new_career_starts',
+		'percentage_of_pay_increase_or_promotion']:
+		df[feature] = parse_distinct(df[feature], make_numeric)
+	df['enrolled_student_count'] = parse_distinct(df['enrolled_student_count'],
+		make_count_numeric)
+
+	# extract time to complete
+	df['estimated_time_to_complete'] = parse_distinct(
+		df['estimated_time_to_complete'], find_hours)
+
+	# split by skills and instructors
+	df['skills'] = CodedLists.from_strings(df['skills'])
+	df['instructors'] = CodedLists.from_strings(df['instructors'])
+
+	for feature in CATEGORICAL_COLUMNS:
+		df[feature] = df[feature].astype('category')
+
+	return df
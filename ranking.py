@@ -0,0 +1,124 @@
+"""
+Ranking
+	- Quality and popularity signals of every course, computed once
+	  from the prepared dataframe and scaled to [0, 1]:
+		rating: Bayesian average of the rating, so a 5.0 from a handful
+		  of learners does not beat a 4.8 from thousands
+		popularity: log of the enrolled learners
+		career: share of learners reporting a new career or a raise
+	- The weighted signals add up to one prior per course, so blending
+	  them with similarity is a single vectorized add over the
+	  candidates of a query
+"""
+
+import numpy as np
+
+DEFAULT_WEIGHTS = {
+	"similarity":1.0,
+	"rating":0.15,
+	"popularity":0.1,
+	"career":0.05
+}
+
+def scaled(values):
+	"""
+	Values scaled to [0, 1] over the catalog, 0 if they are all equal
+	"""
+
+	low, high = np.min(values), np.max(values)
+	if(high <= low):
+		return np.zeros_like(values)
+	return (values - low) / (high - low)
+
+def bayesian_rating(ratings, counts, prior_count=None):
+	"""
+	Ratings shrunk towards the catalog mean by the number of ratings
+	-----
+	ratings:
+		Average rating of every course, NaN if unrated
+	counts:
+		Number of ratings of every course, NaN if unknown
+	prior_count:
+		Weight of the catalog mean in ratings, the median number of
+		ratings if None
+	"""
+
+	ratings = np.asarray(ratings, dtype=np.float64)
+	counts = np.nan_to_num(np.asarray(counts, dtype=np.float64))
+	rated = ~np.isnan(ratings) & (counts > 0)
+	if not rated.any():
+		return np.zeros(ratings.shape[0])
+	mean = np.average(ratings[rated], weights=counts[rated])
+	if prior_count is None:
+		prior_count = np.median(counts[rated])
+	counts = np.where(rated, counts, 0)
+	ratings = np.where(rated, ratings, mean)
+	return (counts * ratings + prior_count * mean) / (counts + prior_count)
+
+def rating_signal(df):
+
+	return scaled(bayesian_rating(df['course_rating'], df['course_rated_by']))
+
+def popularity_signal(df):
+
+	enrolled = np.nan_to_num(df['enrolled_student_count'].to_numpy(dtype=np.float64))
+	return scaled(np.log1p(enrolled))
+
+def career_signal(df):
+
+	outcomes = df[['percentage_of_new_career_starts',
+		'percentage_of_pay_increase_or_promotion']].to_numpy(dtype=np.float64)
+	reported = ~np.isnan(outcomes).all(axis=1)
+	if not reported.any():
+		return np.zeros(len(df))
+	share = np.full(len(df), np.nan)
+	share[reported] = np.nanmean(outcomes[reported], axis=1)
+	# courses without outcomes get the catalog average
+	share[~reported] = share[reported].mean()
+	return scaled(share)
+
+SIGNALS = {
+	"rating":rating_signal,
+	"popularity":popularity_signal,
+	"career":career_signal
+}
+
+class Ranker:
+	"""
+	Blends similarity with the precomputed signals of every course
+	"""
+
+	weights = None
+	prior = None # weighted sum of the signals, one value per course
+
+	def __init__(self, df, weights=DEFAULT_WEIGHTS):
+		"""
+		df:
+			Prepared dataframe
+		weights:
+			Weight of "similarity" and of each signal, missing ones are 0
+		"""
+
+		unknown = set(weights) - set(SIGNALS) - {"similarity"}
+		if unknown:
+			raise ValueError("unknown ranking signals " + ", ".join(sorted(unknown))
+				+ ", expected similarity, " + ", ".join(SIGNALS))
+		self.weights = dict(weights)
+		self.prior = np.zeros(len(df))
+		for name, signal in SIGNALS.items():
+			if self.weights.get(name):
+				self.prior += self.weights[name] * signal(df)
+		self.prior = self.prior.astype(np.float32)
+
+	def blend(self, similarity, rows=None):
+		"""
+		Blended scores of candidates
+		-----
+		similarity:
+			Similarity of every candidate
+		rows:
+			Row positions of the candidates, all courses if None
+		"""
+
+		prior = self.prior if rows is None else self.prior[rows]
+		return self.weights.get("similarity", 0) * np.asarray(similarity) + prior
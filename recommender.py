@@ -16,177 +16,91 @@ import os
 import matplotlib.pyplot as plt 
 import altair as alt
 
-from rake_nltk import Rake
 from nltk.corpus import stopwords 
-from sklearn.metrics.pairwise import cosine_similarity
-from sklearn.feature_extraction.text import CountVectorizer
+
+from caching import resource
+from coded_lists import decode_lists
+from dataset import load_dataset
+from instrumentation import METRICS, instrumented, stage
+from service import Recommender, ServiceClient
 
 FILTERED_COURSES = None
 SELECTED_COURSE = None
 
-@st.cache(persist=True)
-def clean_col_names(df, columns):
+@resource
+@instrumented("load_data")
+def load_data():
+	# prepared by data_preparation.py, rebuilt if the scraped files changed
+	return load_dataset()
+
+@resource
+def load_recommender():
+	# a running service.py if configured, otherwise in this process
+	service_url = os.environ.get("COURECO_SERVICE_URL")
+	if service_url:
+		return ServiceClient(service_url)
+	return Recommender(load_data())
+
+def filter(chosen_options, how='any'):
 	"""
-	Cleans column names
+	Row positions of the courses teaching the chosen skills
 	-----
-	columns:
-		List of column names
+	chosen_options:
+		List of skills
+	how:
+		'any' or 'all' of the chosen skills
 	"""
 
-	new = []
-	for c in columns:
-		new.append(c.lower().replace(' ','_'))
-	return new
+	return load_recommender().filter(chosen_options, how)
 
-@st.cache(persist=True)
-def prepare_data(df):
+def query(chosen_options, how='any', categories=None, ranges=None):
 	"""
-	Prepares the final dataset
+	Row positions of the courses matching the chosen skills and facets,
+	with the number of courses every option of each facet leaves
 	-----
-	df:
-		dataframe
+	chosen_options:
+		List of skills
+	how:
+		'any' or 'all' of the chosen skills
+	categories:
+		{facet: list of values}
+	ranges:
+		{facet: (low, high)}
 	"""
 
-	# clean column names
-	df.columns = clean_col_names(df, df.columns)
-
-	# impute missing values that creeped in
-	df['skills'] = df['skills'].fillna('Missing')
-	df['instructors'] = df['instructors'].fillna('Missing')
-
-	# making certain features numeric
-	def make_numeric(x):
-		if(x=='Missing'):
-			return np.nan
-		return float(x)
-
-	df['course_rating'] = df['course_rating'].apply(make_numeric)
-	df['course_rated_by'] = df['course_rated_by'].apply(make_numeric)
-	df['percentage_of_new_career_starts'] = df['percentage_of_new_career_starts'].apply(make_numeric)
-	df['percentage_of_pay_increase_or_promotion'] = df['percentage_of_pay_increase_or_promotion'].apply(make_numeric)
-
-	def make_count_numeric(x):
-	    if('k' in x):
-	        return (float(x.replace('k','')) * 1000)
-	    elif('m' in x):
-	        return (float(x.replace('m','')) * 1000000)
-	    elif('Missing' in x):
-	        return (np.nan)
-
-	df['enrolled_student_count'] = df['enrolled_student_count'].apply(make_count_numeric)
-
-    # extract time to complete
-	def find_time(x):
-	    l = x.split(' ')
-	    idx = 0
-	    for i in range(len(l)):
-	        if(l[i].isdigit()):
-	            idx = i 
-	    try:
-	        return (l[idx] + ' ' + l[idx+1])
-	    except:
-	        return l[idx]
-
-	df['estimated_time_to_complete'] = df['estimated_time_to_complete'].apply(find_time)
-
-	# split by skills
-	def split_it(x):
-		return (x.split(','))
-	df['skills'] = df['skills'].apply(split_it)
-
-	return df
-
-@st.cache(allow_output_mutation=True)
-def load_data():
-	source_path1 = os.path.join("data/coursera-courses-overview.csv")
-	source_path2 = os.path.join("data/coursera-individual-courses.csv")
-	df_overview = pd.read_csv(source_path1)
-	df_individual = pd.read_csv(source_path2)
-	df = pd.concat([df_overview, df_individual], axis=1)
-
-	# preprocess it now
-	df = prepare_data(df)
-
-	return df
-
-@st.cache(persist=True)
-def filter(dataframe, chosen_options, feature, id):
-	selected_records = []
-	for i in range(1000):
-		for op in chosen_options:
-			if op in dataframe[feature][i]:
-				selected_records.append(dataframe[id][i])
-	return selected_records
-
-def extract_keywords(df, feature):
-    r = Rake()
-    keyword_lists = []
-    for i in range(1000):
-        descr = df[feature][i]
-        r.extract_keywords_from_text(descr)
-        key_words_dict_scores = r.get_word_degrees()
-        keywords_string = " ".join(list(key_words_dict_scores.keys()))
-        keyword_lists.append(keywords_string)
-        
-    return keyword_lists
-
-def extract_keywords(df, feature):
-
-    r = Rake()
-    keyword_lists = []
-    for i in range(df[feature].shape[0]):
-        descr = df[feature][i]
-        r.extract_keywords_from_text(descr)
-        key_words_dict_scores = r.get_word_degrees()
-        keywords_string = " ".join(list(key_words_dict_scores.keys()))
-        keyword_lists.append(keywords_string)
-        
-    return keyword_lists
-
-def recommendations(df, input_course, cosine_sim, find_similar=True, how_many=5):
-    
-    # initialise recommended courses list
-    recommended = []
-    selected_course = df[df['course_name']==input_course]
-    
-    # index of the course fed as input
-    idx = selected_course.index[0]
-
-    # creating a Series with the similarity scores in descending order
-    if(find_similar):
-        score_series = pd.Series(cosine_sim[idx]).sort_values(ascending = False)
-    else:
-        score_series = pd.Series(cosine_sim[idx]).sort_values(ascending = True)
-
-    # getting the indexes of the top 'how_many' courses
-    if(len(score_series) < how_many):
-    	how_many = len(score_series)
-    top_sugg = list(score_series.iloc[1:how_many+1].index)
-    
-    # populating the list with the titles of the best 10 matching movies
-    for i in top_sugg:
-        qualified = df['course_name'].iloc[i]
-        recommended.append(qualified)
-        
-    return recommended
-
-def content_based_recommendations(df, input_course, courses):
-
-	# filter out the courses
-	df = df[df['course_name'].isin(courses)].reset_index()
-	# create description keywords
-	df['descr_keywords'] = extract_keywords(df, 'description')
-	# instantiating and generating the count matrix
-	count = CountVectorizer()
-	count_matrix = count.fit_transform(df['descr_keywords'])
-	# generating the cosine similarity matrix
-	cosine_sim = cosine_similarity(count_matrix, count_matrix)
-
-	# make the recommendation
-	rec_courses_similar = recommendations(df, input_course, cosine_sim, True)
-	temp_sim = df[df['course_name'].isin(rec_courses_similar)]
-	rec_courses_dissimilar = recommendations(df, input_course, cosine_sim, False)
-	temp_dissim = df[df['course_name'].isin(rec_courses_dissimilar)]
+	return load_recommender().query(chosen_options, how, categories, ranges)
+
+def search(text, how_many=10, chosen_options=None, how='any'):
+	"""
+	Row positions and scores of the courses best matching a text query
+	-----
+	text:
+		Words to look for in the course names, descriptions and skills
+	how_many:
+		Number of courses returned at most
+	chosen_options:
+		Skills to filter the courses by, the whole catalog if None
+	how:
+		'any' or 'all' of the chosen skills
+	"""
+
+	return load_recommender().search_text(text, how_many, chosen_options, how)
+
+def facet_select(label, counts):
+
+	# options keep their order whatever the counts, so the widget keeps
+	# its selection
+	counts = dict(counts)
+	return st.sidebar.multiselect(label, list(counts),
+		format_func=lambda option: option + " (" + str(counts[option]) + ")")
+
+def content_based_recommendations(df, input_course, chosen_options, how):
+
+	# recommend among the skill-filtered courses
+	similar, _, dissimilar, _ = load_recommender().similar(input_course, 5,
+		chosen_options, how)
+	temp_sim = decode_lists(df.iloc[similar])
+	temp_dissim = decode_lists(df.iloc[dissimilar])
 
 	# top 3
 	st.write("Top 5 most similar courses")
@@ -194,6 +108,14 @@ def content_based_recommendations(df, input_course, courses):
 	st.write("Top 5 most dissimilar courses")
 	st.write(temp_dissim)
 
+def profile_recommendations(df, taken_courses, chosen_options, how):
+
+	# recommend among the skill-filtered courses, none of those taken
+	rows, _ = load_recommender().profile(taken_courses, 10, None,
+		chosen_options, how)
+	st.write("Top 10 courses for the courses you have taken")
+	st.write(decode_lists(df.iloc[rows]))
+
 def prep_for_cbr(df):
 
 	# content-based filtering
@@ -209,19 +131,47 @@ def prep_for_cbr(df):
 		" in the previous section.")
 	st.write("Choose course from 'Select Course' dropdown on the sidebar")
 
+	# search by text, ranked by relevance
+	search_text = st.sidebar.text_input("Search Courses")
+
 	# filter by skills
-	skills_avail = []
-	for i in range(1000):
-		skills_avail = skills_avail + df['skills'][i]
-	skills_avail = list(set(skills_avail))
-	skills_select = st.sidebar.multiselect("Select Skills", skills_avail)
+	skill_counts = dict(load_recommender().skill_vocabulary())
+	skills_select = st.sidebar.multiselect("Select Skills", list(skill_counts),
+		format_func=lambda skill: skill + " (" + str(skill_counts[skill]) + ")")
+	skills_how = st.sidebar.radio("Match Skills", ('any', 'all'), index=0)
 	# use button to make the update of filtering
 	skill_filtered = None
 	courses = None
 	input_course = "Nothing"
 	#if st.sidebar.button("Filter Courses"):
-	temp = filter(df, skills_select, 'skills', 'course_url')
-	skill_filtered = df[df['course_url'].isin(temp)].reset_index()
+	# narrow by facets, the counts of each one apply the choices above it;
+	# a search without skills covers the whole catalog, facets included
+	facet_skills = None if (search_text and not skills_select) else skills_select
+	_, counts = query(facet_skills, skills_how)
+	providers = facet_select("Provided By", counts['course_provided_by'])
+	categories = {"course_provided_by":providers}
+	_, counts = query(facet_skills, skills_how, categories)
+	categories["course_difficulty"] = facet_select("Difficulty",
+		counts['course_difficulty'])
+	min_rating = st.sidebar.slider("Minimum Rating", 0.0, 5.0, 0.0, 0.5)
+	ranges = {"course_rating":(min_rating or None, None)}
+	_, counts = query(facet_skills, skills_how, categories, ranges)
+	enrolled = {low:sum(count for (start, _), count
+			in counts['enrolled_student_count'] if start >= low)
+		for (low, _), _ in counts['enrolled_student_count']}
+	min_enrolled = st.sidebar.selectbox("Minimum Enrolled Learners",
+		list(enrolled), format_func=lambda low: format(int(low), ",")
+			+ " (" + str(enrolled[low]) + ")")
+	ranges["enrolled_student_count"] = (min_enrolled or None, None)
+	rows, _ = query(facet_skills, skills_how, categories, ranges)
+	if search_text:
+		# best 50 matches within the skills and facets chosen, every match
+		# is ranked as the facets may keep few of the best ones overall
+		found, _ = search(search_text, len(df), skills_select or None,
+			skills_how)
+		rows = found[np.isin(found, rows)][:50]
+	# plain lists for display, only the filtered rows are decoded
+	skill_filtered = decode_lists(df.iloc[rows]).reset_index()
 	# update filtered courses
 	courses = skill_filtered['course_name']
 	st.write("### Filtered courses based on skill preferences")
@@ -235,13 +185,14 @@ def prep_for_cbr(df):
 	st.write("**Number of specializations:**",
 		skill_filtered[skill_filtered['learning_product_type']=='SPECIALIZATION'].shape[0])
 	# basic plots
-	chart = alt.Chart(skill_filtered).mark_bar().encode(
-		y = 'course_provided_by:N',
-		x = 'count(course_provided_by):Q'
-	).properties(
-		title = 'Organizations providing these courses'
-	)
-	st.altair_chart(chart)
+	with stage("chart"):
+		chart = alt.Chart(skill_filtered).mark_bar().encode(
+			y = 'course_provided_by:N',
+			x = 'count(course_provided_by):Q'
+		).properties(
+			title = 'Organizations providing these courses'
+		)
+		st.altair_chart(chart)
 
 	# there should be more than atleast 2 courses
 	if(len(courses)<=2):
@@ -252,14 +203,35 @@ def prep_for_cbr(df):
 	#else:
 		#st.write("```Adjust the 'Select Skills' filter on the sidebar```")
 
+	# without skills the courses come from a search over the whole
+	# catalog, so are their recommendations
+	candidate_skills = skills_select or None
 	rec_radio = st.sidebar.radio("Recommend Similar Courses", ('no', 'yes'), index=0)
-	if (rec_radio=='yes'):
-		content_based_recommendations(df, input_course, courses)
+	if (rec_radio=='yes' and input_course is not None):
+		content_based_recommendations(df, input_course, candidate_skills,
+			skills_how)
+
+	# recommend based on every course the learner has taken
+	taken_courses = st.sidebar.multiselect("Courses You Have Taken",
+		list(df['course_name'].drop_duplicates()))
+	if taken_courses:
+		profile_recommendations(df, taken_courses, candidate_skills,
+			skills_how)
 
 	# recommend based on selected course
 
+def stage_timings():
+
+	# stages of this run of the script, the first loads included
+	stages = pd.DataFrame(METRICS.request_stages(),
+		columns=['stage', 'wall_seconds', 'cpu_seconds', 'allocated_bytes'])
+	st.sidebar.write(stages)
+	st.sidebar.write("**Totals since start**")
+	st.sidebar.write(pd.DataFrame(METRICS.snapshot()).T)
+
 def main():
 
+	METRICS.begin_request()
 	st.title("CouReco")
 	st.write("Exploring Courses on Coursera")
 	st.sidebar.title("Set your Parameters")
@@ -284,7 +256,7 @@ def main():
 		" to show or hide the dataset.")
 	# toggle button to display raw data
 	if st.sidebar.checkbox("Display raw data", key='disp_data'):
-		st.write(df)
+		st.write(decode_lists(df))
 	else:
 		pass
 	st.markdown("### What does each feature represent?")
@@ -300,11 +272,20 @@ def main():
 	st.write("**description:** About the course")
 	st.write("**percentage_of_new_career_starts:** Number of learners who started a new career after taking this course")
 	st.write("**percentage_of_pay_increase_or_promotion:** Number of learners who received a pay increase or promotion after taking this course")
-	st.write("**estimated_time_to_complete:** Approximate time to complete")
+	st.write("**estimated_time_to_complete:** Approximate number of hours to complete")
 	st.write("**instructors:** Instructors of the course")
 
 	# initiate CBR
 	prep_for_cbr(df)
+
+	# query cache statistics
+	if st.sidebar.checkbox("Display cache statistics", key='disp_cache'):
+		st.sidebar.write(load_recommender().cache_stats())
+
+	# stage timings, recorded when COURECO_INSTRUMENT is set
+	if(METRICS.enabled and st.sidebar.checkbox("Display stage timings",
+			key='disp_timings')):
+		stage_timings()
 	
 	
 if __name__=="__main__":
@@ -0,0 +1,95 @@
+"""
+Scrape Pipeline
+	- Streams the courses of the listing pages, joins each one by course
+	  URL with the features of its own page
+	- Prepares every chunk of joined records and appends it to an Arrow
+	  stream as a typed record batch, so memory stays flat however many
+	  pages are crawled
+	- dataset.py builds the dataset from that stream once it exists
+
+Run from the repository root with
+	python scrape_pipeline.py --first-page 1 --last-page 100
+"""
+
+import argparse
+import os
+import pandas as pd
+import pyarrow as pa
+
+from itertools import islice
+
+import preprocessing
+from course_scraper import DataHunter
+from dataset import DATASET_SCHEMA, SCRAPE_PATH
+from http_client import HttpCache
+from scraper import DataMaker
+
+def write_records(records, path=SCRAPE_PATH, chunk_size=500):
+	"""
+	Prepares records a chunk at a time and streams them to an Arrow file,
+	returns the number of records written
+	-----
+	records:
+		Iterable of joined overview and course page records
+	path:
+		Destination of the Arrow stream
+	chunk_size:
+		Number of records prepared and written at once
+	"""
+
+	written = 0
+	records = iter(records)
+	# written aside and renamed so a failed crawl never replaces a good file
+	tmp_path = path + ".tmp"
+	with pa.OSFile(tmp_path, 'wb') as sink:
+		with pa.ipc.new_stream(sink, DATASET_SCHEMA) as writer:
+			while True:
+				chunk = list(islice(records, chunk_size))
+				if not chunk:
+					break
+				df = preprocessing.prepare_data(pd.DataFrame(chunk))
+				writer.write_table(pa.Table.from_pandas(df,
+					schema=DATASET_SCHEMA, preserve_index=False))
+				written += len(chunk)
+	os.replace(tmp_path, path)
+	return written
+
+def run(site="https://coursera.org/courses", first_page=1, last_page=100,
+		path=SCRAPE_PATH, max_concurrency=4, rate_limit=5, cache=None,
+		offline=False, resume=False):
+	"""
+	Crawls the listing pages and the course pages into an Arrow stream
+	-----
+	site, first_page, last_page:
+		Listing pages to crawl, see DataMaker
+	path:
+		Destination of the Arrow stream
+	max_concurrency, rate_limit, cache, offline:
+		Options of the HTTP clients, see HttpClient
+	resume:
+		Only fetch the course pages missing from the checkpoint, see
+		DataHunter
+	"""
+
+	dm = DataMaker(site, first_page, last_page, max_concurrency, rate_limit,
+		cache=cache, offline=offline)
+	dh = DataHunter(None, max_concurrency, rate_limit, cache=cache,
+		offline=offline, resume=resume)
+	return write_records(dh.iter_records(dm.iter_courses()), path)
+
+def main():
+
+	parser = argparse.ArgumentParser(description="Scrapes Coursera into a typed Arrow stream")
+	parser.add_argument("--first-page", type=int, default=1)
+	parser.add_argument("--last-page", type=int, default=100)
+	parser.add_argument("--offline", action="store_true",
+		help="parse pages from the HTTP cache only")
+	parser.add_argument("--resume", action="store_true",
+		help="only fetch the course pages missing from the checkpoint")
+	args = parser.parse_args()
+	written = run(first_page=args.first_page, last_page=args.last_page,
+		cache=HttpCache(), offline=args.offline, resume=args.resume)
+	print("\n" + str(written) + " courses written to " + SCRAPE_PATH)
+
+if __name__=="__main__":
+	main()
@@ -5,10 +5,11 @@ Links Used:
 	https://medium.com/analytics-vidhya/web-scraping-and-coursera-8db6af45d83f
 """
 
-import requests
-from bs4 import BeautifulSoup
 import pandas as pd
 import os
+
+from http_client import HttpCache, HttpClient
+from page_parser import Field, PageSpec, link_href
 	
 # Explore the Website
 # Link: https://www.coursera.org/courses
@@ -16,6 +17,24 @@ import os
 # Query Parameters: ?page=1&index=prod_all_products_term_optimization
 # Page Number Range: 1-100
 
+# fields of a listing page, each one holds 10 courses
+LISTING_PAGE = PageSpec({
+	"courses":Field(".headline-1-text"),
+	"organizations":Field(".horizontal-box > .partner-name"),
+	"links":Field(".ais-InfiniteHits > .ais-InfiniteHits-list > .ais-InfiniteHits-item",
+		link_href),
+	"learning_products":Field("div._jen3vs._1d8rgfy3"),
+	"ratings":Field(".ratings-text"),
+	"num_rated":Field(".ratings-count"),
+	"enrolled":Field(".enrollment-number"),
+	"difficulty":Field(".difficulty")
+})
+
+# columns of coursera-courses-overview.csv
+OVERVIEW_COLUMNS = ["Course URL", "Course Name", "Learning Product Type",
+	"Course Provided By", "Course Rating", "Course Rated By",
+	"Enrolled Student Count", "Course Difficulty"]
+
 class DataMaker:
 	"""
 	Creates the data by scraping the website
@@ -24,24 +43,29 @@ class DataMaker:
 	site_url = None
 	first_page = None
 	last_page = None
-	urls = []
-	courses = []
-	organizations = []
-	learning_products = []
-	ratings = []
-	num_rated = []
-	difficulty = []
-	enrolled = []
-
-	def __init__(self, site, first_page, last_page):
+	client = None
+
+	def __init__(self, site, first_page, last_page, max_concurrency=4,
+				rate_limit=5, cache=None, offline=False):
 		"""
 		Initialises the page limit within
 		which the data is to be scraped
+		-----
+		max_concurrency:
+			Number of pages fetched at once
+		rate_limit:
+			Maximum requests per second to the site, None for no limit
+		cache:
+			HttpCache shared with course_scraper.py, None to disable
+		offline:
+			Parse pages from the cache only
 		"""
 
 		self.site_url = site
 		self.first_page = first_page
 		self.last_page = last_page
+		self.client = HttpClient(max_concurrency, rate_limit,
+			cache=cache, offline=offline)
 
 	def scrape_features(self, page_url):
 		"""
@@ -51,109 +75,95 @@ class DataMaker:
 			URL of the page
 		"""
 
-		# create the soup with a certain page URL
-		course_list_page = requests.get(page_url)
-		course_list_soup = BeautifulSoup(course_list_page.content,
-										'html.parser')
+		course_list_page = self.client.get(page_url)
+		return self.parse_features(course_list_page.content)
 
-		# pick course name
-		cnames = course_list_soup.select(".headline-1-text")
-		for i in range(10):
-			self.courses.append(cnames[i].text)
+	def parse_features(self, content):
+		"""
+		Picks the 8 features of the 10 courses on a listing page, one
+		record per course keyed by the overview columns
+		-----
+		content:
+			HTML of the page
+		"""
 
-		# pick partner name
-		pnames = course_list_soup.select(".horizontal-box > .partner-name")
-		for i in range(10):
-			self.organizations.append(pnames[i].text)
+		# every field is collected in one pass over the page
+		found = LISTING_PAGE.parse(content)
 
-		# pick URLs
 		root = "https://www.coursera.org"
-		links = course_list_soup.select(
-			".ais-InfiniteHits > .ais-InfiniteHits-list > .ais-InfiniteHits-item" 
-		)
-		for i in range(10):
-			self.urls.append(root+links[i].a["href"])
-
-		# pick learning product
-		for i in range(10):
-			learn_pdcts = course_list_soup.find_all('div', '_jen3vs _1d8rgfy3')
-			self.learning_products.append(learn_pdcts[i].text)
-
-		# pick course rating and number of people who rated
-		ratings = []
-		num_ratings = []
-		cratings = course_list_soup.select(
-			".ratings-text")
-		cnumratings = course_list_soup.select(
-			".ratings-count")
+		records = []
 		for i in range(10):
+			record = {
+				"Course URL":root+found["links"][i],
+				"Course Name":found["courses"][i],
+				"Learning Product Type":found["learning_products"][i],
+				"Course Provided By":found["organizations"][i]
+			}
+
+			# pick course rating and number of people who rated
 			try:
-				self.ratings.append(float(cratings[i].text))
+				record["Course Rating"] = float(found["ratings"][i])
 			except:
-				self.ratings.append("Missing")
+				record["Course Rating"] = "Missing"
 			try:
-				self.num_rated.append(int(cnumratings[i].text.\
+				record["Course Rated By"] = int(found["num_rated"][i].\
 					replace(',','').\
 					replace('(','').\
-					replace(')','')))
+					replace(')',''))
 			except:
-				self.num_rated.append("Missing")
+				record["Course Rated By"] = "Missing"
 
-		# pick enrollment number
-		enrollers = course_list_soup.select(".enrollment-number")
-		for i in range(10):
+			# pick enrollment number
 			try:
-				self.enrolled.append(enrollers[i].text)
+				record["Enrolled Student Count"] = found["enrolled"][i]
 			except:
-				self.enrolled.append("Missing")
+				record["Enrolled Student Count"] = "Missing"
 
-		# pick difficulty
-		difficulty = course_list_soup.select(".difficulty")
-		for i in range(10):
-			self.difficulty.append(difficulty[i].text)
+			record["Course Difficulty"] = found["difficulty"][i]
+			records.append(record)
 
-	def crawler(self):
+		return records
+
+	def page_urls(self):
 		"""
-		Traverses between the first and last pages
-		-----
-		base_url:
-			Base URL
+		URLs of the listing pages between the first and last pages
 		"""
 
+		page_urls = []
 		for page in range(self.first_page, self.last_page+1):
-			print("\nCrawling Page " + str(page))
 			page_url = self.site_url + "?page=" + str(page) +\
 			           "&index=prod_all_products_term_optimization"
-			
-			self.scrape_features(page_url)
+			page_urls.append(page_url)
+		return page_urls
 
-	def make_dataset(self):
+	def iter_courses(self):
 		"""
-		Make the dataset
+		Yields the record of every course in page order, fetching only
+		max_concurrency pages at a time
 		"""
 
-		# initiate crawler
-		self.crawler()
+		def crawl(page_url):
+			print("\nCrawling " + page_url)
+			return self.scrape_features(page_url)
 
-		data_dict = {
-			"Course URL":self.urls,
-			"Course Name":self.courses,
-			"Learning Product Type":self.learning_products,
-			"Course Provided By":self.organizations,
-			"Course Rating":self.ratings,
-			"Course Rated By":self.num_rated,
-			"Enrolled Student Count":self.enrolled,
-			"Course Difficulty":self.difficulty
-		}
+		page_urls = self.page_urls()
+		step = max(self.client.max_concurrency, 1)
+		for start in range(0, len(page_urls), step):
+			# results come back in the order of page_urls
+			for records in self.client.map(crawl, page_urls[start:start + step]):
+				yield from records
 
-		data = pd.DataFrame(data_dict)
+	def make_dataset(self):
+		"""
+		Make the dataset
+		"""
 
-		return data
+		return pd.DataFrame(list(self.iter_courses()), columns=OVERVIEW_COLUMNS)
 		
 
 def main():
 
-	dm = DataMaker("https://coursera.org/courses", 1,100)
+	dm = DataMaker("https://coursera.org/courses", 1,100, cache=HttpCache())
 	df = dm.make_dataset()
 	destination_path = os.path.join("data/coursera-courses-overview.csv")
 	df.to_csv(destination_path, index=False)
@@ -0,0 +1,228 @@
+"""
+Search Index
+	- Tokenizes the name, description and skills of every course with
+	  the NLTK English stopwords removed
+	- Precomputes the BM25 weight of every term in every course, fields
+	  counted with their own weights, as a sparse matrix with one column
+	  per term
+	- A query sums the columns of its terms over the postings only and
+	  keeps the top k, optionally among the rows of a skill filter
+	- Stored on disk at data preparation time, like the similarity index
+"""
+
+import os
+import re
+import json
+import numpy as np
+import scipy.sparse as sp
+
+from nltk.corpus import stopwords
+from sklearn.feature_extraction.text import CountVectorizer
+
+from instrumentation import instrumented
+
+SEARCH_PATH = os.path.join("data/search-index.npz")
+SEARCH_META_PATH = os.path.join("data/search-meta.json")
+
+# fields with the weight of one occurrence of a term in them
+SEARCH_FIELDS = {
+	"course_name":3.0,
+	"skills":2.0,
+	"description":1.0
+}
+K1 = 1.2
+B = 0.75
+
+def stop_words():
+	"""
+	NLTK English stopwords, with the tokens of the contracted ones,
+	e.g. 'don' of "don't", as the vectorizer splits them
+	"""
+
+	words = set(stopwords.words('english'))
+	for word in list(words):
+		words.update(re.findall(r"(?u)\b\w\w+\b", word))
+	return sorted(words)
+
+def vectorizer(vocabulary=None):
+	"""
+	CountVectorizer tokenizing fields and queries the same way
+	-----
+	vocabulary:
+		Fixed term -> column mapping, learnt on fit if None
+	"""
+
+	return CountVectorizer(stop_words=stop_words(), vocabulary=vocabulary,
+		dtype=np.float32)
+
+def field_texts(df, field):
+	"""
+	One string per course of a field, lists are joined
+	"""
+
+	values = df[field]
+	if(len(values) and isinstance(values.iloc[0], list)):
+		return [" ".join(value) for value in values]
+	return values.fillna("").astype(str)
+
+class SearchIndex:
+	"""
+	BM25 weights of the course terms
+	"""
+
+	matrix = None # csc matrix, courses x terms
+	vocabulary = None
+	course_urls = None
+	analyzer = None
+
+	def __init__(self, matrix, vocabulary, course_urls):
+
+		self.matrix = matrix
+		self.vocabulary = vocabulary
+		self.course_urls = course_urls
+		self.analyzer = vectorizer().build_analyzer()
+
+	def matches(self, df):
+		"""
+		Checks whether the index was built for the rows of df
+		-----
+		df:
+			Prepared dataframe
+		"""
+
+		return list(df['course_url']) == list(self.course_urls)
+
+	def scores(self, text):
+		"""
+		BM25 score of every course for a query, 0 for courses without
+		any of its terms
+		-----
+		text:
+			Query, tokenized like the courses
+		"""
+
+		columns = sorted({self.vocabulary[term] for term in self.analyzer(text)
+			if term in self.vocabulary})
+		m = self.matrix
+		if not columns:
+			return np.zeros(m.shape[0])
+		rows = [m.indices[m.indptr[c]:m.indptr[c + 1]] for c in columns]
+		weights = [m.data[m.indptr[c]:m.indptr[c + 1]] for c in columns]
+		# only the postings of the query terms are touched
+		return np.bincount(np.concatenate(rows), np.concatenate(weights),
+			minlength=m.shape[0])
+
+	@instrumented("search")
+	def search(self, text, how_many=10, rows=None):
+		"""
+		Row positions and scores of the best matching courses
+		-----
+		text:
+			Query
+		how_many:
+			Number of courses returned at most
+		rows:
+			Row positions to search among, all courses if None
+		"""
+
+		scores = self.scores(text)
+		candidates = np.flatnonzero(scores) if rows is None \
+			else np.asarray(rows)[scores[rows] > 0]
+		values = scores[candidates]
+		if(len(candidates) > how_many):
+			top = np.argpartition(-values, how_many - 1)[:how_many]
+			candidates, values = candidates[top], values[top]
+		# best first, ties in row order
+		order = np.lexsort((candidates, -values))
+		return candidates[order], values[order]
+
+	def save(self, matrix_path=SEARCH_PATH, meta_path=SEARCH_META_PATH):
+		"""
+		Stores the index on disk
+		-----
+		matrix_path:
+			Destination of the BM25 weights
+		meta_path:
+			Destination of the vocabulary and course URLs
+		"""
+
+		sp.save_npz(matrix_path, self.matrix)
+		meta = {
+			"vocabulary":self.vocabulary,
+			"course_urls":list(self.course_urls)
+		}
+		with open(meta_path, 'w') as f:
+			json.dump(meta, f)
+
+@instrumented("vectorize")
+def build_search(df, fields=SEARCH_FIELDS, k1=K1, b=B):
+	"""
+	Builds the search index of the whole catalog
+	-----
+	df:
+		Prepared dataframe
+	fields:
+		Columns searched, with the weight of a term occurring in them
+	k1, b:
+		BM25 term frequency saturation and length normalisation
+	"""
+
+	# every field of every course tokenized once, field after field
+	count = vectorizer()
+	counts = count.fit_transform(text for field in fields
+		for text in field_texts(df, field)).tocsr()
+
+	# weighted term frequencies of all fields, one row per course
+	n = len(df)
+	tf = sum(weight * counts[i * n:(i + 1) * n]
+		for i, weight in enumerate(fields.values())).tocsr()
+	lengths = np.asarray(tf.sum(axis=1)).ravel()
+	avg_length = lengths.mean() if lengths.size and lengths.mean() > 0 else 1.0
+	n_docs = tf.shape[0]
+	doc_freq = np.bincount(tf.indices, minlength=tf.shape[1])
+	idf = np.log(1 + (n_docs - doc_freq + 0.5) / (doc_freq + 0.5))
+
+	# BM25 weight of every stored term frequency
+	row_norm = k1 * (1 - b + b * lengths / avg_length)
+	row_of = np.repeat(np.arange(n_docs), np.diff(tf.indptr))
+	data = tf.data
+	weights = idf[tf.indices] * data * (k1 + 1) / (data + row_norm[row_of])
+	matrix = sp.csr_matrix((weights.astype(np.float32), tf.indices, tf.indptr),
+		shape=tf.shape).tocsc()
+
+	vocabulary = {term:int(col) for term, col in count.vocabulary_.items()}
+	return SearchIndex(matrix, vocabulary, list(df['course_url']))
+
+def load_search(matrix_path=SEARCH_PATH, meta_path=SEARCH_META_PATH):
+	"""
+	Loads a stored search index, None if it has not been built yet
+	-----
+	matrix_path:
+		Location of the BM25 weights
+	meta_path:
+		Location of the vocabulary and course URLs
+	"""
+
+	if not (os.path.exists(matrix_path) and os.path.exists(meta_path)):
+		return None
+	matrix = sp.load_npz(matrix_path).tocsc()
+	with open(meta_path) as f:
+		meta = json.load(f)
+
+	return SearchIndex(matrix, meta['vocabulary'], meta['course_urls'])
+
+def get_search(df):
+	"""
+	Loads the stored search index of df, building and storing it when it
+	is missing or was built for a different catalog
+	-----
+	df:
+		Prepared dataframe
+	"""
+
+	index = load_search()
+	if(index is None or not index.matches(df)):
+		index = build_search(df)
+		index.save()
+
+	return index
@@ -0,0 +1,759 @@
+"""
+Recommendation Service
+	- Recommender holds the dataset and indexes, loaded once per process
+	- Serves them as JSON over HTTP:
+		/skills
+		/filter?skills=Python&skills=SQL&how=any
+		/query?skills=...&course_difficulty=Beginner&course_rating_min=4
+		/search?q=machine+learning&k=10[&skills=...&how=...]
+		/similar?course=...&k=5[&skills=...&how=...&dissimilar=0]
+		/profile?course=...&course=...[&weight=2&weight=1]&k=10[&skills=...]
+		/stats
+		/metrics
+	- Several worker processes are forked after loading, so they share
+	  the loaded dataset copy-on-write and the memory-mapped feature
+	  vectors
+	- Skill filters, facet queries, their slices of the similarity
+	  matrix and similar courses are kept in bounded LRU caches, whose
+	  statistics are served on /stats
+	- Stage timings are served on /metrics in the Prometheus text
+	  format when instrumentation is enabled, see instrumentation; the
+	  workers share their totals through a temporary directory, so any
+	  of them answers with the totals of all
+	- Similar courses come from an exact or approximate search backend
+	  (see ann_index), the dissimilar ones are always scored exactly,
+	  as are small skill filters and filters the probes fall short in
+	- Similar courses are re-ranked by similarity blended with rating,
+	  popularity and career outcomes, see ranking
+	- A learner profile of several courses is scored like a single
+	  course, from the weighted sum of their vectors
+	- ServiceClient gives the Streamlit app the same interface remotely
+
+Run from the repository root with
+	python service.py --port 8000 --workers 4 [--backend ivf]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import signal
+import sys
+import tempfile
+import traceback
+import numpy as np
+import requests
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from caching import LRUCache
+from ann_index import make_backend
+from dataset import load_dataset
+from facets import CATEGORY_FACETS, RANGE_FACETS, FacetIndex
+from features import get_vectors
+from instrumentation import METRICS, instrumented
+from ranking import DEFAULT_WEIGHTS, Ranker
+from search_index import get_search
+from similarity_index import recommendations, row_lookup
+from skill_index import SkillIndex
+
+class Recommender:
+	"""
+	Skill filtering and similar courses, independent of any UI
+	"""
+
+	df = None
+	similarity = None
+	skills = None
+	facets = None
+	text_index = None
+	course_rows = None
+	course_urls = None
+	course_names = None
+	filter_cache = None
+	facet_cache = None
+	search_cache = None
+	subset_cache = None
+	similar_cache = None
+	profile_cache = None
+	search = None
+	ranker = None
+
+	def __init__(self, df=None, cache_size=1024, subset_cache_size=64,
+				backend='exact', backend_params=None, representation='svd',
+				ranking=DEFAULT_WEIGHTS, similarity=None, text_index=None):
+		"""
+		df:
+			Prepared dataframe, the stored dataset if None
+		cache_size:
+			Number of skill filters and of similar course queries kept
+		subset_cache_size:
+			Number of skill filters whose matrix slice is kept
+		backend:
+			Search backend of the similar courses, 'exact', 'lsh' or 'ivf'
+		backend_params:
+			Options of the backend, e.g. {"n_probe":16} for 'ivf'
+		representation:
+			'svd' feature vectors or 'keywords' counts, see features
+		ranking:
+			Weights of similarity and of the course signals the similar
+			courses are ranked by, see ranking; None for similarity only
+		similarity:
+			Vectors of df built apart, e.g. by a benchmark; loaded, or
+			built and stored, in the chosen representation if None
+		text_index:
+			SearchIndex of df built apart, the stored one if None
+		"""
+
+		self.df = load_dataset() if df is None else df
+		self.similarity = get_vectors(self.df, representation) \
+			if similarity is None else similarity
+		self.skills = SkillIndex(self.df['skills'])
+		self.facets = FacetIndex(self.df, self.skills)
+		self.text_index = get_search(self.df) \
+			if text_index is None else text_index
+		self.course_rows = row_lookup(self.df['course_name'])
+		# plain arrays, indexing them is far cheaper than .iat
+		self.course_urls = self.df['course_url'].to_numpy(dtype=object)
+		self.course_names = self.df['course_name'].to_numpy(dtype=object)
+		self.filter_cache = LRUCache(cache_size)
+		self.facet_cache = LRUCache(cache_size)
+		self.search_cache = LRUCache(cache_size)
+		self.subset_cache = LRUCache(subset_cache_size)
+		self.similar_cache = LRUCache(cache_size)
+		self.profile_cache = LRUCache(cache_size)
+		if(backend != 'exact'):
+			self.search = make_backend(backend, self.similarity,
+				**(backend_params or {}))
+		if ranking:
+			self.ranker = Ranker(self.df, ranking)
+
+	def skill_vocabulary(self):
+		"""
+		Skills with their number of courses, most common first
+		"""
+
+		return self.skills.vocabulary()
+
+	@instrumented("filter")
+	def filter(self, chosen_options, how='any'):
+		"""
+		Row positions of the courses teaching the chosen skills
+		-----
+		chosen_options:
+			List of skills
+		how:
+			'any' or 'all' of the chosen skills
+		"""
+
+		key = (skill_key(chosen_options), how)
+		return self.filter_cache.get(key,
+			lambda: frozen(self.skills.rows(chosen_options, how)))
+
+	@instrumented("filter")
+	def query(self, chosen_options=None, how='any', categories=None,
+				ranges=None):
+		"""
+		Row positions of the courses matching skills and facets, with the
+		number of courses every option of each facet would leave, see
+		FacetIndex.query
+		-----
+		chosen_options:
+			List of skills, None for any course
+		how:
+			'any' or 'all' of the chosen skills
+		categories:
+			{facet: list of values}, e.g. {"course_difficulty":["Beginner"]}
+		ranges:
+			{facet: (low, high)}, e.g. {"course_rating":(4, None)}
+		"""
+
+		key = (skill_key(chosen_options), how,
+			tuple(sorted((f, skill_key(v)) for f, v in (categories or {}).items())),
+			tuple(sorted((f, tuple(r)) for f, r in (ranges or {}).items())))
+
+		def compute():
+			rows, counts = self.facets.query(chosen_options, how, categories,
+				ranges)
+			return frozen(rows), counts
+
+		return self.facet_cache.get(key, compute)
+
+	def search_text(self, text, how_many=10, chosen_options=None, how='any'):
+		"""
+		Courses best matching a text query, ranked by BM25
+		-----
+		text:
+			Query over the course names, descriptions and skills
+		how_many:
+			Number of courses returned at most
+		chosen_options:
+			Skills to filter the courses by, the whole catalog if None
+		how:
+			'any' or 'all' of the chosen skills
+
+		Returns the row positions and scores, best first.
+		"""
+
+		def compute():
+			rows = None if chosen_options is None \
+				else self.filter(chosen_options, how)
+			return frozen(*self.text_index.search(text, how_many, rows))
+
+		key = (text, how_many, skill_key(chosen_options), how)
+		return self.search_cache.get(key, compute)
+
+	def subset(self, chosen_options, how='any'):
+		"""
+		Rows of a skill filter with their slice of the similarity matrix,
+		kept so browsing courses under one filter never slices again
+		-----
+		chosen_options:
+			List of skills
+		how:
+			'any' or 'all' of the chosen skills
+		"""
+
+		def compute():
+			rows = self.filter(chosen_options, how)
+			return rows, self.similarity.matrix[rows]
+
+		return self.subset_cache.get((skill_key(chosen_options), how), compute)
+
+	def similar(self, course, how_many=5, chosen_options=None, how='any',
+				dissimilar=True):
+		"""
+		Most similar and most dissimilar courses to a course
+		-----
+		course:
+			Name of the selected course
+		how_many:
+			Number of courses in each set
+		chosen_options:
+			Skills to filter the candidates by, the whole catalog if None
+		how:
+			'any' or 'all' of the chosen skills
+		dissimilar:
+			Whether to find the dissimilar courses, which an approximate
+			backend can only do by scoring every candidate
+
+		Returns the row positions and scores of the similar courses,
+		then those of the dissimilar ones, empty if not asked for. The
+		scores of the similar courses are the blended ranking scores when
+		ranking weights are set, the dissimilar ones are similarities.
+		"""
+
+		row = self.course_rows[course]
+		if(self.search is None):
+			# exact scores give the dissimilar courses for free
+			dissimilar = True
+		key = (row, how_many, skill_key(chosen_options), how, dissimilar)
+		return self.similar_cache.get(key,
+			lambda: self.compute_similar(row, how_many, chosen_options, how,
+				dissimilar))
+
+	@instrumented("similarity")
+	def compute_similar(self, row, how_many, chosen_options, how,
+				dissimilar=True):
+		if self.search is None:
+			return self.compute_exact(row, how_many, chosen_options, how)
+
+		rows = None if chosen_options is None \
+			else self.filter(chosen_options, how)
+		if(rows is not None and len(rows) <= EXACT_FILTER_SIZE):
+			# a small filter is cheaper to score exactly than to probe
+			return self.compute_exact(row, how_many, chosen_options, how)
+		if self.ranker is None:
+			similar, sim_scores = self.search.search(row, how_many, rows)
+		else:
+			# re-rank a deeper set of approximate neighbours
+			similar, sim_scores = self.search.search(row,
+				how_many * RERANK_DEPTH, rows)
+			blended = self.ranker.blend(sim_scores, similar)
+			top, _ = recommendations(blended, how_many)
+			similar, sim_scores = similar[top], blended[top]
+		n_candidates = self.similarity.matrix.shape[0] if rows is None \
+			else len(rows)
+		if(len(similar) < min(how_many, n_candidates - 1)):
+			# the probed buckets held too few candidates of the filter
+			return self.compute_exact(row, how_many, chosen_options, how)
+		if dissimilar:
+			_, _, dissim, dissim_scores = self.compute_exact(row, how_many,
+				chosen_options, how)
+		else:
+			dissim, dissim_scores = np.zeros(0, dtype=np.int64), np.zeros(0)
+		return frozen(similar, sim_scores, dissim, dissim_scores)
+
+	def compute_exact(self, row, how_many, chosen_options, how):
+		if chosen_options is None:
+			# the whole matrix, without copying it into a subset
+			scores = self.similarity.similarity_row(row)
+			rows = np.arange(scores.shape[0])
+		else:
+			rows, candidates = self.subset(chosen_options, how)
+			scores = candidates.dot(self.similarity.query(row))
+		exclude = np.flatnonzero(rows == row)
+		similar, dissimilar = recommendations(scores, how_many, exclude)
+		sim_scores = scores[similar]
+		if self.ranker is not None:
+			# the same candidates ranked by blended score, dissimilar
+			# courses stay the least similar ones
+			blended = self.ranker.blend(scores, rows)
+			similar, _ = recommendations(blended, how_many, exclude)
+			sim_scores = blended[similar]
+		return frozen(rows[similar], sim_scores,
+			rows[dissimilar], scores[dissimilar])
+
+	def profile(self, courses, how_many=10, weights=None, chosen_options=None,
+				how='any'):
+		"""
+		Courses to recommend to a learner who took several courses
+		-----
+		courses:
+			Names of the courses taken
+		how_many:
+			Number of courses returned
+		weights:
+			Weight of every course taken, e.g. its rating by the learner,
+			1 for all if None
+		chosen_options:
+			Skills to filter the candidates by, the whole catalog if None
+		how:
+			'any' or 'all' of the chosen skills
+
+		Returns the row positions and scores of the courses not taken,
+		best first, blended when ranking weights are set. Without any
+		course taken they are ranked by the course signals alone.
+		"""
+
+		taken = [self.course_rows[course] for course in courses]
+		if(weights is not None and len(weights) != len(taken)):
+			raise ValueError("every course taken needs one weight")
+		# the same courses in any order are the same profile
+		key = (tuple(sorted(zip(taken, [1.0] * len(taken) if weights is None
+				else [float(w) for w in weights]))),
+			how_many, skill_key(chosen_options), how)
+		return self.profile_cache.get(key,
+			lambda: self.compute_profile(taken, how_many, weights,
+				chosen_options, how))
+
+	@instrumented("similarity")
+	def compute_profile(self, taken, how_many, weights, chosen_options, how):
+		vector = self.similarity.profile(taken, weights)
+		if chosen_options is None:
+			rows = np.arange(self.similarity.matrix.shape[0])
+			scores = self.similarity.matrix.dot(vector)
+		else:
+			rows, candidates = self.subset(chosen_options, how)
+			scores = candidates.dot(vector)
+		if self.ranker is not None:
+			scores = self.ranker.blend(scores, rows)
+		exclude = np.flatnonzero(np.isin(rows, taken))
+		best, _ = recommendations(scores, how_many, exclude)
+		return frozen(rows[best], np.asarray(scores[best], dtype=np.float32))
+
+	def cache_stats(self):
+		"""
+		Hit, miss and eviction counts of the query caches
+		"""
+
+		return {
+			"filter":self.filter_cache.stats(),
+			"facet":self.facet_cache.stats(),
+			"search":self.search_cache.stats(),
+			"subset":self.subset_cache.stats(),
+			"similar":self.similar_cache.stats(),
+			"profile":self.profile_cache.stats()
+		}
+
+	def describe(self, rows, scores=None):
+		"""
+		JSON friendly summary of courses
+		-----
+		rows:
+			Row positions
+		scores:
+			Optional score of every row
+		"""
+
+		courses = []
+		for i, row in enumerate(rows):
+			course = {
+				"row":int(row),
+				"course_url":self.course_urls[row],
+				"course_name":self.course_names[row]
+			}
+			if scores is not None:
+				course["score"] = float(scores[i])
+			courses.append(course)
+		return courses
+
+# approximate neighbours fetched per similar course to re-rank
+RERANK_DEPTH = 4
+# skill filters up to this many courses are always scored exactly
+EXACT_FILTER_SIZE = 1024
+
+def skill_key(chosen_options):
+	"""
+	Order-free cache key of a skill selection, None stays None
+	"""
+
+	if chosen_options is None:
+		return None
+	return tuple(sorted(set(chosen_options)))
+
+def frozen(*arrays):
+	"""
+	Marks arrays read-only, cached results are shared between callers
+	"""
+
+	for a in arrays:
+		a.setflags(write=False)
+	return arrays[0] if len(arrays) == 1 else arrays
+
+def json_option(option):
+	"""
+	Facet option as JSON, an unbounded end of a range becomes null
+	"""
+
+	if isinstance(option, tuple):
+		return [None if np.isinf(bound) else bound for bound in option]
+	return option
+
+class ServiceError(Exception):
+	"""
+	Request error with the HTTP status to answer with
+	"""
+
+	def __init__(self, status, message):
+
+		super().__init__(message)
+		self.status = status
+
+class ServiceHandler(BaseHTTPRequestHandler):
+	"""
+	Routes the JSON endpoints to the process-wide Recommender
+	"""
+
+	recommender = None
+	protocol_version = "HTTP/1.1"
+	# keep-alive responses would otherwise wait on delayed ACKs
+	disable_nagle_algorithm = True
+
+	def do_GET(self):
+
+		url = urlparse(self.path)
+		query = parse_qs(url.query)
+		routes = {
+			"/skills":self.skills,
+			"/filter":self.filter,
+			"/query":self.query,
+			"/search":self.search,
+			"/similar":self.similar,
+			"/profile":self.profile,
+			"/stats":self.stats
+		}
+		if(url.path == "/metrics"):
+			self.send_text(200, METRICS.prometheus())
+			return
+		try:
+			if url.path not in routes:
+				raise ServiceError(404, "Unknown endpoint " + url.path)
+			status, body = 200, routes[url.path](query)
+		except ServiceError as e:
+			status, body = e.status, {"error":str(e)}
+		except Exception:
+			# a bug in a handler still answers, the connection is kept
+			traceback.print_exc()
+			status, body = 500, {"error":"Internal error"}
+		self.send_json(status, body)
+
+	def skills(self, query):
+		vocabulary = self.recommender.skill_vocabulary()
+		return {"skills":[{"skill":skill, "count":count}
+			for skill, count in vocabulary]}
+
+	def how(self, query):
+		how = query.get("how", ["any"])[0]
+		if how not in ("any", "all"):
+			raise ServiceError(400, "how must be 'any' or 'all'")
+		return how
+
+	def k(self, query, default):
+		try:
+			k = int(query.get("k", [str(default)])[0])
+		except ValueError:
+			k = -1
+		if(k < 0):
+			raise ServiceError(400, "k must be a non-negative integer")
+		return k
+
+	def filter(self, query):
+		rows = self.recommender.filter(query.get("skills", []), self.how(query))
+		return {"courses":self.recommender.describe(rows)}
+
+	def query(self, query):
+		categories = {facet:query[facet] for facet in CATEGORY_FACETS
+			if facet in query}
+		ranges = {}
+		for facet in RANGE_FACETS:
+			bounds = [query.get(facet + suffix, [None])[0]
+				for suffix in ("_min", "_max")]
+			if any(bound is not None for bound in bounds):
+				try:
+					ranges[facet] = tuple(None if bound is None else float(bound)
+						for bound in bounds)
+				except ValueError:
+					raise ServiceError(400, facet + " bounds must be numbers")
+		rows, counts = self.recommender.query(query.get("skills"),
+			self.how(query), categories, ranges)
+		return {
+			"courses":self.recommender.describe(rows),
+			"counts":{facet:[{"option":json_option(option), "count":count}
+				for option, count in options] for facet, options in counts.items()}
+		}
+
+	def search(self, query):
+		if "q" not in query:
+			raise ServiceError(400, "q is required")
+		k = self.k(query, 10)
+		rows, scores = self.recommender.search_text(query["q"][0], k,
+			query.get("skills"), self.how(query))
+		return {"courses":self.recommender.describe(rows, scores)}
+
+	def similar(self, query):
+		if "course" not in query:
+			raise ServiceError(400, "course is required")
+		course = query["course"][0]
+		k = self.k(query, 5)
+		dissimilar = query.get("dissimilar", ["1"])[0] != "0"
+		try:
+			similar, sim_scores, dissimilar, dissim_scores = \
+				self.recommender.similar(course, k, query.get("skills"),
+					self.how(query), dissimilar)
+		except KeyError:
+			raise ServiceError(404, "Unknown course " + course)
+		return {
+			"similar":self.recommender.describe(similar, sim_scores),
+			"dissimilar":self.recommender.describe(dissimilar, dissim_scores)
+		}
+
+	def profile(self, query):
+		courses = query.get("course", [])
+		k = self.k(query, 10)
+		try:
+			weights = [float(w) for w in query["weight"]] \
+				if "weight" in query else None
+		except ValueError:
+			raise ServiceError(400, "weights must be numbers")
+		try:
+			rows, scores = self.recommender.profile(courses, k, weights,
+				query.get("skills"), self.how(query))
+		except KeyError as e:
+			raise ServiceError(404, "Unknown course " + str(e.args[0]))
+		except ValueError as e:
+			raise ServiceError(400, str(e))
+		return {"courses":self.recommender.describe(rows, scores)}
+
+	def stats(self, query):
+		return self.recommender.cache_stats()
+
+	def send_json(self, status, body):
+		self.send_data(status, json.dumps(body).encode('utf-8'),
+			"application/json")
+
+	def send_text(self, status, text):
+		self.send_data(status, text.encode('utf-8'),
+			"text/plain; version=0.0.4")
+
+	def send_data(self, status, data, content_type):
+		self.send_response(status)
+		self.send_header("Content-Type", content_type)
+		self.send_header("Content-Length", str(len(data)))
+		self.end_headers()
+		self.wfile.write(data)
+
+	def log_message(self, format, *args):
+		# access logs would dominate the latency of small requests
+		pass
+
+def serve(host='127.0.0.1', port=8000, workers=1, recommender=None,
+			backend='exact', representation='svd', ranking=DEFAULT_WEIGHTS):
+	"""
+	Serves the endpoints until interrupted
+	-----
+	host, port:
+		Address to listen on
+	workers:
+		Number of processes accepting on the same socket
+	recommender:
+		Recommender to serve, loaded from the stored dataset if None
+	backend, representation, ranking:
+		Search backend, vectors and ranking weights of a Recommender
+		loaded here
+	"""
+
+	# load before forking so every worker shares the same pages
+	ServiceHandler.recommender = recommender or Recommender(backend=backend,
+		representation=representation, ranking=ranking)
+	server = ThreadingHTTPServer((host, port), ServiceHandler)
+
+	# scrapes reach any worker, so all of them add up each other's totals
+	metrics_dir = None
+	if(workers > 1 and METRICS.enabled):
+		metrics_dir = tempfile.mkdtemp(prefix="coureco-metrics-")
+		METRICS.share(metrics_dir)
+
+	children = []
+	for _ in range(workers - 1):
+		pid = os.fork()
+		if(pid == 0):
+			try:
+				# the stages before the fork are the parent's
+				METRICS.reset()
+				server.serve_forever()
+			finally:
+				os._exit(0)
+		children.append(pid)
+
+	# stop the workers too when the parent is terminated
+	signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+	try:
+		server.serve_forever()
+	finally:
+		for pid in children:
+			os.kill(pid, signal.SIGTERM)
+		server.server_close()
+		if metrics_dir is not None:
+			METRICS.share(None)
+			shutil.rmtree(metrics_dir, ignore_errors=True)
+
+class ServiceClient:
+	"""
+	Recommender interface backed by a running service
+	"""
+
+	base_url = None
+	session = None
+
+	def __init__(self, base_url):
+		"""
+		base_url:
+			e.g. http://localhost:8000
+		"""
+
+		self.base_url = base_url.rstrip('/')
+		self.session = requests.Session()
+
+	def get(self, endpoint, params):
+		response = self.session.get(self.base_url + endpoint, params=params)
+		body = response.json()
+		if(response.status_code == 404 and endpoint in ("/similar", "/profile")):
+			raise KeyError(body["error"])
+		if(response.status_code != 200):
+			raise ValueError(body["error"])
+		return body
+
+	def skill_vocabulary(self):
+		body = self.get("/skills", {})
+		return [(s["skill"], s["count"]) for s in body["skills"]]
+
+	def filter(self, chosen_options, how='any'):
+		body = self.get("/filter", {"skills":chosen_options, "how":how})
+		return np.array([c["row"] for c in body["courses"]], dtype=np.int32)
+
+	def query(self, chosen_options=None, how='any', categories=None,
+				ranges=None):
+		params = {"how":how}
+		if chosen_options:
+			params["skills"] = chosen_options
+		params.update(categories or {})
+		for facet, (low, high) in (ranges or {}).items():
+			if low is not None:
+				params[facet + "_min"] = low
+			if high is not None:
+				params[facet + "_max"] = high
+		body = self.get("/query", params)
+		rows = np.array([c["row"] for c in body["courses"]], dtype=np.int32)
+		# no skills filters out every course, a query string cannot say
+		# so, only the skill counts ignore the skill predicate
+		no_skills = chosen_options is not None and len(chosen_options) == 0
+		if no_skills:
+			rows = rows[:0]
+		counts = {}
+		for facet, options in body["counts"].items():
+			counts[facet] = [(tuple(np.inf if bound is None else bound
+					for bound in c["option"]) if isinstance(c["option"], list)
+				else c["option"], 0 if no_skills and facet != 'skills'
+				else c["count"]) for c in options]
+		return rows, counts
+
+	def search_text(self, text, how_many=10, chosen_options=None, how='any'):
+		if(chosen_options is not None and len(chosen_options) == 0):
+			# no skills filters out every course
+			return np.zeros(0, dtype=np.int64), np.zeros(0)
+		params = {"q":text, "k":how_many, "how":how}
+		if chosen_options is not None:
+			params["skills"] = chosen_options
+		body = self.get("/search", params)
+		courses = body["courses"]
+		return (np.array([c["row"] for c in courses], dtype=np.int64),
+			np.array([c["score"] for c in courses]))
+
+	def similar(self, course, how_many=5, chosen_options=None, how='any',
+				dissimilar=True):
+		params = {"course":course, "k":how_many, "how":how,
+			"dissimilar":int(dissimilar)}
+		if chosen_options is not None:
+			if(len(chosen_options) == 0):
+				# no skills filters out every course
+				empty = np.zeros(0, dtype=np.int64)
+				return empty, np.zeros(0), empty, np.zeros(0)
+			params["skills"] = chosen_options
+		body = self.get("/similar", params)
+		sim = body["similar"]
+		dissim = body["dissimilar"]
+		return (np.array([c["row"] for c in sim], dtype=np.int64),
+			np.array([c["score"] for c in sim]),
+			np.array([c["row"] for c in dissim], dtype=np.int64),
+			np.array([c["score"] for c in dissim]))
+
+	def profile(self, courses, how_many=10, weights=None, chosen_options=None,
+				how='any'):
+		if(chosen_options is not None and len(chosen_options) == 0):
+			# no skills filters out every course
+			return np.zeros(0, dtype=np.int64), np.zeros(0)
+		params = {"course":list(courses), "k":how_many, "how":how}
+		if weights is not None:
+			params["weight"] = list(weights)
+		if chosen_options is not None:
+			params["skills"] = chosen_options
+		body = self.get("/profile", params)
+		courses = body["courses"]
+		return (np.array([c["row"] for c in courses], dtype=np.int64),
+			np.array([c["score"] for c in courses]))
+
+	def cache_stats(self):
+		return self.get("/stats", {})
+
+def main():
+
+	parser = argparse.ArgumentParser(description="CouReco recommendation service")
+	parser.add_argument("--host", default="127.0.0.1")
+	parser.add_argument("--port", type=int, default=8000)
+	parser.add_argument("--workers", type=int, default=1)
+	parser.add_argument("--backend", default="exact", choices=["exact", "lsh", "ivf"])
+	parser.add_argument("--representation", default="svd", choices=["svd", "keywords"])
+	parser.add_argument("--weights", default="",
+		help="ranking weights over the defaults, e.g. rating=0.3,popularity=0")
+	args = parser.parse_args()
+	ranking = dict(DEFAULT_WEIGHTS)
+	for pair in filter(None, args.weights.split(",")):
+		name, _, weight = pair.partition("=")
+		ranking[name.strip()] = float(weight)
+	serve(args.host, args.port, args.workers, backend=args.backend,
+		representation=args.representation, ranking=ranking)
+
+if __name__=="__main__":
+	main()
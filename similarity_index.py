@@ -0,0 +1,318 @@
+"""
+Similarity Index
+	- Extracts description keywords for the whole catalog once, see
+	  keywords
+	- Stores the sparse term matrix and vocabulary on disk
+	- Computes a single row of cosine similarities at query time
+	- Learner profiles are the normalised weighted sums of the vectors
+	  of the courses they took, scored like a single course
+	- Updates in place of a rebuild when a few courses change, rows are
+	  normalised on their own so untouched rows stay valid
+"""
+
+import os
+import json
+import numpy as np
+import scipy.sparse as sp
+
+from instrumentation import instrumented
+from keywords import extract_keywords
+from sklearn.feature_extraction.text import CountVectorizer
+from sklearn.preprocessing import normalize
+
+MATRIX_PATH = os.path.join("data/similarity-matrix.npz")
+META_PATH = os.path.join("data/similarity-meta.json")
+
+class SimilarityIndex:
+	"""
+	Row-normalised term matrix of the course descriptions
+	"""
+
+	matrix = None # csr matrix, one L2-normalised row per course
+	vocabulary = None
+	course_urls = None
+
+	def __init__(self, matrix, vocabulary, course_urls):
+
+		self.matrix = matrix
+		self.vocabulary = vocabulary
+		self.course_urls = course_urls
+
+	def matches(self, df):
+		"""
+		Checks whether the index was built for the rows of df
+		-----
+		df:
+			Prepared dataframe
+		"""
+
+		return list(df['course_url']) == list(self.course_urls)
+
+	def similarity_row(self, row, rows=None):
+		"""
+		Cosine similarity of one course against a set of courses
+		-----
+		row:
+			Row position of the selected course
+		rows:
+			Row positions to score against (all courses if None)
+		"""
+
+		candidates = self.matrix if rows is None else self.matrix[rows]
+		# rows are unit length, so the dot product is the cosine
+		return candidates.dot(self.query(row))
+
+	def query(self, row):
+		"""
+		Dense vector of a course, scoring a slice of the matrix against
+		it is one sparse matrix-vector pass
+		-----
+		row:
+			Row position of the course
+		"""
+
+		return self.matrix[row].toarray().ravel()
+
+	def profile(self, rows, weights=None):
+		"""
+		Dense unit length profile vector of a set of courses, scoring
+		the matrix against it is one matrix-vector product
+		-----
+		rows:
+			Row positions of the courses taken
+		weights:
+			Weight of every course, 1 for all if None
+		"""
+
+		profiles = profile_weights([rows], self.matrix.shape[0],
+			None if weights is None else [weights])
+		return dense(profile_vectors(self.matrix, profiles)).ravel()
+
+	def save(self, matrix_path=MATRIX_PATH, meta_path=META_PATH):
+		"""
+		Stores the index on disk
+		-----
+		matrix_path:
+			Destination of the sparse term matrix
+		meta_path:
+			Destination of the vocabulary and course URLs
+		"""
+
+		sp.save_npz(matrix_path, self.matrix)
+		meta = {
+			"vocabulary":self.vocabulary,
+			"course_urls":list(self.course_urls)
+		}
+		with open(meta_path, 'w') as f:
+			json.dump(meta, f)
+
+def dense(product):
+	"""
+	Plain array of a matrix product, sparse or dense
+	-----
+	product:
+		Result of a dot product with an index matrix
+	"""
+
+	return product.toarray() if sp.issparse(product) else np.asarray(product)
+
+def profile_weights(profiles, n_courses, weights=None):
+	"""
+	Sparse profiles x courses matrix of the weight of every course taken
+	-----
+	profiles:
+		Row positions of the courses of every profile
+	n_courses:
+		Number of courses of the catalog
+	weights:
+		Weights of the courses of every profile, 1 for all if None
+	"""
+
+	lengths = [len(rows) for rows in profiles]
+	indptr = np.zeros(len(profiles) + 1, dtype=np.int64)
+	np.cumsum(lengths, out=indptr[1:])
+	indices = np.concatenate([np.zeros(0, dtype=np.int64)]
+		+ [np.asarray(rows, dtype=np.int64) for rows in profiles])
+	if weights is None:
+		data = np.ones(indices.shape[0], dtype=np.float32)
+	else:
+		if([len(w) for w in weights] != lengths):
+			raise ValueError("every course of a profile needs one weight")
+		data = np.concatenate([np.zeros(0, dtype=np.float32)]
+			+ [np.asarray(w, dtype=np.float32) for w in weights])
+	if(indices.shape[0] and (indices.min() < 0 or indices.max() >= n_courses)):
+		raise IndexError("profile rows must be within the catalog")
+	return sp.csr_matrix((data, indices, indptr),
+		shape=(len(profiles), n_courses))
+
+def profile_vectors(matrix, profiles):
+	"""
+	Unit length profile vectors, one matrix product for all profiles
+	-----
+	matrix:
+		Row-normalised matrix of an index, sparse or dense
+	profiles:
+		Weights of the courses of every profile, see profile_weights
+	"""
+
+	vectors = profiles.dot(matrix)
+	# empty profiles stay zero and score every course 0
+	return normalize(vectors) if sp.issparse(vectors) \
+		else normalize(np.asarray(vectors, dtype=np.float32))
+
+def row_lookup(values):
+	"""
+	Maps every value to the first row it appears in
+	-----
+	values:
+		Column of the prepared dataframe, e.g. course names
+	"""
+
+	lookup = {}
+	for row, value in enumerate(values):
+		lookup.setdefault(value, row)
+	return lookup
+
+def recommendations(scores, how_many=5, exclude=None):
+	"""
+	Positions of the most similar and most dissimilar scores
+	-----
+	scores:
+		Similarity row, as returned by SimilarityIndex.similarity_row
+	how_many:
+		Number of positions in each of the two sets
+	exclude:
+		Positions that must not be recommended, e.g. the course itself
+	"""
+
+	scores = np.asarray(scores, dtype=np.float64)
+	keep = np.ones(scores.shape[0], dtype=bool)
+	if exclude is not None:
+		keep[exclude] = False
+	candidates = np.flatnonzero(keep)
+	values = scores[candidates]
+	n = values.shape[0]
+	how_many = min(how_many, n)
+	if(how_many == 0):
+		return candidates[:0], candidates[:0]
+
+	if(n > 2 * how_many):
+		# a single partial sort finds both cut-off scores, courses tied
+		# with a cut-off are kept so the tie-break below stays exact
+		parted = np.argpartition(values, [how_many - 1, n - how_many])
+		bottom = np.flatnonzero(values <= values[parted[how_many - 1]])
+		top = np.flatnonzero(values >= values[parted[n - how_many]])
+	else:
+		top = bottom = np.arange(n)
+
+	# ties are broken by position so results are deterministic
+	top = top[np.lexsort((top, -values[top]))][:how_many]
+	bottom = bottom[np.lexsort((bottom, values[bottom]))][:how_many]
+
+	return candidates[top], candidates[bottom]
+
+def build_index(df, processes=1):
+	"""
+	Builds the similarity index for the whole catalog
+	-----
+	df:
+		Prepared dataframe
+	processes:
+		Number of keyword extraction processes
+	"""
+
+	# create description keywords
+	keywords = extract_keywords(df, 'description', processes)
+	matrix, vocabulary = vectorize(keywords)
+
+	return SimilarityIndex(matrix, vocabulary, list(df['course_url']))
+
+@instrumented("vectorize")
+def vectorize(texts):
+	"""
+	Row-normalised term counts of texts, with their vocabulary
+	-----
+	texts:
+		One string per course, e.g. its description keywords
+	"""
+
+	# instantiating and generating the count matrix
+	count = CountVectorizer()
+	count_matrix = count.fit_transform(texts)
+	matrix = normalize(count_matrix.astype(np.float64), norm='l2', copy=False)
+	vocabulary = {term:int(col) for term, col in count.vocabulary_.items()}
+
+	return matrix.tocsr(), vocabulary
+
+def update_index(index, diff, df, processes=1):
+	"""
+	The index of df, reusing the rows of the courses that did not change
+	-----
+	index:
+		SimilarityIndex of the previous catalog
+	diff:
+		dataset.CatalogDiff between the previous catalog and df
+	df:
+		New prepared dataframe
+	processes:
+		Number of keyword extraction processes
+	"""
+
+	# counts of the changed courses in the same tokens as CountVectorizer,
+	# new terms are appended to the vocabulary
+	analyzer = CountVectorizer().build_analyzer()
+	vocabulary = dict(index.vocabulary)
+	indices = []
+	indptr = [0]
+	for text in extract_keywords(df.iloc[diff.changed], 'description', processes):
+		for term in analyzer(text):
+			indices.append(vocabulary.setdefault(term, len(vocabulary)))
+		indptr.append(len(indices))
+	n_terms = len(vocabulary)
+	counts = sp.csr_matrix((np.ones(len(indices)), indices, indptr),
+		shape=(diff.changed.shape[0], n_terms))
+	counts.sum_duplicates()
+	# nothing to normalise when courses were only kept or removed
+	changed = normalize(counts, norm='l2', copy=False) \
+		if counts.shape[0] else counts
+
+	kept = index.matrix[diff.kept_old]
+	kept = sp.csr_matrix((kept.data, kept.indices, kept.indptr),
+		shape=(kept.shape[0], n_terms))
+	matrix = sp.vstack([kept, changed]).tocsr()[diff.order()]
+
+	return SimilarityIndex(matrix, vocabulary, list(df['course_url']))
+
+def load_index(matrix_path=MATRIX_PATH, meta_path=META_PATH):
+	"""
+	Loads a stored index, None if it has not been built yet
+	-----
+	matrix_path:
+		Location of the sparse term matrix
+	meta_path:
+		Location of the vocabulary and course URLs
+	"""
+
+	if not (os.path.exists(matrix_path) and os.path.exists(meta_path)):
+		return None
+	matrix = sp.load_npz(matrix_path).tocsr()
+	with open(meta_path) as f:
+		meta = json.load(f)
+
+	return SimilarityIndex(matrix, meta['vocabulary'], meta['course_urls'])
+
+def get_index(df):
+	"""
+	Loads the stored index of df, building and storing it when it is
+	missing or was built for a different catalog
+	-----
+	df:
+		Prepared dataframe
+	"""
+
+	index = load_index()
+	if(index is None or not index.matches(df)):
+		index = build_index(df)
+		index.save()
+
+	return index
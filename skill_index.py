@@ -0,0 +1,100 @@
+"""
+Skill Index
+	- Maps every skill to the sorted row ids of the courses teaching it
+	- Answers any/all queries over several skills with set operations
+	- Provides the skill vocabulary with course counts for the sidebar
+"""
+
+import numpy as np
+
+from functools import reduce
+
+from coded_lists import CodedLists
+
+class SkillIndex:
+	"""
+	Inverted index of skill lists
+	"""
+
+	postings = None # skill -> sorted int32 array of row ids
+	n_rows = None
+
+	def __init__(self, skill_lists):
+		"""
+		Builds the index in a single pass over the rows
+		-----
+		skill_lists:
+			Column of skill lists, one list per course
+		"""
+
+		coded = getattr(skill_lists, 'array', skill_lists)
+		if isinstance(coded, CodedLists):
+			self.from_codes(coded)
+			return
+
+		rows = {}
+		n_rows = 0
+		for row, skills in enumerate(skill_lists):
+			for skill in skills:
+				rows.setdefault(skill, []).append(row)
+			n_rows += 1
+
+		# a skill listed twice for a course only counts once
+		self.postings = {skill:np.unique(np.asarray(r, dtype=np.int32))
+			for skill, r in rows.items()}
+		self.n_rows = n_rows
+
+	def from_codes(self, coded):
+		"""
+		Builds the postings of coded skill lists with array operations
+		"""
+
+		# (skill, row) pairs of every item sorted by skill, rows are
+		# ascending already, so a stable sort keeps them in order
+		order = np.argsort(coded.ids, kind='stable')
+		ids = coded.ids[order]
+		rows = coded.rows()[order]
+		# a skill listed twice for a course only counts once
+		first = np.ones(len(ids), dtype=bool)
+		first[1:] = (ids[1:] != ids[:-1]) | (rows[1:] != rows[:-1])
+		ids, rows = ids[first], rows[first]
+		starts = np.flatnonzero(np.diff(ids, prepend=-1))
+		ends = np.append(starts[1:], len(ids))
+		self.postings = {coded.vocabulary[ids[start]]:rows[start:end]
+			for start, end in zip(starts, ends)}
+		self.n_rows = len(coded)
+
+	def rows(self, chosen_options, how='any'):
+		"""
+		Sorted row ids of the courses matching the chosen skills
+		-----
+		chosen_options:
+			List of skills
+		how:
+			'any' for courses with at least one of the skills,
+			'all' for courses with every skill
+		"""
+
+		empty = np.zeros(0, dtype=np.int32)
+		if(len(chosen_options) == 0):
+			return empty
+		postings = [self.postings.get(op, empty) for op in chosen_options]
+		if(how == 'all'):
+			# smallest lists first keeps the intersections short
+			postings = sorted(postings, key=len)
+			return reduce(np.intersect1d, postings)
+		elif(how == 'any'):
+			# sorted and deduplicated by hand, cheaper than np.unique
+			rows = np.sort(np.concatenate(postings))
+			keep = np.ones(len(rows), dtype=bool)
+			keep[1:] = rows[1:] != rows[:-1]
+			return rows[keep]
+		raise ValueError("how must be 'any' or 'all', got " + repr(how))
+
+	def vocabulary(self):
+		"""
+		Skills with their number of courses, most common first
+		"""
+
+		counts = {skill:len(r) for skill, r in self.postings.items()}
+		return sorted(counts.items(), key=lambda item: (-item[1], item[0]))
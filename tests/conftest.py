@@ -0,0 +1,22 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+# the modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# fixtures shared by the pandas extension array tests
+from pandas.tests.extension.conftest import *
+
+@pytest.fixture(params=[True, False])
+def using_nan_is_na(request):
+	# from the pandas test suite, whose conftest needs hypothesis
+	with pd.option_context("future.distinguish_nan_and_na", not request.param):
+		yield request.param
+
+@pytest.fixture(params=[None, lambda x: x])
+def sort_by_key(request):
+	# from the pandas test suite as well
+	return request.param
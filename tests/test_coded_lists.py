@@ -0,0 +1,153 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from pandas.tests.extension import base
+
+from coded_lists import CodedListDtype, CodedLists, decode_lists, is_missing
+
+ITEMS = ["Python", "SQL", "R", "Statistics", "Machine Learning", "Excel"]
+
+def make_lists(n, seed=0):
+	rng = np.random.default_rng(seed)
+	return [list(rng.choice(ITEMS, rng.integers(1, 4), replace=False))
+		for _ in range(n)]
+
+@pytest.fixture
+def dtype():
+	return CodedListDtype()
+
+@pytest.fixture
+def data():
+	values = make_lists(10)
+	# the first two rows differ in length, so numpy keeps them as objects
+	values[0], values[1] = ["Python"], ["SQL", "R"]
+	return CodedLists.from_lists(values)
+
+@pytest.fixture
+def data_missing():
+	return CodedLists.from_lists([np.nan, ["Python"]])
+
+@pytest.fixture
+def data_for_sorting():
+	return CodedLists.from_lists([["b"], ["c"], ["a"]])
+
+@pytest.fixture
+def data_missing_for_sorting():
+	return CodedLists.from_lists([["b"], np.nan, ["a"]])
+
+@pytest.fixture
+def data_for_grouping():
+	return CodedLists.from_lists([["b"], ["b"], np.nan, np.nan, ["a"], ["a"],
+		["b"], ["c"]])
+
+@pytest.fixture
+def na_cmp():
+	return lambda a, b: is_missing(a) and is_missing(b)
+
+# base tests pandas itself cannot pass with list values
+LIST_VALUE = "pandas reads a list value as one value per row"
+VIEWS = "setting rows recodes the whole array, so no two arrays share rows"
+UNHASHABLE = "a list group key cannot name the group"
+KNOWN_FAILURES = {
+	"test_series_constructor_scalar_with_index":LIST_VALUE,
+	"test_from_dtype":LIST_VALUE,
+	"test_setitem_sequence_broadcasts[True]":LIST_VALUE,
+	"test_setitem_loc_scalar_mixed":LIST_VALUE,
+	"test_setitem_loc_scalar_multiple_homogoneous":LIST_VALUE,
+	"test_setitem_iloc_scalar_mixed":LIST_VALUE,
+	"test_setitem_iloc_scalar_multiple_homogoneous":LIST_VALUE,
+	"test_setitem_mask[True-numpy-array]":LIST_VALUE,
+	"test_setitem_mask[True-boolean-array]":LIST_VALUE,
+	"test_setitem_mask[True-boolean-array-na]":LIST_VALUE,
+	"test_setitem_mask_boolean_array_with_na[True]":LIST_VALUE,
+	"test_setitem_integer_array[True-list]":LIST_VALUE,
+	"test_setitem_integer_array[True-integer-array]":LIST_VALUE,
+	"test_setitem_integer_array[True-numpy-array]":LIST_VALUE,
+	"test_setitem_mask_broadcast[loc]":LIST_VALUE,
+	"test_setitem_mask_broadcast[None]":LIST_VALUE,
+	"test_setitem_slice[True]":LIST_VALUE,
+	"test_setitem_loc_iloc_slice":LIST_VALUE,
+	"test_setitem_2d_values":LIST_VALUE,
+	"test_fillna_series":LIST_VALUE,
+	"test_fillna_frame":LIST_VALUE,
+	"test_fillna_limit_frame":LIST_VALUE,
+	"test_fillna_limit_series":LIST_VALUE,
+	"test_fillna_copy_frame":LIST_VALUE,
+	"test_fillna_copy_series":LIST_VALUE,
+	"test_setitem_preserves_views":VIEWS,
+	"test_view":VIEWS,
+	"test_transpose":VIEWS,
+	"test_groupby_extension_transform":UNHASHABLE,
+	"test_groupby_extension_apply[scalar]":UNHASHABLE,
+	"test_groupby_extension_apply[list]":UNHASHABLE,
+	"test_groupby_extension_apply[series]":UNHASHABLE,
+	"test_groupby_extension_apply[object]":UNHASHABLE
+}
+
+@pytest.fixture(autouse=True)
+def known_failures(request):
+	reason = KNOWN_FAILURES.get(request.node.name)
+	if reason:
+		request.applymarker(pytest.mark.xfail(reason=reason, strict=True))
+
+class TestDtype(base.BaseDtypeTests):
+	pass
+
+class TestConstructors(base.BaseConstructorsTests):
+	pass
+
+class TestGetitem(base.BaseGetitemTests):
+	pass
+
+class TestSetitem(base.BaseSetitemTests):
+	pass
+
+class TestMissing(base.BaseMissingTests):
+	pass
+
+class TestInterface(base.BaseInterfaceTests):
+	pass
+
+class TestReshaping(base.BaseReshapingTests):
+	pass
+
+class TestMethods(base.BaseMethodsTests):
+	pass
+
+class TestCasting(base.BaseCastingTests):
+	pass
+
+class TestGroupby(base.BaseGroupbyTests):
+	pass
+
+class TestPrinting(base.BasePrintingTests):
+	pass
+
+def test_strings_and_arrow_round_trip():
+	lists = CodedLists.from_strings(pd.Series(["Python,SQL", None, "R"]))
+	assert list(lists.isna()) == [False, True, False]
+	assert lists.offsets.dtype == np.int32 and lists.ids.dtype == np.int32
+	back = CodedLists.from_arrow(pa.array(lists))
+	assert back.to_numpy().tolist()[::2] == [["Python", "SQL"], ["R"]]
+	assert list(back.isna()) == [False, True, False]
+
+def test_slices_keep_int32_offsets(data):
+	assert data[5:20].offsets.dtype == np.int32
+	assert data.take([3, -1], allow_fill=True).offsets.dtype == np.int32
+
+def test_series_operations():
+	s = pd.Series(CodedLists.from_lists([["a", "b"], [], np.nan, ["a", "b"]]))
+	assert s.explode().tolist()[:2] == ["a", "b"]
+	assert s.explode().isna().sum() == 2
+	assert s.nunique() == 2
+	assert s.value_counts().iloc[0] == 2
+	assert s.where(s.notna(), None).isna().sum() == 1
+	assert s.reindex([0, 9]).isna().tolist() == [False, True]
+
+def test_decode_lists():
+	df = pd.DataFrame({"skills":CodedLists.from_lists([["a"], np.nan])})
+	decoded = decode_lists(df)
+	assert decoded['skills'].dtype == object
+	assert decoded['skills'].iloc[0] == ["a"]
@@ -0,0 +1,31 @@
+import os
+
+import dataset
+
+def touch(path, mtime):
+	with open(path, 'w') as f:
+		f.write("x")
+	os.utime(path, (mtime, mtime))
+
+def sources(tmp_path, monkeypatch, scrape_time, csv_time):
+	scrape = str(tmp_path / "scraped.arrows")
+	csvs = [str(tmp_path / "overview.csv"), str(tmp_path / "courses.csv")]
+	for path in csvs:
+		touch(path, csv_time)
+	if scrape_time is not None:
+		touch(scrape, scrape_time)
+	monkeypatch.setattr(dataset, "SCRAPE_PATH", scrape)
+	monkeypatch.setattr(dataset, "SOURCE_PATHS", csvs)
+	return scrape, csvs
+
+def test_newer_stream_is_used(tmp_path, monkeypatch):
+	scrape, csvs = sources(tmp_path, monkeypatch, 2000, 1000)
+	assert dataset.default_sources() == [scrape]
+
+def test_stale_stream_does_not_shadow_csvs(tmp_path, monkeypatch):
+	scrape, csvs = sources(tmp_path, monkeypatch, 1000, 2000)
+	assert dataset.default_sources() == csvs
+
+def test_csvs_without_stream(tmp_path, monkeypatch):
+	scrape, csvs = sources(tmp_path, monkeypatch, None, 1000)
+	assert dataset.default_sources() == csvs
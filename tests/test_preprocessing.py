@@ -0,0 +1,17 @@
+import pandas as pd
+
+from preprocessing import HOURS_PER_UNIT, find_hours
+
+def test_units_are_in_order():
+	units = ["minute", "hour", "day", "week", "month"]
+	hours = [HOURS_PER_UNIT[unit] for unit in units]
+	assert hours == sorted(hours) and len(set(hours)) == len(hours)
+
+def test_find_hours_at_the_same_pace():
+	texts = pd.Series(["Approx. 3 days to complete", "Approx. 6 weeks to complete",
+		"Approx. 2 months to complete", "Approx. 90 minutes to complete", "Missing"])
+	hours = find_hours(texts)
+	assert hours[0] < hours[1] < hours[2]
+	assert abs(hours[0] - 30 / 7) < 1e-9
+	assert hours[3] == 1.5
+	assert pd.isna(hours[4])